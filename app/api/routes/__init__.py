@@ -4,7 +4,10 @@ from .health import router as health_router
 from .stations import router as stations_router
 from .routing import router as routing_router
 from .trips import router as trips_router
+from .journeys import router as journeys_router
 from .bookings import router as bookings_router
+from .metrics import router as metrics_router
+from .admin import router as admin_router
 
 router = APIRouter()
 
@@ -12,4 +15,7 @@ router.include_router(health_router, tags=["health"])
 router.include_router(stations_router, prefix="/stations", tags=["stations"])
 router.include_router(routing_router, prefix="/route", tags=["routing"])
 router.include_router(trips_router, prefix="/trips", tags=["trips"])
+router.include_router(journeys_router, prefix="/journey", tags=["journeys"])
 router.include_router(bookings_router, prefix="/bookings", tags=["bookings"])
+router.include_router(metrics_router, tags=["metrics"])
+router.include_router(admin_router, prefix="/admin", tags=["admin"])
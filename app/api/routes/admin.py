@@ -0,0 +1,98 @@
+import logging
+import secrets
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.responses import PlainTextResponse, Response
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.core.profiling import PROFILES, ProfilerBusy, sample_stacks
+from app.data.graph import get_compiled_graph
+from app.data.snapshot import SnapshotError
+from app.services.network_service import reload_network
+
+router = APIRouter()
+logger = logging.getLogger("railway.admin")
+
+
+def require_admin(x_admin_token: str | None = Header(None)) -> None:
+    # Only served when an admin token is configured, whatever else is enabled.
+    if not settings.admin_token:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not secrets.compare_digest(x_admin_token or "", settings.admin_token):
+        raise HTTPException(status_code=403, detail="Invalid admin token.")
+
+
+def require_profiling() -> None:
+    if not settings.profiling_enabled:
+        raise HTTPException(status_code=404, detail="Not Found")
+
+
+_PROFILING = [Depends(require_profiling), Depends(require_admin)]
+
+
+def _network_info(g) -> dict:
+    return {"version": g.version, "stations": g.node_count, "edges": g.edge_count}
+
+
+@router.get("/network", dependencies=[Depends(require_admin)])
+async def network():
+    return {**_network_info(get_compiled_graph()), "snapshot_path": settings.network_snapshot_path}
+
+
+@router.post("/network/reload", dependencies=[Depends(require_admin)])
+async def network_reload():
+    previous = get_compiled_graph().version
+    try:
+        # Loading and verifying the snapshot happens off the event loop.
+        g, changed = await run_in_threadpool(reload_network)
+    except SnapshotError as e:
+        raise HTTPException(status_code=422, detail=str(e)) from e
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e)) from e
+    except OSError as e:
+        raise HTTPException(status_code=422, detail=f"Cannot read network snapshot: {e}") from e
+    return {**_network_info(g), "previous_version": previous, "changed": changed}
+
+
+@router.get("/profiles", dependencies=_PROFILING)
+async def list_profiles():
+    return [
+        {
+            "profile_id": p.profile_id,
+            "method": p.method,
+            "path": p.path,
+            "status": p.status,
+            "duration_ms": round(p.duration_ms, 2),
+            "created_at": p.created_at,
+        }
+        for p in PROFILES.list()
+    ]
+
+
+@router.get("/profiles/{profile_id}", dependencies=_PROFILING)
+async def get_profile(profile_id: str, format: str = Query("pstats", pattern="^(pstats|text)$")):
+    profile = PROFILES.get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired profile_id.")
+    if format == "text":
+        return PlainTextResponse(profile.text())
+    return Response(
+        profile.stats,
+        media_type="application/octet-stream",
+        headers={"Content-Disposition": f'attachment; filename="{profile_id}.pstats"'},
+    )
+
+
+@router.post("/profile/sample", dependencies=_PROFILING)
+async def sample(
+    seconds: float = Query(5.0, gt=0, le=60),
+    interval_ms: float = Query(5.0, ge=1, le=1000),
+):
+    logger.info("sampling_profile_start seconds=%s interval_ms=%s", seconds, interval_ms)
+    try:
+        # Sampled from a worker thread so the event loop keeps serving (and shows up).
+        folded = await run_in_threadpool(sample_stacks, seconds, interval_ms / 1000.0)
+    except ProfilerBusy as e:
+        raise HTTPException(status_code=409, detail=str(e)) from e
+    return PlainTextResponse(folded)
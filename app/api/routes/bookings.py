@@ -1,24 +1,140 @@
+import json
 import logging
+from collections.abc import AsyncIterator, Sequence
+from datetime import datetime
+from typing import Annotated
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Header, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from starlette.concurrency import run_in_threadpool
 
-from app.models.schemas import Booking, BookingCreate
-from app.services.booking_service import create_booking, list_bookings
+from app.core.cache import IdempotencyKeyReused
+from app.core.config import settings
+from app.core.responses import (
+    EXPORT_FORMATS,
+    NDJSON_MEDIA_TYPE,
+    FastJSONResponse,
+    export_response,
+    to_ndjson,
+    utc_timestamp,
+)
+from app.models.schemas import (
+    Booking,
+    BookingBulkResult,
+    BookingCreate,
+    FareQuoteRequest,
+    FareQuoteResponse,
+)
+from app.services.booking_service import (
+    create_booking,
+    create_booking_once,
+    create_bookings,
+    export_bookings,
+    query_bookings,
+    quote_fares,
+)
 
 router = APIRouter()
 logger = logging.getLogger("railway.bookings")
 
+# Best-effort bulk items booked (and answered) together
+_BULK_CHUNK = 500
 
+# An item as parsed from a bulk request: the payload, or why it is invalid.
+BulkItem = tuple[int, BookingCreate | str]
+
+
+# Sync on purpose: the first call may restore bookings from the storage backend.
 @router.get("", response_model=list[Booking])
-def get_bookings():
+def get_bookings(
+    trip_id: str | None = None,
+    passenger_name: str | None = None,
+    limit: Annotated[int, Query(ge=1, le=1000)] = 100,
+    cursor: str | None = None,
+):
     logger.info("list_bookings")
-    return list_bookings()
+    try:
+        page, next_cursor = query_bookings(trip_id, passenger_name, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from e
+    headers = {"X-Next-Cursor": next_cursor} if next_cursor is not None else None
+    return FastJSONResponse(page, headers=headers)
+
+
+_EXPORT_COLUMNS = (
+    "booking_id",
+    "ticket_code",
+    "passenger_name",
+    "trip_id",
+    "train_no",
+    "from_station",
+    "to_station",
+    "depart_at",
+    "seats",
+    "travel_class",
+    "total_price",
+    "booked_at",
+)
+
+
+def _export_row(b: Booking) -> tuple:
+    trip = b.trip
+    return (
+        b.booking_id,
+        b.ticket_code,
+        b.passenger_name,
+        trip.trip_id,
+        trip.train_no,
+        trip.from_station,
+        trip.to_station,
+        utc_timestamp(trip.depart_at),
+        b.seats,
+        b.travel_class,
+        b.total_price,
+        utc_timestamp(b.booked_at),
+    )
+
+
+@router.get("/export")
+async def export(
+    booked_after: Annotated[
+        datetime | None, Query(description="Earliest booked_at (inclusive).")
+    ] = None,
+    booked_before: Annotated[
+        datetime | None, Query(description="Latest booked_at (exclusive).")
+    ] = None,
+    fmt: Annotated[
+        str, Query(alias="format", pattern=f"^({'|'.join(EXPORT_FORMATS)})$")
+    ] = "ndjson",
+):
+    """All bookings in the booked_at window, oldest first, streamed as NDJSON or CSV."""
+    logger.info(
+        "export_bookings booked_after=%s booked_before=%s format=%s",
+        booked_after,
+        booked_before,
+        fmt,
+    )
+    chunks = export_bookings(booked_after, booked_before, settings.export_chunk_size)
+    return export_response(chunks, fmt, _EXPORT_COLUMNS, _export_row)
 
 
 @router.post("", response_model=Booking)
-def book(payload: BookingCreate):
+async def book(
+    payload: BookingCreate,
+    response: Response,
+    idempotency_key: Annotated[str | None, Header(min_length=1, max_length=255)] = None,
+):
     try:
-        booking = create_booking(payload)
+        # The write-through to the storage backend blocks, so it stays off the loop.
+        if idempotency_key is None:
+            booking = await run_in_threadpool(create_booking, payload)
+        else:
+            booking, replayed = await run_in_threadpool(
+                create_booking_once, payload, idempotency_key
+            )
+            if replayed:
+                response.headers["Idempotent-Replayed"] = "true"
         logger.info(
             "booking_created booking_id=%s trip_id=%s seats=%s passenger_name=%s total_price=%s",
             booking.booking_id,
@@ -28,6 +144,8 @@ def book(payload: BookingCreate):
             booking.total_price,
         )
         return booking
+    except IdempotencyKeyReused as e:
+        raise HTTPException(status_code=422, detail=str(e)) from e
     except ValueError as e:
         logger.warning(
             "booking_failed trip_id=%s seats=%s passenger_name=%s error=%s",
@@ -37,3 +155,122 @@ def book(payload: BookingCreate):
             str(e),
         )
         raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.post("/quote", response_model=FareQuoteResponse, response_model_exclude_none=True)
+async def quote(payload: FareQuoteRequest):
+    try:
+        resp = quote_fares(payload.trip_ids, payload.seats, payload.travel_class)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from e
+    return FastJSONResponse(resp, exclude_none=True)
+
+
+def _parse_item(raw: object | bytes) -> BookingCreate | str:
+    try:
+        if isinstance(raw, bytes):
+            return BookingCreate.model_validate_json(raw)
+        return BookingCreate.model_validate(raw)
+    except ValidationError as e:
+        return "; ".join(
+            f"{'.'.join(str(part) for part in err['loc']) or 'item'}: {err['msg']}"
+            for err in e.errors()
+        )
+
+
+async def _read_items(request: Request) -> list[object | bytes]:
+    """
+    The raw items of a bulk body, read as it arrives. Stops with 413 as soon
+    as the body passes bulk_booking_max_bytes or, for NDJSON, holds more than
+    bulk_booking_max_items lines.
+    """
+    max_items, max_bytes = settings.bulk_booking_max_items, settings.bulk_booking_max_bytes
+    content_type = request.headers.get("content-type", "").split(";")[0].strip()
+    ndjson = content_type == NDJSON_MEDIA_TYPE
+    received = 0
+    body: list[bytes] = []
+    lines: list[bytes] = []
+    pending = b""
+    async for data in request.stream():
+        received += len(data)
+        if received > max_bytes:
+            raise HTTPException(
+                status_code=413, detail=f"Body too large (at most {max_bytes} bytes per request)."
+            )
+        if not ndjson:
+            body.append(data)
+            continue
+        *complete, pending = (pending + data).split(b"\n")
+        lines += [line for line in complete if line.strip()]
+        if len(lines) > max_items:
+            break
+    if ndjson:
+        if pending.strip():
+            lines.append(pending)
+        raw: list = lines
+    else:
+        try:
+            raw = json.loads(b"".join(body))
+        except ValueError:
+            raw = None
+        if not isinstance(raw, list):
+            raise HTTPException(status_code=400, detail="Expected a JSON array of bookings.")
+    if len(raw) > max_items:
+        raise HTTPException(
+            status_code=413, detail=f"Too many items (at most {max_items} per request)."
+        )
+    return raw
+
+
+async def _book_chunk(items: Sequence[BulkItem]) -> bytes:
+    results = {
+        index: BookingBulkResult(index=index, error=item)
+        for index, item in items
+        if isinstance(item, str)
+    }
+    valid = [(index, item) for index, item in items if index not in results]
+    if valid:
+        for result in await run_in_threadpool(create_bookings, valid):
+            results[result.index] = result
+    return to_ndjson([results[index] for index, _ in items], exclude_none=True)
+
+
+@router.post("/bulk", response_class=StreamingResponse)
+async def book_bulk(
+    request: Request,
+    mode: Annotated[str, Query(pattern="^(best_effort|all_or_nothing)$")] = "best_effort",
+):
+    """
+    Book a group from a JSON array or (Content-Type: application/x-ndjson) an
+    NDJSON stream of bookings. Results come back as NDJSON, one line per item.
+
+    best_effort books each item that can be booked, streaming results as each
+    part of the group is processed. all_or_nothing books all of it or none of
+    it (409). Groups over the item or byte limit get 413 either way.
+    """
+    # Read in full before responding: once a StreamingResponse starts, Starlette
+    # listens for a disconnect on the same channel and would swallow body chunks.
+    raw = await _read_items(request)
+
+    if mode == "best_effort":
+
+        async def stream() -> AsyncIterator[bytes]:
+            for start in range(0, len(raw), _BULK_CHUNK):
+                part = raw[start : start + _BULK_CHUNK]
+                yield await _book_chunk(
+                    [(index, _parse_item(item)) for index, item in enumerate(part, start)]
+                )
+
+        return StreamingResponse(stream(), media_type=NDJSON_MEDIA_TYPE)
+
+    items: list[BulkItem] = [(index, _parse_item(item)) for index, item in enumerate(raw)]
+    invalid = [{"index": index, "error": item} for index, item in items if isinstance(item, str)]
+    if invalid:
+        raise HTTPException(status_code=422, detail=invalid)
+    results = await run_in_threadpool(create_bookings, items, True)
+    booked = all(r.booking is not None for r in results)
+    return Response(
+        to_ndjson(results, exclude_none=True),
+        status_code=200 if booked else 409,
+        media_type=NDJSON_MEDIA_TYPE,
+    )
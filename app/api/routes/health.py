@@ -1,7 +1,9 @@
 from fastapi import APIRouter
 
+from app.data.graph import get_compiled_graph
+
 router = APIRouter()
 
 @router.get("/health")
-def health():
-    return {"ok": True, "service": "Railway Quest"}
+async def health():
+    return {"ok": True, "service": "Railway Quest", "network_version": get_compiled_graph().version}
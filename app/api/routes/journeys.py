@@ -0,0 +1,30 @@
+import logging
+from datetime import datetime
+from typing import Annotated
+
+from fastapi import APIRouter, HTTPException, Query
+
+from app.models.schemas import STATION_CODE_MAX_LENGTH, Journey
+from app.services.journey_service import plan_journey
+
+router = APIRouter()
+logger = logging.getLogger("railway.journeys")
+
+
+@router.get("", response_model=Journey)
+def journey(
+    from_station: Annotated[str, Query(min_length=2, max_length=STATION_CODE_MAX_LENGTH)],
+    to_station: Annotated[str, Query(min_length=2, max_length=STATION_CODE_MAX_LENGTH)],
+    depart_after: Annotated[datetime | None, Query(description="Defaults to now (UTC).")] = None,
+):
+    try:
+        return plan_journey(from_station.upper(), to_station.upper(), depart_after)
+    except ValueError as e:
+        logger.warning(
+            "journey_failed from=%s to=%s depart_after=%s error=%s",
+            from_station.upper(),
+            to_station.upper(),
+            depart_after,
+            str(e),
+        )
+        raise HTTPException(status_code=400, detail=str(e)) from e
@@ -2,20 +2,58 @@ import logging
 
 from fastapi import APIRouter, HTTPException, Query
 
-from app.models.schemas import RouteResponse
-from app.services.routing_service import find_cheapest_route
+from app.core.responses import NETWORK_VERSION_HEADER, FastJSONResponse
+from app.models.schemas import (
+    STATION_CODE_MAX_LENGTH,
+    RouteBatchRequest,
+    RouteBatchResponse,
+    RouteMatrixRequest,
+    RouteMatrixResponse,
+    RouteResponse,
+)
+from app.services.routing_pool import RoutingOverloaded, RoutingTimeout, get_routing_pool
+from app.services.routing_service import (
+    cache_route,
+    cached_route,
+    find_cheapest_route,
+    find_routes_batch,
+    route_cache_stats,
+    route_matrix,
+    with_network_version,
+)
 
 router = APIRouter()
 logger = logging.getLogger("railway.routing")
 
 
-@router.get("", response_model=RouteResponse)
-def route(
-    from_station: str = Query(..., min_length=2, max_length=6),
-    to_station: str = Query(..., min_length=2, max_length=6),
+async def _offload(fn, *args) -> tuple[str, object]:
+    """Run fn in the routing pool; returns (network version it ran against, result)."""
+    try:
+        return await get_routing_pool().run(with_network_version, fn, *args)
+    except RoutingOverloaded as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"}) from e
+    except RoutingTimeout as e:
+        raise HTTPException(status_code=504, detail=str(e)) from e
+
+
+@router.get("", response_model=RouteResponse, response_model_exclude_none=True)
+async def route(
+    from_station: str = Query(..., min_length=2, max_length=STATION_CODE_MAX_LENGTH),
+    to_station: str = Query(..., min_length=2, max_length=STATION_CODE_MAX_LENGTH),
+    alternatives: int = Query(0, ge=0, description="Also return this many next-cheapest routes"),
+    travel_class: str | None = Query(None, description="Fare class; the default class if unset"),
 ):
+    frm, to = from_station.upper(), to_station.upper()
     try:
-        resp = find_cheapest_route(from_station.upper(), to_station.upper())
+        # Cache hits are answered on the loop; only misses pay for the hop to the pool.
+        hit = cached_route(frm, to, alternatives, travel_class)
+        if hit is not None:
+            version, resp = hit
+        else:
+            version, resp = await _offload(
+                find_cheapest_route, frm, to, alternatives, travel_class
+            )
+            cache_route(version, resp, alternatives)
         logger.info(
             "route_found from=%s to=%s total_km=%s total_fare=%s legs=%s",
             resp.from_station,
@@ -24,12 +62,62 @@ def route(
             resp.total_fare,
             len(resp.legs),
         )
-        return resp
+        return FastJSONResponse(
+            resp, exclude_none=True, headers={NETWORK_VERSION_HEADER: version}
+        )
     except ValueError as e:
         logger.warning(
             "route_failed from=%s to=%s error=%s",
-            from_station.upper(),
-            to_station.upper(),
+            frm,
+            to,
             str(e),
         )
         raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.post("/batch", response_model=RouteBatchResponse, response_model_exclude_none=True)
+async def route_batch(payload: RouteBatchRequest):
+    pairs = [(p.from_station.upper(), p.to_station.upper()) for p in payload.pairs]
+    try:
+        version, results = await _offload(
+            find_routes_batch, pairs, payload.include_legs, payload.travel_class
+        )
+    except ValueError as e:
+        logger.warning("route_batch_failed pairs=%s error=%s", len(pairs), str(e))
+        raise HTTPException(status_code=400, detail=str(e)) from e
+    return FastJSONResponse(
+        RouteBatchResponse(results=results),
+        exclude_none=True,
+        headers={NETWORK_VERSION_HEADER: version},
+    )
+
+
+@router.post("/matrix", response_model=RouteMatrixResponse, response_model_exclude_none=True)
+async def matrix(payload: RouteMatrixRequest):
+    sources = [code.upper() for code in payload.sources]
+    targets = [code.upper() for code in payload.targets]
+    try:
+        version, resp = await _offload(
+            route_matrix, sources, targets, payload.include_legs, payload.travel_class
+        )
+        return FastJSONResponse(
+            resp, exclude_none=True, headers={NETWORK_VERSION_HEADER: version}
+        )
+    except ValueError as e:
+        logger.warning(
+            "route_matrix_failed sources=%s targets=%s error=%s",
+            len(sources),
+            len(targets),
+            str(e),
+        )
+        raise HTTPException(status_code=400, detail=str(e)) from e
+
+
+@router.get("/cache")
+async def route_cache():
+    return route_cache_stats()
+
+
+@router.get("/pool")
+async def route_pool():
+    return get_routing_pool().stats()
@@ -1,10 +1,19 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Request
 
+from app.core.config import settings
+from app.core.responses import NETWORK_VERSION_HEADER, PrecomputedJSON, etag_response
+from app.data.graph import get_compiled_graph
 from app.models.schemas import Station
-from app.data.network import STATIONS
 
 router = APIRouter()
 
+# Re-serialized only when the network changes.
+_STATIONS_JSON = PrecomputedJSON(lambda g: sorted(g.stations.values(), key=lambda s: s.code))
+
 @router.get("", response_model=list[Station])
-def list_stations():
-    return sorted(STATIONS.values(), key=lambda s: s.code)
+async def list_stations(request: Request):
+    g = get_compiled_graph()
+    body, etag = _STATIONS_JSON.get(g.version, g)
+    return etag_response(
+        request, etag, body, settings.static_cache_max_age_s, {NETWORK_VERSION_HEADER: g.version}
+    )
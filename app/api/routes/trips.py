@@ -1,10 +1,93 @@
-from fastapi import APIRouter
+import secrets
+from datetime import datetime
+from typing import Annotated
 
-from app.models.schemas import Trip
-from app.data.seed import list_trips
+from fastapi import APIRouter, HTTPException, Query, Request
+
+from app.core.config import settings
+from app.core.responses import (
+    EXPORT_FORMATS,
+    PrecomputedJSON,
+    etag_response,
+    export_response,
+    strong_etag,
+    to_json,
+    utc_timestamp,
+)
+from app.data.seed import iter_trips, list_trips, trips_version
+from app.models.schemas import STATION_CODE_MAX_LENGTH, SeatAvailability, Trip
+from app.services.booking_service import seat_availability
 
 router = APIRouter()
 
+# The unfiltered listing is serialized once per timetable version.
+_TRIPS_JSON = PrecomputedJSON(list_trips)
+# trips_version() restarts with the process, so filtered ETags also carry a boot token.
+_BOOT = secrets.token_hex(8)
+
+
 @router.get("", response_model=list[Trip])
-def get_trips():
-    return list_trips()
+async def get_trips(
+    request: Request,
+    from_station: Annotated[
+        str | None, Query(alias="from", min_length=2, max_length=STATION_CODE_MAX_LENGTH)
+    ] = None,
+    to_station: Annotated[
+        str | None, Query(alias="to", min_length=2, max_length=STATION_CODE_MAX_LENGTH)
+    ] = None,
+    after: Annotated[datetime | None, Query(description="Earliest departure (inclusive).")] = None,
+    before: Annotated[datetime | None, Query(description="Latest departure (exclusive).")] = None,
+):
+    version = trips_version()
+    max_age = settings.static_cache_max_age_s
+    if from_station is None and to_station is None and after is None and before is None:
+        body, etag = _TRIPS_JSON.get(version)
+        return etag_response(request, etag, body, max_age)
+
+    frm = from_station.upper() if from_station else None
+    to = to_station.upper() if to_station else None
+    # Derived from the version and the filters only, so a revalidation never runs the query.
+    filtered_etag = strong_etag(f"{_BOOT}|{version}|{frm}|{to}|{after}|{before}".encode())
+    return etag_response(
+        request, filtered_etag, lambda: to_json(list_trips(frm, to, after, before)), max_age
+    )
+
+
+_EXPORT_COLUMNS = tuple(Trip.model_fields)
+
+
+def _export_row(trip: Trip) -> tuple:
+    return tuple(
+        utc_timestamp(value) if isinstance(value, datetime) else value
+        for value in trip.model_dump().values()
+    )
+
+
+@router.get("/export")
+async def export(
+    from_station: Annotated[
+        str | None, Query(alias="from", min_length=2, max_length=STATION_CODE_MAX_LENGTH)
+    ] = None,
+    to_station: Annotated[
+        str | None, Query(alias="to", min_length=2, max_length=STATION_CODE_MAX_LENGTH)
+    ] = None,
+    after: Annotated[datetime | None, Query(description="Earliest departure (inclusive).")] = None,
+    before: Annotated[datetime | None, Query(description="Latest departure (exclusive).")] = None,
+    fmt: Annotated[
+        str, Query(alias="format", pattern=f"^({'|'.join(EXPORT_FORMATS)})$")
+    ] = "ndjson",
+):
+    """Trips by departure, streamed as NDJSON or CSV."""
+    frm = from_station.upper() if from_station else None
+    to = to_station.upper() if to_station else None
+    chunks = iter_trips(frm, to, after, before, settings.export_chunk_size)
+    return export_response(chunks, fmt, _EXPORT_COLUMNS, _export_row)
+
+
+# Sync on purpose: the first call may restore bookings from the storage backend.
+@router.get("/{trip_id}/availability", response_model=SeatAvailability)
+def availability(trip_id: str):
+    try:
+        return seat_availability(trip_id)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e)) from e
@@ -0,0 +1,141 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Hashable
+from concurrent.futures import Future
+from typing import Generic, TypeVar
+
+V = TypeVar("V")
+
+
+class TTLCache(Generic[V]):
+    """
+    Thread-safe bounded LRU cache whose entries also expire after ttl_s seconds.
+
+    A maxsize of 0 disables caching entirely (every get is a miss, put is a no-op).
+    """
+
+    def __init__(self, maxsize: int, ttl_s: float) -> None:
+        self.maxsize = maxsize
+        self.ttl_s = ttl_s
+        self._data: OrderedDict[Hashable, tuple[float, V]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: Hashable) -> V | None:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, value = entry
+            if expires_at <= now:
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value: V) -> None:
+        if self.maxsize <= 0:
+            return
+        expires_at = time.monotonic() + self.ttl_s
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict[str, int | float]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl_s": self.ttl_s,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+            }
+
+
+class IdempotencyKeyReused(ValueError):
+    """An idempotency key came back with a different request."""
+
+
+def _check_fingerprint(first: Hashable, again: Hashable) -> None:
+    if first != again:
+        raise IdempotencyKeyReused("Idempotency key was already used for another request.")
+
+
+class IdempotencyCache(Generic[V]):
+    """
+    Runs each keyed operation at most once while its result is cached.
+
+    Completed results are kept in a TTLCache along with a fingerprint of the
+    request that produced them; a repeat of the key gets the stored result
+    instead of running again. Repeats that arrive while the first call is
+    still running wait for its outcome. Failures are handed to the callers
+    already waiting but not cached, so a later retry runs again.
+    """
+
+    def __init__(self, maxsize: int, ttl_s: float) -> None:
+        self._done: TTLCache[tuple[Hashable, V]] = TTLCache(maxsize, ttl_s)
+        self._running: dict[Hashable, tuple[Hashable, Future]] = {}
+        self._lock = threading.Lock()
+
+    def run(self, key: Hashable, fingerprint: Hashable, fn: Callable[[], V]) -> tuple[V, bool]:
+        """
+        (result, replayed): fn() for a new key, else the result of the call
+        that first used it. Raises IdempotencyKeyReused when fingerprint does
+        not match that call's.
+        """
+        with self._lock:
+            done = self._done.get(key)
+            running = self._running.get(key) if done is None else None
+            if done is None and running is None:
+                future: Future = Future()
+                self._running[key] = (fingerprint, future)
+
+        if done is not None:
+            first_fingerprint, result = done
+            _check_fingerprint(first_fingerprint, fingerprint)
+            return result, True
+        if running is not None:
+            first_fingerprint, pending = running
+            _check_fingerprint(first_fingerprint, fingerprint)
+            return pending.result(), True
+
+        try:
+            result = fn()
+        except BaseException as exc:
+            with self._lock:
+                del self._running[key]
+            future.set_exception(exc)
+            raise
+        with self._lock:
+            self._done.put(key, (fingerprint, result))
+            del self._running[key]
+        future.set_result(result)
+        return result, False
+
+    def clear(self) -> None:
+        self._done.clear()
@@ -1,7 +1,144 @@
-from dataclasses import dataclass
+import json
+import os
+from dataclasses import MISSING, dataclass, fields
+
+
+def _coerce(raw: str, default):
+    if isinstance(default, bool):
+        return raw.strip().lower() in {"1", "true", "yes", "on"}
+    if isinstance(default, tuple):
+        # Tables are JSON lists of rows, e.g. '[[0, 1.0], [500, 0.8]]'
+        return tuple(tuple(row) for row in json.loads(raw))
+    return type(default)(raw)
+
+
+def _check_bands(name: str, bands: tuple, limit: float) -> None:
+    starts = [start for start, _ in bands]
+    if not bands or starts[0] != 0 or starts != sorted(set(starts)) or starts[-1] >= limit:
+        raise ValueError(f"{name} must start at 0 with increasing band starts.")
+    if any(multiplier <= 0 for _, multiplier in bands):
+        raise ValueError(f"{name} multipliers must be positive.")
+
+
+ROUTING_ALGORITHMS = ("dijkstra", "astar", "ch")
+STORAGE_BACKENDS = ("memory", "sql", "journal")
+LOG_FORMATS = ("text", "json")
+
 
 @dataclass(frozen=True)
 class Settings:
     fare_per_km: int = 2
+    # Fare tables (app/services/pricing.py), JSON in the environment:
+    # distance bands taper the per-km rate along a journey, as (from_km, multiplier
+    # of fare_per_km); classes multiply the whole fare, the first being the default;
+    # time-of-day bands, as (from_hour, multiplier), apply to trips by departure hour
+    # in UTC + fare_utc_offset_minutes
+    fare_distance_tiers: tuple[tuple[int, float], ...] = ((0, 1.0),)
+    fare_classes: tuple[tuple[str, float], ...] = (
+        ("second", 1.0),
+        ("sleeper", 1.5),
+        ("ac3", 2.5),
+        ("ac2", 3.5),
+        ("first", 5.0),
+    )
+    fare_time_of_day: tuple[tuple[int, float], ...] = ((0, 1.0),)
+    fare_utc_offset_minutes: int = 0
+
+    # Logging (app/core/logging.py): level, "text" or "json" lines, and the
+    # fraction of successful requests that get an access log line
+    log_level: str = "INFO"
+    log_format: str = "text"
+    access_log_sample_rate: float = 1.0
+
+    # Binary network snapshot (app/data/snapshot.py) to mmap instead of the
+    # built-in sample network; when the watch interval is > 0 the file is
+    # polled and hot-swapped in whenever it is replaced
+    network_snapshot_path: str = ""
+    network_watch_interval_s: float = 0.0
+
+    # Route result cache (0 disables it)
+    route_cache_size: int = 1024
+    route_cache_ttl_s: float = 300.0
+
+    # "dijkstra", "astar" (bidirectional A* on station coordinates, see
+    # app/services/astar.py) or "ch" (contraction hierarchy, app/services/hierarchy.py)
+    routing_algorithm: str = "dijkstra"
+    # Prebuilt hierarchy file; built in-process on first use when unset or stale
+    ch_index_path: str = ""
+
+    # /route?alternatives=K (app/services/alternatives.py): the largest K accepted,
+    # and the settled-node budget shared by all of one request's searches
+    route_max_alternatives: int = 5
+    route_alternatives_max_settled: int = 200_000
+
+    # CPU-heavy routing runs off the event loop: in this many worker processes, or
+    # in the thread pool when 0. Jobs beyond the queue limit get 503, slow ones 504.
+    routing_workers: int = 0
+    routing_queue_limit: int = 64
+    routing_timeout_s: float = 10.0
+
+    # Profiling (app/core/profiling.py): when enabled, requests sent with
+    # "X-Profile: 1" are cProfiled (last profiling_keep kept) and the profiling
+    # endpoints under /admin are served. /admin/* and X-Profile both require
+    # a matching X-Admin-Token header, so nothing is served without admin_token
+    profiling_enabled: bool = False
+    profiling_keep: int = 20
+    admin_token: str = ""
+
+    # Cache-Control max-age for ETag'd listings (/stations, /trips)
+    static_cache_max_age_s: int = 60
+    # Records serialized per chunk by the /bookings/export and /trips/export streams
+    export_chunk_size: int = 1000
+
+    # Journey planner: minimum time to change trains at a station
+    min_transfer_minutes: int = 5
+
+    # Lock stripes guarding per-trip seat counters
+    inventory_lock_stripes: int = 64
+
+    # POST /bookings with an Idempotency-Key header: how many completed keys are
+    # remembered (per process), and for how long
+    idempotency_cache_size: int = 10_000
+    idempotency_ttl_s: float = 86_400.0
+    # Largest group accepted by POST /bookings/bulk, in items and in body bytes
+    bulk_booking_max_items: int = 5_000
+    bulk_booking_max_bytes: int = 4 * 1024 * 1024
+
+    # Durable storage for trips and bookings: "memory" (none), "sql" or "journal"
+    storage_backend: str = "memory"
+    database_url: str = "sqlite:///./railway.db"
+    database_pool_size: int = 5
+    database_max_overflow: int = 10
+    # Create missing tables on startup; production runs `alembic upgrade head` instead
+    database_create_schema: bool = True
+    # Journal backend: directory for journal + snapshot, records between compactions
+    journal_dir: str = "./data"
+    journal_snapshot_every: int = 10_000
+    journal_fsync: bool = True
+
+    def __post_init__(self) -> None:
+        if self.routing_algorithm not in ROUTING_ALGORITHMS:
+            raise ValueError(f"Unknown routing_algorithm {self.routing_algorithm!r}.")
+        if self.storage_backend not in STORAGE_BACKENDS:
+            raise ValueError(f"Unknown storage_backend {self.storage_backend!r}.")
+        if self.log_format not in LOG_FORMATS:
+            raise ValueError(f"Unknown log_format {self.log_format!r}.")
+        if not 0.0 <= self.access_log_sample_rate <= 1.0:
+            raise ValueError("access_log_sample_rate must be between 0 and 1.")
+        _check_bands("fare_distance_tiers", self.fare_distance_tiers, float("inf"))
+        _check_bands("fare_time_of_day", self.fare_time_of_day, 24)
+        if not self.fare_classes or any(multiplier <= 0 for _, multiplier in self.fare_classes):
+            raise ValueError("fare_classes must be non-empty with positive multipliers.")
+
+    @classmethod
+    def from_env(cls) -> "Settings":
+        """Build settings, letting FIELD_NAME env vars override scalar defaults."""
+        overrides = {}
+        for f in fields(cls):
+            raw = os.getenv(f.name.upper())
+            if raw is not None and f.default is not MISSING:
+                overrides[f.name] = _coerce(raw, f.default)
+        return cls(**overrides)
+
 
-settings = Settings()
+settings = Settings.from_env()
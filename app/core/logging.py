@@ -1,19 +1,33 @@
 from __future__ import annotations
 
+import atexit
+import json
 import logging
-import os
-from contextvars import ContextVar
+import logging.handlers
+import queue
+from contextvars import ContextVar, Token
+
+from app.core.config import settings
 
 # Context variable to carry request id across async calls
 _request_id_ctx: ContextVar[str] = ContextVar("request_id", default="-")
 
+TEXT_FORMAT = "%(asctime)s %(levelname)s [%(request_id)s] %(name)s: %(message)s"
+
+_LISTENER: logging.handlers.QueueListener | None = None
+_HANDLER: logging.Handler | None = None
+
 
 def get_request_id() -> str:
     return _request_id_ctx.get()
 
 
-def set_request_id(request_id: str) -> None:
-    _request_id_ctx.set(request_id)
+def set_request_id(request_id: str) -> Token[str]:
+    return _request_id_ctx.set(request_id)
+
+
+def reset_request_id(token: Token[str]) -> None:
+    _request_id_ctx.reset(token)
 
 
 class RequestIdFilter(logging.Filter):
@@ -23,23 +37,70 @@ class RequestIdFilter(logging.Filter):
         return True
 
 
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: ts, level, logger, request_id, msg (+ exc)."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "request_id": getattr(record, "request_id", "-"),
+            "msg": record.getMessage(),
+        }
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False)
+
+
 def configure_logging() -> None:
     """
-    Simple structured-ish logging using standard logging.
-    Adds request_id to every log line via a logging Filter.
+    Queue-based logging: request handlers only enqueue records, and a
+    background QueueListener thread formats and writes them to stderr.
 
-    Env vars:
+    request_id is stamped onto each record by the QueueHandler's filter, i.e.
+    in the thread that logged it, before the contextvar is out of reach.
+
+    Settings (env vars):
       - LOG_LEVEL (default: INFO)
+      - LOG_FORMAT: "text" (default) or "json"
+    Safe to call more than once; later calls replace the pipeline.
     """
-    level_str = os.getenv("LOG_LEVEL", "INFO").upper()
-    level = getattr(logging, level_str, logging.INFO)
+    global _LISTENER, _HANDLER
+    level = getattr(logging, settings.log_level.upper(), logging.INFO)
+
+    output = logging.StreamHandler()
+    if settings.log_format == "json":
+        output.setFormatter(JsonFormatter())
+    else:
+        output.setFormatter(logging.Formatter(TEXT_FORMAT))
 
-    # NOTE: keep it plain and reliable; works locally + in containers
-    logging.basicConfig(
-        level=level,
-        format="%(asctime)s %(levelname)s [%(request_id)s] %(name)s: %(message)s",
-    )
+    records: queue.SimpleQueue[logging.LogRecord] = queue.SimpleQueue()
+    enqueue = logging.handlers.QueueHandler(records)
+    # On the handler, not the root logger: logger filters don't see records
+    # propagated from child loggers such as railway.*.
+    enqueue.addFilter(RequestIdFilter())
 
-    # Attach filter to root logger so all loggers inherit it
     root = logging.getLogger()
-    root.addFilter(RequestIdFilter())
+    if _HANDLER is not None:
+        root.removeHandler(_HANDLER)
+    shutdown_logging()
+    root.addHandler(enqueue)
+    root.setLevel(level)
+    _HANDLER = enqueue
+
+    _LISTENER = logging.handlers.QueueListener(records, output)
+    _LISTENER.start()
+
+
+def shutdown_logging() -> None:
+    """Flush queued records and stop the listener thread."""
+    global _LISTENER
+    if _LISTENER is not None:
+        _LISTENER.stop()
+        _LISTENER = None
+
+
+atexit.register(shutdown_logging)
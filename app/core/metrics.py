@@ -0,0 +1,265 @@
+from __future__ import annotations
+
+import math
+import threading
+from bisect import bisect_left
+from collections.abc import Callable, Iterable, Sequence
+
+Labels = tuple[str, ...]
+
+# Seconds; roughly doubling from 1 ms to 10 s.
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_str(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{n}="{_escape(v)}"' for n, v in zip(names, values, strict=True)) + "}"
+
+
+class _Sharded:
+    """
+    Per-thread storage for a metric.
+
+    Each thread writes only its own shard (a plain dict), so updating a metric
+    takes no lock; the registry lock is taken once per thread, when its shard
+    is created. Scrapes copy every shard (dict.copy is atomic under the GIL)
+    and sum them. Shards outlive their threads so counts are never lost.
+    """
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str]) -> None:
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._local = threading.local()
+        self._shards: list[dict] = []
+        self._lock = threading.Lock()
+
+    def _shard(self) -> dict:
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard: dict = {}
+            with self._lock:
+                self._shards.append(shard)
+            self._local.shard = shard
+            return shard
+
+    def _copies(self) -> list[dict]:
+        with self._lock:
+            shards = list(self._shards)
+        return [shard.copy() for shard in shards]
+
+    def reset(self) -> None:
+        with self._lock:
+            shards = list(self._shards)
+        for shard in shards:
+            shard.clear()
+
+
+class Counter(_Sharded):
+    kind = "counter"
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        shard = self._shard()
+        shard[labels] = shard.get(labels, 0) + amount
+
+    def values(self) -> dict[Labels, float]:
+        total: dict[Labels, float] = {}
+        for shard in self._copies():
+            for labels, value in shard.items():
+                total[labels] = total.get(labels, 0) + value
+        return total
+
+    def render(self) -> Iterable[str]:
+        for labels, value in sorted(self.values().items()):
+            yield f"{self.name}{_label_str(self.labelnames, labels)} {_format_value(value)}"
+
+    def drain(self) -> dict[Labels, float]:
+        values = self.values()
+        self.reset()
+        return values
+
+    def merge(self, values: dict[Labels, float]) -> None:
+        for labels, value in values.items():
+            self.inc(*labels, amount=value)
+
+
+class Histogram(_Sharded):
+    kind = "histogram"
+
+    def __init__(
+        self, name: str, help: str, labelnames: Sequence[str], buckets: Sequence[float]
+    ) -> None:
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, *labels: str) -> None:
+        shard = self._shard()
+        # [count per bucket (last one is +Inf)..., sum]
+        state = shard.get(labels)
+        if state is None:
+            state = shard[labels] = [0] * (len(self.buckets) + 2)
+        state[bisect_left(self.buckets, value)] += 1
+        state[-1] += value
+
+    def values(self) -> dict[Labels, list[float]]:
+        total: dict[Labels, list[float]] = {}
+        for shard in self._copies():
+            for labels, state in shard.items():
+                acc = total.setdefault(labels, [0] * len(state))
+                for i, v in enumerate(state):
+                    acc[i] += v
+        return total
+
+    def render(self) -> Iterable[str]:
+        names = (*self.labelnames, "le")
+        for labels, state in sorted(self.values().items()):
+            cumulative = 0
+            for bound, count in zip((*self.buckets, math.inf), state[:-1], strict=True):
+                cumulative += count
+                le = _format_value(bound)
+                yield f"{self.name}_bucket{_label_str(names, (*labels, le))} {cumulative}"
+            label_str = _label_str(self.labelnames, labels)
+            yield f"{self.name}_sum{label_str} {_format_value(state[-1])}"
+            yield f"{self.name}_count{label_str} {cumulative}"
+
+    def drain(self) -> dict[Labels, list[float]]:
+        values = self.values()
+        self.reset()
+        return values
+
+    def merge(self, values: dict[Labels, list[float]]) -> None:
+        shard = self._shard()
+        for labels, state in values.items():
+            acc = shard.get(labels)
+            if acc is None:
+                acc = shard[labels] = [0] * len(state)
+            for i, v in enumerate(state):
+                acc[i] += v
+
+
+class Gauge:
+    """Read at scrape time from a callback, so it costs nothing in between."""
+
+    kind = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str],
+        collect: Callable[[], Iterable[tuple[Labels, float]]],
+    ) -> None:
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._collect = collect
+
+    def render(self) -> Iterable[str]:
+        for labels, value in self._collect():
+            yield f"{self.name}{_label_str(self.labelnames, labels)} {_format_value(value)}"
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: dict[str, Counter | Histogram | Gauge] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name!r} already registered.")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, help, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ) -> Histogram:
+        return self._register(Histogram(name, help, labelnames, buckets))
+
+    def gauge(
+        self,
+        name: str,
+        help: str,
+        collect: Callable[[], Iterable[tuple[Labels, float]]],
+        labelnames: Sequence[str] = (),
+    ) -> Gauge:
+        return self._register(Gauge(name, help, labelnames, collect))
+
+    def render(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)."""
+        lines: list[str] = []
+        with self._lock:
+            metrics = list(self._metrics.values())
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def drain(self) -> dict[str, dict]:
+        """
+        Take and reset every counter/histogram value, so a routing worker
+        process can ship its numbers to the parent. Not atomic with respect
+        to concurrent updates; workers run one call at a time.
+        """
+        with self._lock:
+            metrics = [m for m in self._metrics.values() if not isinstance(m, Gauge)]
+        return {m.name: drained for m in metrics if (drained := m.drain())}
+
+    def merge(self, drained: dict[str, dict]) -> None:
+        for name, values in drained.items():
+            metric = self._metrics.get(name)
+            if metric is not None and not isinstance(metric, Gauge):
+                metric.merge(values)
+
+
+REGISTRY = Registry()
+
+HTTP_REQUESTS = REGISTRY.counter(
+    "railway_http_requests_total",
+    "HTTP requests by route template, method and status.",
+    ("route", "method", "status"),
+)
+HTTP_LATENCY = REGISTRY.histogram(
+    "railway_http_request_duration_seconds",
+    "HTTP request latency by route template and method.",
+    ("route", "method"),
+)
+ROUTE_SETTLED = REGISTRY.histogram(
+    "railway_route_settled_nodes",
+    "Nodes settled per shortest-path search.",
+    buckets=(1, 10, 100, 1_000, 10_000, 100_000, 1_000_000),
+)
+ROUTE_HEAP_PUSHES = REGISTRY.histogram(
+    "railway_route_heap_pushes",
+    "Priority-queue pushes per shortest-path search.",
+    buckets=(1, 10, 100, 1_000, 10_000, 100_000, 1_000_000),
+)
+ROUTE_PATH_EDGES = REGISTRY.histogram(
+    "railway_route_path_edges",
+    "Edges in each computed shortest path.",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256),
+)
+BOOKINGS = REGISTRY.counter("railway_bookings_total", "Booking attempts by outcome.", ("outcome",))
+BOOKED_SEATS = REGISTRY.counter("railway_booked_seats_total", "Seats in confirmed bookings.")
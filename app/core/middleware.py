@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+import logging
+import random
+import time
+import uuid
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.logging import reset_request_id, set_request_id
+from app.core.metrics import HTTP_LATENCY, HTTP_REQUESTS
+
+logger = logging.getLogger("railway")
+
+_HEADER = b"x-request-id"
+# Incoming ids longer than this are replaced rather than echoed into logs.
+MAX_REQUEST_ID_LENGTH = 128
+
+
+class RequestContextMiddleware:
+    """
+    Pure ASGI request-ID + access-log middleware.
+
+    Unlike @app.middleware("http") (BaseHTTPMiddleware) it builds no Request or
+    Response objects and runs no extra task per request: it only reads the
+    X-Request-ID header from the scope, appends it to the response start
+    message and times the call, which feeds both the latency/status metrics
+    (labelled by route template, so path parameters don't explode the label
+    set) and the access log. Successful requests are access-logged with
+    probability sample_rate; 5xx responses are always logged.
+    """
+
+    def __init__(self, app: ASGIApp, sample_rate: float = 1.0) -> None:
+        self.app = app
+        self.sample_rate = sample_rate
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = ""
+        for name, value in scope["headers"]:
+            if name == _HEADER:
+                request_id = value.decode("latin-1")
+                break
+        if not request_id or len(request_id) > MAX_REQUEST_ID_LENGTH:
+            request_id = uuid.uuid4().hex
+        token = set_request_id(request_id)
+
+        status = 500
+        header = (_HEADER, request_id.encode("latin-1"))
+
+        async def send_with_request_id(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message["headers"] = [*message.get("headers", ()), header]
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_request_id)
+        finally:
+            elapsed = time.perf_counter() - start
+            method = scope["method"]
+            # The router stores the matched route in the scope on the way in.
+            route = scope.get("route")
+            template = getattr(route, "path", "unmatched")
+            HTTP_REQUESTS.inc(template, method, str(status))
+            HTTP_LATENCY.observe(elapsed, template, method)
+            if status >= 500 or self.sample_rate >= 1.0 or random.random() < self.sample_rate:
+                logger.info(
+                    "request completed method=%s path=%s status=%s duration_ms=%.2f",
+                    method,
+                    scope["path"],
+                    status,
+                    elapsed * 1000.0,
+                )
+            reset_request_id(token)
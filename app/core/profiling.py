@@ -0,0 +1,261 @@
+from __future__ import annotations
+
+import cProfile
+import io
+import logging
+import marshal
+import pstats
+import secrets
+import sys
+import threading
+import time
+from collections import Counter, OrderedDict
+from collections.abc import Callable
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import TypeVar
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+
+logger = logging.getLogger("railway.profiling")
+
+T = TypeVar("T")
+
+PROFILE_HEADER = b"x-profile"
+ADMIN_TOKEN_HEADER = b"x-admin-token"
+
+# Stats from work the profiled request handed to other threads/processes
+# (routing pool), merged into its profile when the request ends.
+_offloaded: ContextVar[list[dict] | None] = ContextVar("profile_offloaded", default=None)
+
+
+@dataclass(frozen=True)
+class RequestProfile:
+    profile_id: str
+    method: str
+    path: str
+    status: int
+    duration_ms: float
+    created_at: float
+    stats: bytes  # marshal'd pstats dict, i.e. the content of a .pstats file
+
+    def text(self, limit: int = 40) -> str:
+        out = io.StringIO()
+        stats = pstats.Stats(_RawStats(marshal.loads(self.stats)), stream=out)
+        stats.sort_stats("cumulative").print_stats(limit)
+        return out.getvalue()
+
+
+class _RawStats:
+    """Adapter so pstats.Stats accepts an already-collected stats dict."""
+
+    def __init__(self, stats: dict) -> None:
+        self.stats = stats
+
+    def create_stats(self) -> None:
+        pass
+
+
+class ProfileStore:
+    """The most recent `keep` request profiles, by id."""
+
+    def __init__(self, keep: int = 20) -> None:
+        self.keep = keep
+        self._profiles: OrderedDict[str, RequestProfile] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, profile: RequestProfile) -> None:
+        with self._lock:
+            self._profiles[profile.profile_id] = profile
+            while len(self._profiles) > self.keep:
+                self._profiles.popitem(last=False)
+
+    def get(self, profile_id: str) -> RequestProfile | None:
+        with self._lock:
+            return self._profiles.get(profile_id)
+
+    def list(self) -> list[RequestProfile]:
+        with self._lock:
+            return list(reversed(self._profiles.values()))
+
+
+PROFILES = ProfileStore(settings.profiling_keep)
+
+
+def profiling_active() -> bool:
+    return _offloaded.get() is not None
+
+
+def profiled_call(fn: Callable[..., T], *args) -> tuple[T, dict]:
+    """
+    Run fn under cProfile; returns (result, pstats dict). Picklable for process pools.
+
+    From Python 3.12 cProfile is process-wide, so in a thread of a process that
+    is already being profiled a second profiler can't start; fn then runs
+    unprofiled with empty stats, as the active profiler already records it.
+    """
+    prof = cProfile.Profile()
+    try:
+        prof.enable()
+    except ValueError:
+        return fn(*args), {}
+    try:
+        result = fn(*args)
+    finally:
+        prof.disable()
+    prof.create_stats()
+    return result, prof.stats
+
+
+def add_offloaded_stats(stats: dict) -> None:
+    collected = _offloaded.get()
+    if collected is not None and stats:
+        collected.append(stats)
+
+
+class ProfilingMiddleware:
+    """
+    Profiles single requests that carry an `X-Profile: 1` header and a valid
+    X-Admin-Token; without a configured admin token nothing is profiled.
+
+    cProfile hooks the whole event-loop thread, so the profile also contains
+    whatever else the loop ran meanwhile; only one request is profiled at a
+    time (others pass through unprofiled). Work sent to the routing pool is
+    profiled where it runs and merged in. The response carries X-Profile-Id;
+    the dump is downloadable from /admin/profiles/{id}.
+    """
+
+    def __init__(
+        self, app: ASGIApp, store: ProfileStore = PROFILES, admin_token: str | None = None
+    ) -> None:
+        self.app = app
+        self.store = store
+        token = settings.admin_token if admin_token is None else admin_token
+        self._admin_token = token.encode()
+        self._busy = threading.Lock()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not any(
+            name == PROFILE_HEADER and value.strip() in (b"1", b"true")
+            for name, value in scope["headers"]
+        ):
+            await self.app(scope, receive, send)
+            return
+        if not self._authorized(scope):
+            denied = self._with_headers(send, [(b"x-profile-status", b"unauthorized")])
+            await self.app(scope, receive, denied)
+            return
+        if not self._busy.acquire(blocking=False):
+            busy = self._with_headers(send, [(b"x-profile-status", b"busy")])
+            await self.app(scope, receive, busy)
+            return
+
+        profile_id = secrets.token_hex(8)
+        status = 500
+        collected: list[dict] = []
+        token = _offloaded.set(collected)
+        prof = cProfile.Profile()
+
+        async def send_tracking_status(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        wrapped = self._with_headers(send_tracking_status, [(b"x-profile-id", profile_id.encode())])
+        start = time.perf_counter()
+        try:
+            prof.enable()
+            try:
+                await self.app(scope, receive, wrapped)
+            finally:
+                prof.disable()
+        finally:
+            _offloaded.reset(token)
+            self._busy.release()
+            duration_ms = (time.perf_counter() - start) * 1000.0
+            prof.create_stats()
+            stats = pstats.Stats(prof)
+            for extra in collected:
+                stats.add(_RawStats(extra))
+            self.store.add(
+                RequestProfile(
+                    profile_id=profile_id,
+                    method=scope["method"],
+                    path=scope["path"],
+                    status=status,
+                    duration_ms=duration_ms,
+                    created_at=time.time(),
+                    stats=marshal.dumps(stats.stats),
+                )
+            )
+            logger.info(
+                "request_profiled profile_id=%s path=%s duration_ms=%.2f",
+                profile_id,
+                scope["path"],
+                duration_ms,
+            )
+
+    def _authorized(self, scope: Scope) -> bool:
+        if not self._admin_token:
+            return False
+        given = next((v for n, v in scope["headers"] if n == ADMIN_TOKEN_HEADER), b"")
+        return secrets.compare_digest(given, self._admin_token)
+
+    @staticmethod
+    def _with_headers(send: Send, extra: list[tuple[bytes, bytes]]) -> Send:
+        async def wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                message["headers"] = [*message.get("headers", ()), *extra]
+            await send(message)
+
+        return wrapper
+
+
+# --- whole-process sampling profiler ---
+
+_SAMPLER_BUSY = threading.Lock()
+
+
+class ProfilerBusy(RuntimeError):
+    """A sampling run is already in progress."""
+
+
+def _stack_of(frame) -> str:
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({code.co_filename}:{code.co_firstlineno})")
+        frame = frame.f_back
+    names.reverse()
+    return ";".join(names)
+
+
+def sample_stacks(seconds: float, interval_s: float = 0.005) -> str:
+    """
+    Sample every thread's stack for `seconds` and return them in collapsed
+    ("folded") format, one `thread;outer;...;inner count` line per distinct
+    stack, which flamegraph.pl and speedscope read directly.
+    """
+    if not _SAMPLER_BUSY.acquire(blocking=False):
+        raise ProfilerBusy("A sampling profile is already running.")
+    try:
+        me = threading.get_ident()
+        counts: Counter[str] = Counter()
+        deadline = time.monotonic() + seconds
+        samples = 0
+        while time.monotonic() < deadline:
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                counts[f"{names.get(ident, ident)};{_stack_of(frame)}"] += 1
+            samples += 1
+            time.sleep(interval_s)
+    finally:
+        _SAMPLER_BUSY.release()
+
+    logger.info("stacks_sampled seconds=%s samples=%s stacks=%s", seconds, samples, len(counts))
+    return "".join(f"{stack} {count}\n" for stack, count in counts.most_common())
@@ -0,0 +1,138 @@
+from __future__ import annotations
+
+import csv
+import hashlib
+import io
+import threading
+from collections.abc import Callable, Hashable, Iterable, Iterator, Sequence
+from datetime import datetime, timezone
+from typing import Any
+
+import pydantic_core
+from fastapi import Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
+
+# Set on responses computed from the routing network: the graph version used.
+NETWORK_VERSION_HEADER = "X-Network-Version"
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+EXPORT_FORMATS = ("ndjson", "csv")
+
+
+def to_json(content: Any, exclude_none: bool = False) -> bytes:
+    """Serialize models, lists and dicts straight to bytes with pydantic's Rust encoder."""
+    return pydantic_core.to_json(content, by_alias=True, exclude_none=exclude_none)
+
+
+def to_ndjson(items: Iterable[Any], exclude_none: bool = False) -> bytes:
+    """One JSON document per line."""
+    return b"".join(to_json(item, exclude_none=exclude_none) + b"\n" for item in items)
+
+
+def utc_timestamp(dt: datetime) -> str:
+    """ISO 8601 in UTC with a Z suffix, as the JSON responses write datetimes."""
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc)
+    return dt.replace(tzinfo=None).isoformat() + "Z"
+
+
+def _csv_lines(rows: Iterable[Sequence[Any]]) -> bytes:
+    buf = io.StringIO()
+    csv.writer(buf, lineterminator="\n").writerows(rows)
+    return buf.getvalue().encode()
+
+
+def export_response(
+    chunks: Iterator[Sequence[Any]],
+    fmt: str,
+    columns: Sequence[str],
+    row: Callable[[Any], Sequence[Any]],
+) -> StreamingResponse:
+    """
+    Stream chunks of models as NDJSON, or as CSV with `columns` as the header
+    and row(item) per line. Chunks are pulled and serialized one at a time
+    (in the thread pool), so memory stays at one chunk whatever the total.
+    """
+    if fmt == "csv":
+
+        def body() -> Iterator[bytes]:
+            yield _csv_lines([columns])
+            for chunk in chunks:
+                yield _csv_lines(row(item) for item in chunk)
+
+        return StreamingResponse(body(), media_type="text/csv; charset=utf-8")
+    return StreamingResponse((to_ndjson(chunk) for chunk in chunks), media_type=NDJSON_MEDIA_TYPE)
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSONResponse that renders pydantic models directly.
+
+    Handlers return it to skip FastAPI's response_model round trip (validate,
+    jsonable_encoder, json.dumps); response_model stays on the route for the
+    OpenAPI schema. Models are dumped by alias, as response_model would.
+    """
+
+    def __init__(self, content: Any, exclude_none: bool = False, **kwargs) -> None:
+        self.exclude_none = exclude_none
+        super().__init__(content, **kwargs)
+
+    def render(self, content: Any) -> bytes:
+        return to_json(content, exclude_none=self.exclude_none)
+
+
+def strong_etag(body: bytes) -> str:
+    return '"' + hashlib.blake2b(body, digest_size=12).hexdigest() + '"'
+
+
+class PrecomputedJSON:
+    """
+    A JSON payload serialized once per data version.
+
+    build(*args) is only called when the version changes; between changes
+    every request gets the same bytes and strong ETag.
+    """
+
+    def __init__(self, build: Callable[..., Any]) -> None:
+        self._build = build
+        self._lock = threading.Lock()
+        self._version: Hashable | None = None
+        self._payload: tuple[bytes, str] = (b"", "")
+
+    def get(self, version: Hashable, *args: Any) -> tuple[bytes, str]:
+        if self._version == version:
+            return self._payload
+        with self._lock:
+            if self._version != version:
+                body = to_json(self._build(*args))
+                self._payload = (body, strong_etag(body))
+                self._version = version
+            return self._payload
+
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    # If-None-Match uses weak comparison, so W/"x" matches "x".
+    candidates = {tag.strip().removeprefix("W/") for tag in header.split(",")}
+    return "*" in candidates or etag in candidates
+
+
+def etag_response(
+    request: Request,
+    etag: str,
+    body: Callable[[], bytes] | bytes,
+    max_age_s: int,
+    headers: dict[str, str] | None = None,
+) -> Response:
+    """
+    304 when the client already holds this ETag, otherwise the JSON body.
+
+    body may be a callable so that a matching If-None-Match never builds it.
+    """
+    headers = {**(headers or {}), "ETag": etag, "Cache-Control": f"public, max-age={max_age_s}"}
+    if _etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    content = body() if callable(body) else body
+    return Response(content, media_type="application/json", headers=headers)
@@ -0,0 +1,270 @@
+from __future__ import annotations
+
+import hashlib
+import itertools
+import math
+import threading
+from array import array
+from collections import OrderedDict
+from collections.abc import Iterator, Mapping, Sequence
+from dataclasses import dataclass
+from types import MappingProxyType
+
+from app.core.config import settings
+from app.data.network import GRAPH, STATIONS
+from app.models.schemas import Edge, Station
+
+
+@dataclass(frozen=True)
+class CompiledGraph:
+    """
+    Integer-indexed, CSR-style view of the network.
+
+    Station codes are mapped to dense ids 0..n-1. The outgoing edges of node u
+    live in targets/km/line_ids[offsets[u]:offsets[u + 1]].
+    """
+
+    codes: tuple[str, ...]
+    index: dict[str, int]
+    offsets: Sequence[int]
+    targets: Sequence[int]
+    km: Sequence[int]
+    line_ids: Sequence[int]
+    lines: tuple[str, ...]
+    # (u, v) -> position of the cheapest u->v edge in the CSR arrays
+    edge_lookup: Mapping[tuple[int, int], int]
+    # Content digest; changes whenever stations, edges or lines change.
+    version: str
+    # Station details by code, one per node
+    stations: Mapping[str, Station]
+
+    @property
+    def node_count(self) -> int:
+        return len(self.codes)
+
+    @property
+    def edge_count(self) -> int:
+        return len(self.targets)
+
+
+class RowScanLookup(Mapping[tuple[int, int], int]):
+    """
+    edge_lookup without the per-edge dict: scans u's CSR row on each lookup.
+
+    Used for graphs loaded from a snapshot, where building the dict would
+    cost O(edges) time and memory per worker; rows are a few edges long.
+    """
+
+    def __init__(self, offsets: Sequence[int], targets: Sequence[int], km: Sequence[int]) -> None:
+        self._offsets = offsets
+        self._targets = targets
+        self._km = km
+
+    def __getitem__(self, key: tuple[int, int]) -> int:
+        u, v = key
+        if not 0 <= u < len(self._offsets) - 1:
+            raise KeyError(key)
+        targets, km = self._targets, self._km
+        best = -1
+        for pos in range(self._offsets[u], self._offsets[u + 1]):
+            if targets[pos] == v and (best < 0 or km[pos] < km[best]):
+                best = pos
+        if best < 0:
+            raise KeyError(key)
+        return best
+
+    def __iter__(self) -> Iterator[tuple[int, int]]:
+        for u in range(len(self._offsets) - 1):
+            seen: set[int] = set()
+            for pos in range(self._offsets[u], self._offsets[u + 1]):
+                v = self._targets[pos]
+                if v not in seen:
+                    seen.add(v)
+                    yield (u, v)
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+
+@dataclass(frozen=True)
+class ReverseGraph:
+    """Incoming edges of a CompiledGraph, CSR by target node."""
+
+    offsets: Sequence[int]
+    # for slot i of node v: the edge's source node and its position in the forward arrays
+    sources: Sequence[int]
+    positions: Sequence[int]
+
+
+def build_reverse_graph(g: CompiledGraph) -> ReverseGraph:
+    n = g.node_count
+    offsets, targets = g.offsets, g.targets
+    rev_offsets = [0] * (n + 1)
+    for v in targets:
+        rev_offsets[v + 1] += 1
+    rev_offsets = list(itertools.accumulate(rev_offsets))
+
+    fill = rev_offsets[:-1]
+    sources = [0] * g.edge_count
+    positions = [0] * g.edge_count
+    for u in range(n):
+        for pos in range(offsets[u], offsets[u + 1]):
+            slot = fill[targets[pos]]
+            fill[targets[pos]] = slot + 1
+            sources[slot] = u
+            positions[slot] = pos
+    return ReverseGraph(rev_offsets, sources, positions)
+
+
+_REVERSE: OrderedDict[str, ReverseGraph] = OrderedDict()
+_REVERSE_LOCK = threading.Lock()
+_KEEP_REVERSE = 2
+
+
+def get_reverse_graph(g: CompiledGraph) -> ReverseGraph:
+    """Reverse graph for g's version, built once per version."""
+    rev = _REVERSE.get(g.version)
+    if rev is not None:
+        return rev
+    with _REVERSE_LOCK:
+        rev = _REVERSE.get(g.version)
+        if rev is None:
+            rev = build_reverse_graph(g)
+            _REVERSE[g.version] = rev
+            while len(_REVERSE) > _KEEP_REVERSE:
+                _REVERSE.popitem(last=False)
+        return rev
+
+
+def graph_digest(
+    codes: Sequence[str],
+    names: Sequence[str],
+    lines: Sequence[str],
+    arrays: Sequence[array | memoryview],
+) -> str:
+    """Content digest used as CompiledGraph.version."""
+    digest = hashlib.blake2b(digest_size=8)
+    digest.update("\x1f".join(codes).encode())
+    digest.update("\x1f".join(names).encode())
+    digest.update("\x1f".join(lines).encode())
+    for arr in arrays:
+        digest.update(arr.tobytes())
+    return digest.hexdigest()
+
+
+def station_coords(codes: Sequence[str], stations: Mapping[str, Station]) -> array:
+    """lat, lon pairs per node as float64 (NaN where a station has no coordinates)."""
+    coords = array("d")
+    for code in codes:
+        station = stations[code]
+        has_coords = station.lat is not None and station.lon is not None
+        coords.extend((station.lat, station.lon) if has_coords else (math.nan, math.nan))
+    return coords
+
+
+def station_map(codes: Sequence[str], stations: Mapping[str, Station]) -> Mapping[str, Station]:
+    """Read-only code -> Station for every node; codes without details are named by code."""
+    return MappingProxyType(
+        {code: stations.get(code) or Station(code=code, name=code) for code in codes}
+    )
+
+
+def compile_graph(
+    graph: Mapping[str, list[Edge]], stations: Mapping[str, Station] | None = None
+) -> CompiledGraph:
+    stations = stations or {}
+    codes: list[str] = list(graph)
+    # Stations without edges are still listed.
+    codes.extend(code for code in stations if code not in graph)
+    index: dict[str, int] = {code: i for i, code in enumerate(codes)}
+
+    # Stations that only appear as edge targets still need an id.
+    for edges in graph.values():
+        for e in edges:
+            if e.to not in index:
+                index[e.to] = len(codes)
+                codes.append(e.to)
+
+    line_index: dict[str, int] = {}
+    offsets = array("i", [0])
+    targets = array("i")
+    km = array("i")
+    line_ids = array("i")
+    edge_lookup: dict[tuple[int, int], int] = {}
+
+    for u, code in enumerate(codes):
+        for e in graph.get(code, ()):
+            v = index[e.to]
+            pos = len(targets)
+            targets.append(v)
+            km.append(e.km)
+            line_ids.append(line_index.setdefault(e.line, len(line_index)))
+
+            # Parallel edges: routing always relaxes the cheapest one.
+            best = edge_lookup.get((u, v))
+            if best is None or e.km < km[best]:
+                edge_lookup[(u, v)] = pos
+        offsets.append(len(targets))
+
+    by_code = station_map(codes, stations)
+    names = [by_code[code].name for code in codes]
+    coords = station_coords(codes, by_code)
+    return CompiledGraph(
+        codes=tuple(codes),
+        index=index,
+        offsets=offsets,
+        targets=targets,
+        km=km,
+        line_ids=line_ids,
+        lines=tuple(line_index),
+        edge_lookup=edge_lookup,
+        version=graph_digest(
+            codes, names, list(line_index), (offsets, targets, km, line_ids, coords)
+        ),
+        stations=by_code,
+    )
+
+
+# The active network. Readers take the reference once per call and keep using
+# that graph; swap_compiled_graph replaces it in one assignment (see
+# app/services/network_service.py).
+_COMPILED: CompiledGraph | None = None
+_SWAP_LOCK = threading.Lock()
+
+
+def get_compiled_graph() -> CompiledGraph:
+    """
+    The active routing graph, built on first use: mmapped from the snapshot at
+    NETWORK_SNAPSHOT_PATH when set, otherwise compiled from network.GRAPH.
+    """
+    g = _COMPILED
+    if g is not None:
+        return g
+    with _SWAP_LOCK:
+        if _COMPILED is None:
+            if settings.network_snapshot_path:
+                from app.data.snapshot import load_snapshot
+
+                _swap(load_snapshot(settings.network_snapshot_path))
+            else:
+                _swap(compile_graph(GRAPH, STATIONS))
+        return _COMPILED
+
+
+def _swap(g: CompiledGraph) -> CompiledGraph | None:
+    global _COMPILED
+    previous, _COMPILED = _COMPILED, g
+    return previous
+
+
+def swap_compiled_graph(g: CompiledGraph) -> CompiledGraph | None:
+    """Make g the active graph; returns the one it replaced."""
+    with _SWAP_LOCK:
+        return _swap(g)
+
+
+def rebuild_compiled_graph() -> CompiledGraph:
+    """Recompile after network.GRAPH / STATIONS have been modified in place."""
+    g = compile_graph(GRAPH, STATIONS)
+    swap_compiled_graph(g)
+    return g
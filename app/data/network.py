@@ -15,12 +15,12 @@ GRAPH: dict[str, list[Edge]] = {
 }
 
 STATIONS: dict[str, Station] = {
-    "NDLS": Station(code="NDLS", name="New Delhi"),
-    "AGC":  Station(code="AGC", name="Agra Cantt"),
-    "GWL":  Station(code="GWL", name="Gwalior"),
-    "JP":   Station(code="JP", name="Jaipur"),
-    "BPL":  Station(code="BPL", name="Bhopal"),
-    "NGP":  Station(code="NGP", name="Nagpur"),
-    "ADI":  Station(code="ADI", name="Ahmedabad"),
-    "HWH":  Station(code="HWH", name="Howrah (Kolkata)"),
+    "NDLS": Station(code="NDLS", name="New Delhi", lat=28.643, lon=77.2194),
+    "AGC":  Station(code="AGC", name="Agra Cantt", lat=27.1585, lon=77.991),
+    "GWL":  Station(code="GWL", name="Gwalior", lat=26.2183, lon=78.1828),
+    "JP":   Station(code="JP", name="Jaipur", lat=26.9196, lon=75.7878),
+    "BPL":  Station(code="BPL", name="Bhopal", lat=23.2666, lon=77.413),
+    "NGP":  Station(code="NGP", name="Nagpur", lat=21.1522, lon=79.0883),
+    "ADI":  Station(code="ADI", name="Ahmedabad", lat=23.0258, lon=72.6007),
+    "HWH":  Station(code="HWH", name="Howrah (Kolkata)", lat=22.5838, lon=88.3426),
 }
@@ -1,12 +1,20 @@
 from __future__ import annotations
 
+import threading
+from collections.abc import Iterable, Iterator
 from datetime import datetime, timedelta, timezone
 
+from app.data.trip_index import TripIndex
 from app.models.schemas import Trip
+from app.storage.base import get_storage
 
 UTC = timezone.utc
 
 _TRIPS: dict[str, Trip] = {}
+_INDEX = TripIndex()
+_SEED_LOCK = threading.Lock()
+# Bumped on every change to _TRIPS so derived structures know when to rebuild.
+_VERSION = 0
 
 def _now() -> datetime:
     return datetime.now(tz=UTC)
@@ -14,32 +22,79 @@ def _now() -> datetime:
 def _seed() -> None:
     if _TRIPS:
         return
+    with _SEED_LOCK:
+        if not _TRIPS:
+            _load_or_create()
 
-    now = _now()
-    sample = [
-        ("T1001", "12951", "NDLS", "AGC", 2, 4, 250),
-        ("T1002", "12137", "AGC", "BPL", 5, 12, 900),
-        ("T1003", "22953", "JP", "ADI", 3, 10, 850),
-        ("T1004", "12809", "BPL", "NGP", 1, 6, 700),
-        ("T1005", "12860", "NGP", "HWH", 6, 20, 1500),
-    ]
-
-    for trip_id, train_no, a, b, dep_h, dur_h, base in sample:
-        depart = now + timedelta(hours=dep_h)
-        arrive = depart + timedelta(hours=dur_h)
-        _TRIPS[trip_id] = Trip(
-            trip_id=trip_id,
-            train_no=train_no,
-            from_station=a,
-            to_station=b,
-            depart_at=depart,
-            arrive_at=arrive,
-            base_fare=base,
-        )
-
-def list_trips() -> list[Trip]:
+def _load_or_create() -> None:
+    global _VERSION
+    storage = get_storage()
+    trips = list(storage.load_trips()) if storage is not None else []
+    if not trips:
+        now = _now()
+        sample = [
+            ("T1001", "12951", "NDLS", "AGC", 2, 4, 250),
+            ("T1002", "12137", "AGC", "BPL", 5, 12, 900),
+            ("T1003", "22953", "JP", "ADI", 3, 10, 850),
+            ("T1004", "12809", "BPL", "NGP", 1, 6, 700),
+            ("T1005", "12860", "NGP", "HWH", 6, 20, 1500),
+        ]
+        for trip_id, train_no, a, b, dep_h, dur_h, base in sample:
+            depart = now + timedelta(hours=dep_h)
+            trips.append(
+                Trip(
+                    trip_id=trip_id,
+                    train_no=train_no,
+                    from_station=a,
+                    to_station=b,
+                    depart_at=depart,
+                    arrive_at=depart + timedelta(hours=dur_h),
+                    base_fare=base,
+                )
+            )
+        if storage is not None:
+            storage.save_trips(trips)
+
+    # _TRIPS is filled last: once it is non-empty, readers skip the lock.
+    _INDEX.add(trips)
+    _TRIPS.update({trip.trip_id: trip for trip in trips})
+    _VERSION += 1
+
+def add_trips(trips: Iterable[Trip]) -> None:
+    global _VERSION
+    _seed()
+    trips = list(trips)
+    storage = get_storage()
+    if storage is not None:
+        storage.save_trips(trips)
+    for trip in trips:
+        _TRIPS[trip.trip_id] = trip
+    _INDEX.add(trips)
+    _VERSION += 1
+
+def trips_version() -> int:
+    _seed()
+    return _VERSION
+
+def list_trips(
+    from_station: str | None = None,
+    to_station: str | None = None,
+    after: datetime | None = None,
+    before: datetime | None = None,
+) -> list[Trip]:
+    _seed()
+    return _INDEX.query(from_station, to_station, after, before)
+
+def iter_trips(
+    from_station: str | None = None,
+    to_station: str | None = None,
+    after: datetime | None = None,
+    before: datetime | None = None,
+    chunk: int = 1000,
+) -> Iterator[list[Trip]]:
+    """list_trips() in chunks of at most `chunk` trips, for exports."""
     _seed()
-    return sorted(_TRIPS.values(), key=lambda t: t.depart_at)
+    return _INDEX.scan(from_station, to_station, after, before, chunk)
 
 def get_trip(trip_id: str) -> Trip:
     _seed()
@@ -0,0 +1,316 @@
+"""
+Binary network snapshots.
+
+A snapshot is the compiled (CSR) network laid out as one flat file, so the
+service can mmap it instead of building Edge models at startup: the int32
+arrays are used in place, and every process mapping the same file shares its
+pages through the OS page cache. Only the station details (codes, names,
+coordinates) are decoded into Python objects.
+
+Files are written to a temporary name and renamed into place, never
+rewritten: processes still mapping the previous file keep reading its (now
+unlinked) pages, which is what lets the service hot-swap networks.
+
+Layout (little-endian):
+
+    header    magic, format version, graph version, node/edge/line counts,
+              string blob length (padded to 8 bytes)
+    coords    float64[2 * nodes], lat/lon per station (NaN when unknown)
+    offsets   int32[nodes + 1]
+    targets   int32[edges]
+    km        int32[edges]
+    line_ids  int32[edges]
+    strings   UTF-8: codes, names and line names, each "\\n"-joined,
+              separated by NUL
+
+Compile a source network into a snapshot with:
+
+    python -m app.data.snapshot compile network.json -o network.snap
+    python -m app.data.snapshot compile --stations stations.csv --edges edges.csv -o network.snap
+
+then point NETWORK_SNAPSHOT_PATH at the file.
+
+JSON sources look like {"stations": [{"code", "name", "lat", "lon"}],
+"edges": [{"from", "to", "km", "line"}]}, with lat/lon optional; CSV sources
+use the same column names.
+`python -m app.data.snapshot export` writes the built-in network as JSON.
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import json
+import logging
+import math
+import mmap
+import os
+import struct
+import sys
+import time
+from array import array
+from collections.abc import Iterable, Mapping, Sequence
+
+from app.data import network
+from app.data.graph import (
+    CompiledGraph,
+    RowScanLookup,
+    compile_graph,
+    graph_digest,
+    station_coords,
+    station_map,
+)
+from app.models.schemas import Edge, Station
+
+logger = logging.getLogger("railway.snapshot")
+
+MAGIC = b"RWYSNAP\0"
+FORMAT_VERSION = 2
+
+# magic, format version, graph version (hex), nodes, edges, lines, strings length
+_HEADER = struct.Struct("<8sI16sIIII")
+_HEADER_SIZE = (_HEADER.size + 7) // 8 * 8
+_INT = 4
+_FLOAT = 8
+
+
+class SnapshotError(ValueError):
+    """The file is not a snapshot this build can read."""
+
+
+def _check_platform() -> None:
+    if sys.byteorder != "little" or array("i").itemsize != _INT:
+        raise SnapshotError("Snapshots require a little-endian platform with 32-bit C ints.")
+
+
+def _check_text(value: str, what: str) -> str:
+    if not value or "\n" in value or "\0" in value:
+        raise ValueError(f"Invalid {what} {value!r}.")
+    return value
+
+
+def write_snapshot(path: str, graph: CompiledGraph) -> None:
+    """Write graph to path, atomically replacing any previous file."""
+    _check_platform()
+    station_names = [graph.stations[code].name for code in graph.codes]
+    strings = "\0".join(
+        "\n".join(_check_text(s, what) for s in values)
+        for values, what in (
+            (graph.codes, "station code"),
+            (station_names, "station name"),
+            (graph.lines, "line name"),
+        )
+    ).encode()
+    header = _HEADER.pack(
+        MAGIC,
+        FORMAT_VERSION,
+        graph.version.encode("ascii"),
+        graph.node_count,
+        graph.edge_count,
+        len(graph.lines),
+        len(strings),
+    )
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(header.ljust(_HEADER_SIZE, b"\0"))
+        f.write(station_coords(graph.codes, graph.stations).tobytes())
+        for values in (graph.offsets, graph.targets, graph.km, graph.line_ids):
+            f.write(array("i", values).tobytes())
+        f.write(strings)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def load_snapshot(path: str, verify: bool = False) -> CompiledGraph:
+    """
+    Map a snapshot read-only. The CSR arrays are views into the mapping, so
+    loading costs O(stations) for the strings, not O(edges).
+
+    With verify, the graph version is recomputed from the content (one pass
+    over the file) to detect corruption.
+    """
+    _check_platform()
+    start = time.perf_counter()
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size < _HEADER_SIZE:
+            raise SnapshotError(f"{path} is too small to be a network snapshot.")
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    magic, fmt, version, nodes, edges, lines, strings_len = _HEADER.unpack_from(mapped)
+    if magic != MAGIC:
+        raise SnapshotError(f"{path} is not a network snapshot.")
+    if fmt != FORMAT_VERSION:
+        raise SnapshotError(f"{path} has snapshot format {fmt}, expected {FORMAT_VERSION}.")
+    expected = _HEADER_SIZE + _FLOAT * 2 * nodes + _INT * (nodes + 1 + 3 * edges) + strings_len
+    if len(mapped) != expected:
+        raise SnapshotError(f"{path} is truncated or corrupt ({len(mapped)} != {expected} bytes).")
+
+    view = memoryview(mapped)
+    pos = _HEADER_SIZE + _FLOAT * 2 * nodes
+    coords = view[_HEADER_SIZE:pos].cast("d")
+    arrays = []
+    for count in (nodes + 1, edges, edges, edges):
+        arrays.append(view[pos : pos + _INT * count].cast("i"))
+        pos += _INT * count
+    offsets, targets, km, line_ids = arrays
+
+    try:
+        code_blob, name_blob, line_blob = bytes(view[pos:]).decode().split("\0")
+    except ValueError as exc:  # UnicodeDecodeError, or the wrong number of blobs
+        raise SnapshotError(f"{path} has a corrupt string table.") from exc
+    codes = tuple(code_blob.split("\n")) if nodes else ()
+    names = tuple(name_blob.split("\n")) if nodes else ()
+    line_names = tuple(line_blob.split("\n")) if lines else ()
+    if len(codes) != nodes or len(names) != nodes or len(line_names) != lines:
+        raise SnapshotError(f"{path} has a corrupt string table.")
+
+    version = version.decode("ascii")
+    if verify and graph_digest(codes, names, line_names, [*arrays, coords]) != version:
+        raise SnapshotError(f"{path} content does not match its graph version.")
+
+    graph = CompiledGraph(
+        codes=codes,
+        index={code: i for i, code in enumerate(codes)},
+        offsets=offsets,
+        targets=targets,
+        km=km,
+        line_ids=line_ids,
+        lines=line_names,
+        edge_lookup=RowScanLookup(offsets, targets, km),
+        version=version,
+        stations=station_map(codes, _stations(codes, names, coords)),
+    )
+    logger.info(
+        "network_snapshot_loaded path=%s version=%s nodes=%s edges=%s ms=%.1f",
+        path,
+        graph.version,
+        graph.node_count,
+        graph.edge_count,
+        (time.perf_counter() - start) * 1000.0,
+    )
+    return graph
+
+
+def _stations(codes: Sequence[str], names: Sequence[str], coords: Sequence[float]) -> dict:
+    stations = {}
+    for i, (code, name) in enumerate(zip(codes, names, strict=True)):
+        lat, lon = coords[2 * i], coords[2 * i + 1]
+        if math.isnan(lat) or math.isnan(lon):
+            lat = lon = None
+        stations[code] = Station(code=code, name=name, lat=lat, lon=lon)
+    return stations
+
+
+# --- compiling sources ---
+
+
+def build_network(
+    stations: Iterable[Mapping[str, str]],
+    edges: Iterable[Mapping[str, str | int]],
+    both_directions: bool = False,
+) -> tuple[dict[str, list[Edge]], dict[str, Station]]:
+    """
+    Validate source rows into (GRAPH-style adjacency, STATIONS-style details).
+
+    Stations keep their source order, which fixes their ids in the snapshot.
+    """
+    by_code: dict[str, Station] = {}
+    for row in stations:
+        code = _check_text(str(row["code"]).strip(), "station code")
+        if code in by_code:
+            raise ValueError(f"Duplicate station {code!r}.")
+        name = _check_text(str(row.get("name") or code).strip(), "station name")
+        lat, lon = (row.get(key) for key in ("lat", "lon"))
+        by_code[code] = Station(
+            code=code,
+            name=name,
+            lat=float(lat) if lat not in (None, "") else None,
+            lon=float(lon) if lon not in (None, "") else None,
+        )
+
+    graph: dict[str, list[Edge]] = {code: [] for code in by_code}
+    for row in edges:
+        frm, to = str(row["from"]).strip(), str(row["to"]).strip()
+        for code in (frm, to):
+            if code not in by_code:
+                raise ValueError(f"Edge references unknown station {code!r}.")
+        km = int(row["km"])
+        if km <= 0:
+            raise ValueError(f"Edge {frm}->{to} must have a positive km.")
+        line = _check_text(str(row["line"]).strip(), "line name")
+        graph[frm].append(Edge(to=to, km=km, line=line))
+        if both_directions:
+            graph[to].append(Edge(to=frm, km=km, line=line))
+    return graph, by_code
+
+
+def _read_csv(path: str) -> list[dict[str, str]]:
+    with open(path, newline="", encoding="utf-8") as f:
+        return list(csv.DictReader(f))
+
+
+def export_source(graph: Mapping[str, list[Edge]], stations: Mapping[str, Station]) -> dict:
+    return {
+        "stations": [s.model_dump(exclude_none=True) for s in stations.values()],
+        "edges": [
+            {"from": frm, "to": e.to, "km": e.km, "line": e.line}
+            for frm, edges in graph.items()
+            for e in edges
+        ],
+    }
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Binary network snapshots.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    comp = sub.add_parser("compile", help="Compile a JSON or CSV network into a snapshot.")
+    comp.add_argument("source", nargs="?", help="JSON network source")
+    comp.add_argument("--stations", help="CSV with code,name[,lat,lon] columns")
+    comp.add_argument("--edges", help="CSV with from,to,km,line columns")
+    comp.add_argument("--both-directions", action="store_true", help="Add each edge reversed too")
+    comp.add_argument("-o", "--out", required=True, help="Output file, e.g. network.snap")
+
+    export = sub.add_parser("export", help="Write the built-in network as a JSON source.")
+    export.add_argument("out", help="Output file, e.g. network.json")
+
+    info = sub.add_parser("info", help="Describe (and verify) a snapshot.")
+    info.add_argument("path")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "export":
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(export_source(network.GRAPH, network.STATIONS), f, indent=1)
+        print(f"exported {len(network.STATIONS)} stations -> {args.out}")
+        return
+
+    if args.command == "info":
+        graph = load_snapshot(args.path, verify=True)
+        print(
+            f"{args.path}: graph {graph.version}, {graph.node_count} nodes, "
+            f"{graph.edge_count} edges, {len(graph.lines)} lines"
+        )
+        return
+
+    if args.source:
+        with open(args.source, encoding="utf-8") as f:
+            source = json.load(f)
+        stations, edges = source["stations"], source["edges"]
+    elif args.stations and args.edges:
+        stations, edges = _read_csv(args.stations), _read_csv(args.edges)
+    else:
+        parser.error("compile needs a JSON source or both --stations and --edges")
+
+    start = time.perf_counter()
+    graph, stations = build_network(stations, edges, both_directions=args.both_directions)
+    compiled = compile_graph(graph, stations)
+    write_snapshot(args.out, compiled)
+    print(
+        f"compiled graph {compiled.version}: {compiled.node_count} nodes, "
+        f"{compiled.edge_count} edges in {time.perf_counter() - start:.2f}s -> {args.out}"
+    )
+
+
+if __name__ == "__main__":
+    main()
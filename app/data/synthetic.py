@@ -0,0 +1,223 @@
+"""
+Reproducible synthetic networks and timetables for benchmarks and load tests.
+
+Stations are scattered over a square map and grouped into lines; each line is
+a chain of its stations ordered along the map, and extra connector edges to
+nearby stations on other lines bring the average degree up to the requested
+value. The result is always connected and symmetric (both directions stored),
+like network.GRAPH.
+"""
+
+from __future__ import annotations
+
+import math
+import random
+from datetime import datetime, timedelta, timezone
+from itertools import pairwise
+
+from app.models.schemas import BookingCreate, Edge, Station, Trip
+
+UTC = timezone.utc
+
+MAP_SIZE_KM = 2000.0
+# Where the map's bottom-left corner lands when stations get coordinates.
+MAP_ORIGIN = (12.0, 70.0)
+_KM_PER_DEGREE = 111.2
+
+
+_LON_KM_PER_DEGREE = _KM_PER_DEGREE * math.cos(
+    math.radians(MAP_ORIGIN[0] + MAP_SIZE_KM / 2 / _KM_PER_DEGREE)
+)
+
+
+def _map_to_degrees(x: float, y: float) -> tuple[float, float]:
+    # Equirectangular around the map's middle latitude: close enough that
+    # great-circle distances track map distances.
+    lat = MAP_ORIGIN[0] + y / _KM_PER_DEGREE
+    lon = MAP_ORIGIN[1] + x / _LON_KM_PER_DEGREE
+    return round(lat, 6), round(lon, 6)
+
+
+def station_code(i: int) -> str:
+    # Fits the 2..6 character limit of the /route query parameters.
+    return f"S{i:05d}"
+
+
+class _UnionFind:
+    def __init__(self, n: int) -> None:
+        self.parent = list(range(n))
+
+    def find(self, x: int) -> int:
+        parent = self.parent
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    def union(self, a: int, b: int) -> bool:
+        ra, rb = self.find(a), self.find(b)
+        if ra == rb:
+            return False
+        self.parent[ra] = rb
+        return True
+
+
+def generate_network(
+    n_stations: int,
+    degree: float = 3.0,
+    lines: int | None = None,
+    seed: int = 0,
+) -> tuple[dict[str, list[Edge]], dict[str, Station]]:
+    """
+    Build a (GRAPH, STATIONS) pair with n_stations stations.
+
+    degree is the target average number of outgoing edges per station (at
+    least 2 for lines with more than one station); lines defaults to about one
+    line per 25 stations.
+    """
+    if n_stations < 2:
+        raise ValueError("n_stations must be at least 2.")
+    if n_stations > 99_999:
+        raise ValueError("n_stations must fit in a 6 character station code.")
+
+    rng = random.Random(seed)
+    lines = lines or max(1, n_stations // 25)
+    xs = [rng.uniform(0, MAP_SIZE_KM) for _ in range(n_stations)]
+    ys = [rng.uniform(0, MAP_SIZE_KM) for _ in range(n_stations)]
+
+    def km(a: int, b: int) -> int:
+        # Track is never straight: 5-30% longer than the crow flies.
+        return max(1, round(math.hypot(xs[a] - xs[b], ys[a] - ys[b]) * rng.uniform(1.05, 1.3)))
+
+    adjacency: list[dict[int, tuple[int, str]]] = [{} for _ in range(n_stations)]
+    uf = _UnionFind(n_stations)
+    edge_count = 0
+
+    def connect(a: int, b: int, line: str) -> None:
+        nonlocal edge_count
+        if a == b or b in adjacency[a]:
+            return
+        dist = km(a, b)
+        adjacency[a][b] = (dist, line)
+        adjacency[b][a] = (dist, line)
+        uf.union(a, b)
+        edge_count += 2
+
+    # Lines: chains of stations along a random heading.
+    line_of = [rng.randrange(lines) for _ in range(n_stations)]
+    members: list[list[int]] = [[] for _ in range(lines)]
+    for i, line_no in enumerate(line_of):
+        members[line_no].append(i)
+    for line_no, stations in enumerate(members):
+        angle = rng.uniform(0, math.pi)
+        dx, dy = math.cos(angle), math.sin(angle)
+        stations.sort(key=lambda i: xs[i] * dx + ys[i] * dy)
+        name = f"Line {line_no + 1}"
+        for a, b in pairwise(stations):
+            connect(a, b, name)
+
+    # Connectors to the nearest stations, via a uniform grid of buckets.
+    cell = MAP_SIZE_KM / max(1, int(math.sqrt(n_stations / 4)))
+    buckets: dict[tuple[int, int], list[int]] = {}
+    for i in range(n_stations):
+        buckets.setdefault((int(xs[i] // cell), int(ys[i] // cell)), []).append(i)
+
+    def nearest(i: int, k: int) -> list[int]:
+        cx, cy = int(xs[i] // cell), int(ys[i] // cell)
+        found: list[int] = []
+        radius = 1
+        while len(found) <= k and radius <= 4:
+            found = [
+                j
+                for gx in range(cx - radius, cx + radius + 1)
+                for gy in range(cy - radius, cy + radius + 1)
+                for j in buckets.get((gx, gy), ())
+                if j != i
+            ]
+            radius += 1
+        found.sort(key=lambda j: (xs[i] - xs[j]) ** 2 + (ys[i] - ys[j]) ** 2)
+        return found[:k]
+
+    target_edges = int(degree * n_stations)
+    order = list(range(n_stations))
+    for _ in range(max(1, math.ceil(degree))):
+        rng.shuffle(order)
+        for i in order:
+            if edge_count >= target_edges:
+                break
+            for j in nearest(i, 6):
+                if j not in adjacency[i]:
+                    connect(i, j, f"Link {line_of[i] + 1}-{line_of[j] + 1}")
+                    break
+
+    # Stitch any remaining components onto the first station's component.
+    root = uf.find(0)
+    for i in range(n_stations):
+        if uf.find(i) != root:
+            j = min(
+                (j for j in nearest(i, 16) if uf.find(j) == root),
+                default=None,
+                key=lambda j: (xs[i] - xs[j]) ** 2 + (ys[i] - ys[j]) ** 2,
+            )
+            if j is None:
+                j = rng.choice([j for j in range(n_stations) if uf.find(j) == root])
+            connect(i, j, f"Link {line_of[i] + 1}-{line_of[j] + 1}")
+            root = uf.find(0)
+
+    graph: dict[str, list[Edge]] = {}
+    stations: dict[str, Station] = {}
+    for i in range(n_stations):
+        code = station_code(i)
+        graph[code] = [
+            Edge(to=station_code(j), km=dist, line=line) for j, (dist, line) in adjacency[i].items()
+        ]
+        lat, lon = _map_to_degrees(xs[i], ys[i])
+        stations[code] = Station(code=code, name=f"Station {i}", lat=lat, lon=lon)
+    return graph, stations
+
+
+def generate_trips(
+    graph: dict[str, list[Edge]],
+    n_trips: int,
+    start: datetime | None = None,
+    horizon_hours: int = 24,
+    seed: int = 0,
+) -> list[Trip]:
+    """n_trips single-hop trips over random edges of graph, departing within horizon_hours."""
+    rng = random.Random(seed)
+    start = start or datetime(2025, 1, 1, tzinfo=UTC)
+    edges = [(code, e) for code, out in graph.items() for e in out]
+    if not edges:
+        raise ValueError("graph has no edges.")
+
+    trips: list[Trip] = []
+    for i in range(n_trips):
+        frm, edge = edges[rng.randrange(len(edges))]
+        depart = start + timedelta(minutes=rng.randrange(horizon_hours * 60))
+        speed_kmh = rng.uniform(60, 110)
+        trips.append(
+            Trip(
+                trip_id=f"T{i:07d}",
+                train_no=f"{rng.randrange(10000, 99999)}",
+                from_station=frm,
+                to_station=edge.to,
+                depart_at=depart,
+                arrive_at=depart + timedelta(hours=edge.km / speed_kmh),
+                base_fare=max(50, edge.km * 2),
+            )
+        )
+    return trips
+
+
+def generate_booking_requests(
+    trips: list[Trip], n_bookings: int, seed: int = 0
+) -> list[BookingCreate]:
+    rng = random.Random(seed)
+    return [
+        BookingCreate(
+            passenger_name=f"Passenger {rng.randrange(1_000_000)}",
+            trip_id=trips[rng.randrange(len(trips))].trip_id,
+            seats=rng.randint(1, 6),
+        )
+        for _ in range(n_bookings)
+    ]
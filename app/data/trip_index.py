@@ -0,0 +1,135 @@
+from __future__ import annotations
+
+import threading
+from bisect import bisect_left, bisect_right, insort
+from collections.abc import Iterable, Iterator
+from datetime import datetime, timezone
+
+from app.models.schemas import Trip
+
+UTC = timezone.utc
+
+# (depart_at as POSIX seconds, trip_id): unique and sorted by departure.
+Key = tuple[float, str]
+
+_ANY = None
+
+# Batches larger than this are merged with one sort instead of insort/del per key.
+_BULK_THRESHOLD = 16
+
+
+def _timestamp(value: datetime) -> float:
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=UTC)
+    return value.timestamp()
+
+
+class TripIndex:
+    """
+    Departure-sorted trip keys per (from_station, to_station).
+
+    Besides exact corridors there are buckets for "any destination" from a
+    station, "any origin" to a station and all trips, so every combination of
+    filters is answered by two bisects on one list. Small batches are inserted
+    with insort, large ones (bulk imports) merged with a sort; a re-added
+    trip_id replaces its previous entry.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._trips: dict[str, Trip] = {}
+        self._buckets: dict[tuple[str | None, str | None], list[Key]] = {}
+
+    @staticmethod
+    def _bucket_ids(trip: Trip) -> tuple[tuple[str | None, str | None], ...]:
+        a, b = trip.from_station, trip.to_station
+        return (a, b), (a, _ANY), (_ANY, b), (_ANY, _ANY)
+
+    def add(self, trips: Iterable[Trip]) -> None:
+        # Last one wins when a batch repeats a trip_id.
+        batch = {trip.trip_id: trip for trip in trips}
+        with self._lock:
+            removed: dict[tuple[str | None, str | None], set[Key]] = {}
+            added: dict[tuple[str | None, str | None], list[Key]] = {}
+            for trip in batch.values():
+                previous = self._trips.get(trip.trip_id)
+                if previous is not None:
+                    key = (_timestamp(previous.depart_at), previous.trip_id)
+                    for bucket_id in self._bucket_ids(previous):
+                        removed.setdefault(bucket_id, set()).add(key)
+                self._trips[trip.trip_id] = trip
+                key = (_timestamp(trip.depart_at), trip.trip_id)
+                for bucket_id in self._bucket_ids(trip):
+                    added.setdefault(bucket_id, []).append(key)
+
+            for bucket_id, keys_out in removed.items():
+                keys = self._buckets[bucket_id]
+                if len(keys_out) <= _BULK_THRESHOLD:
+                    for key in keys_out:
+                        del keys[bisect_left(keys, key)]
+                else:
+                    keys[:] = [key for key in keys if key not in keys_out]
+            for bucket_id, keys_in in added.items():
+                keys = self._buckets.setdefault(bucket_id, [])
+                if len(keys_in) <= _BULK_THRESHOLD:
+                    for key in keys_in:
+                        insort(keys, key)
+                else:
+                    # Timsort merges the two sorted runs in about linear time.
+                    keys_in.sort()
+                    keys.extend(keys_in)
+                    keys.sort()
+
+    def __len__(self) -> int:
+        return len(self._trips)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._trips.clear()
+            self._buckets.clear()
+
+    def query(
+        self,
+        from_station: str | None = None,
+        to_station: str | None = None,
+        after: datetime | None = None,
+        before: datetime | None = None,
+    ) -> list[Trip]:
+        """Trips matching the given filters, by departure; after inclusive, before exclusive."""
+        with self._lock:
+            keys = self._buckets.get((from_station, to_station))
+            if not keys:
+                return []
+            lo = bisect_left(keys, (_timestamp(after), "")) if after is not None else 0
+            hi = bisect_left(keys, (_timestamp(before), "")) if before is not None else len(keys)
+            trips = self._trips
+            return [trips[trip_id] for _, trip_id in keys[lo:hi]]
+
+    def scan(
+        self,
+        from_station: str | None = None,
+        to_station: str | None = None,
+        after: datetime | None = None,
+        before: datetime | None = None,
+        chunk: int = 1000,
+    ) -> Iterator[list[Trip]]:
+        """
+        query() in chunks of at most `chunk` trips. The lock is only held per
+        chunk, and only one chunk is materialized at a time.
+        """
+        stop = (_timestamp(before), "") if before is not None else None
+        last: Key | None = None
+        while True:
+            with self._lock:
+                keys = self._buckets.get((from_station, to_station), [])
+                if last is not None:
+                    lo = bisect_right(keys, last)
+                else:
+                    lo = bisect_left(keys, (_timestamp(after), "")) if after is not None else 0
+                hi = bisect_left(keys, stop) if stop is not None else len(keys)
+                batch = keys[lo : min(hi, lo + chunk)]
+                trips = [self._trips[trip_id] for _, trip_id in batch]
+            if not trips:
+                return
+            yield trips
+            last = batch[-1]
@@ -1,46 +1,50 @@
 import logging
-import time
-import uuid
+from contextlib import asynccontextmanager
 
-from fastapi import FastAPI, Request
+from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.api.routes import router as api_router
-from app.core.logging import configure_logging, set_request_id
+from app.core.config import settings
+from app.core.logging import configure_logging
+from app.core.middleware import RequestContextMiddleware
+from app.core.profiling import ProfilingMiddleware
+from app.data.seed import list_trips
+from app.services.booking_service import restore_bookings
+from app.services.network_service import start_network_watcher, stop_network_watcher
+from app.services.routing_pool import get_routing_pool, shutdown_routing_pool
+from app.storage.base import close_storage
 
 configure_logging()
 logger = logging.getLogger("railway")
 
+
+@asynccontextmanager
+async def lifespan(_: FastAPI):
+    # Load trips and bookings from the storage backend before taking traffic.
+    list_trips()
+    restore_bookings()
+    get_routing_pool().warm()
+    start_network_watcher()
+    yield
+    stop_network_watcher()
+    shutdown_routing_pool()
+    close_storage()
+
+
 app = FastAPI(
     title="Railway Quest 🚆",
     version="0.2.0",
     description="Mini railway routing + trips + bookings API.",
+    lifespan=lifespan,
 )
 
-# Request ID + access logging middleware
-@app.middleware("http")
-async def request_id_and_logging_middleware(request: Request, call_next):
-    # Use incoming header if present, otherwise generate one
-    request_id = request.headers.get("X-Request-ID") or uuid.uuid4().hex
-    set_request_id(request_id)
-
-    start = time.perf_counter()
-    try:
-        response = await call_next(request)
-    finally:
-        duration_ms = (time.perf_counter() - start) * 1000.0
-
-    response.headers["X-Request-ID"] = request_id
-
-    logger.info(
-        "request completed method=%s path=%s status=%s duration_ms=%.2f",
-        request.method,
-        request.url.path,
-        response.status_code,
-        duration_ms,
-    )
-    return response
+# Opt-in per-request profiling; not in the stack at all unless enabled
+if settings.profiling_enabled:
+    app.add_middleware(ProfilingMiddleware)
 
+# Request ID + access logging middleware
+app.add_middleware(RequestContextMiddleware, sample_rate=settings.access_log_sample_rate)
 
 app.add_middleware(
     CORSMiddleware,
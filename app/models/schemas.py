@@ -3,10 +3,16 @@ from __future__ import annotations
 from datetime import datetime
 from pydantic import BaseModel, Field
 
+# Longest station code accepted anywhere; GTFS imports use stop codes/ids as codes.
+STATION_CODE_MAX_LENGTH = 64
+
 
 class Station(BaseModel):
     code: str = Field(..., examples=["NDLS"])
     name: str = Field(..., examples=["New Delhi"])
+    # WGS84 degrees; optional, used by ROUTING_ALGORITHM=astar
+    lat: float | None = Field(None, ge=-90, le=90, examples=[28.643])
+    lon: float | None = Field(None, ge=-180, le=180, examples=[77.2194])
 
 
 class Edge(BaseModel):
@@ -26,12 +32,63 @@ class RouteLeg(BaseModel):
         populate_by_name = True
 
 
+class RouteAlternative(BaseModel):
+    total_km: int
+    total_fare: int
+    legs: list[RouteLeg]
+
+
 class RouteResponse(BaseModel):
     from_station: str
     to_station: str
     total_km: int
     total_fare: int
+    travel_class: str = "second"
     legs: list[RouteLeg]
+    # next-cheapest routes, cheapest first; only present when requested
+    alternatives: list[RouteAlternative] | None = None
+
+
+class RoutePair(BaseModel):
+    from_station: str = Field(..., min_length=2, max_length=STATION_CODE_MAX_LENGTH)
+    to_station: str = Field(..., min_length=2, max_length=STATION_CODE_MAX_LENGTH)
+
+
+class RouteBatchRequest(BaseModel):
+    pairs: list[RoutePair] = Field(..., min_length=1, max_length=10_000)
+    include_legs: bool = False
+    # one of FARE_CLASSES; None for the default class
+    travel_class: str | None = None
+
+
+class RouteBatchItem(BaseModel):
+    from_station: str
+    to_station: str
+    total_km: int | None = None
+    total_fare: int | None = None
+    legs: list[RouteLeg] | None = None
+    error: str | None = None
+
+
+class RouteBatchResponse(BaseModel):
+    results: list[RouteBatchItem]
+
+
+class RouteMatrixRequest(BaseModel):
+    sources: list[str] = Field(..., min_length=1, max_length=500)
+    targets: list[str] = Field(..., min_length=1, max_length=500)
+    include_legs: bool = False
+    travel_class: str | None = None
+
+
+class RouteMatrixResponse(BaseModel):
+    sources: list[str]
+    targets: list[str]
+    travel_class: str = "second"
+    # km[i][j] / fare[i][j] for sources[i] -> targets[j]; None when unreachable
+    km: list[list[int | None]]
+    fare: list[list[int | None]]
+    legs: list[list[list[RouteLeg] | None]] | None = None
 
 
 class Trip(BaseModel):
@@ -42,12 +99,33 @@ class Trip(BaseModel):
     depart_at: datetime
     arrive_at: datetime
     base_fare: int
+    capacity: int = Field(120, ge=1)
+    # Trips sharing a run_id are consecutive hops of one train run, which a
+    # passenger rides through without changing; None when the trip is a whole run
+    run_id: str | None = None
+
+
+class Journey(BaseModel):
+    from_station: str
+    to_station: str
+    depart_at: datetime
+    arrive_at: datetime
+    transfers: int
+    legs: list[Trip]
+
+
+class SeatAvailability(BaseModel):
+    trip_id: str
+    capacity: int
+    reserved: int
+    available: int
 
 
 class BookingCreate(BaseModel):
     passenger_name: str = Field(..., min_length=1, max_length=60)
     trip_id: str
     seats: int = Field(1, ge=1, le=6)
+    travel_class: str | None = None
 
 
 class Booking(BaseModel):
@@ -56,5 +134,32 @@ class Booking(BaseModel):
     passenger_name: str
     trip: Trip
     seats: int
+    # bookings made before fare classes existed were all "second"
+    travel_class: str = "second"
     total_price: int
     booked_at: datetime
+
+
+class BookingBulkResult(BaseModel):
+    # position of the item in the request
+    index: int
+    booking: Booking | None = None
+    error: str | None = None
+
+
+class FareQuoteRequest(BaseModel):
+    trip_ids: list[str] = Field(..., min_length=1, max_length=1000)
+    seats: int = Field(1, ge=1, le=6)
+    travel_class: str | None = None
+
+
+class FareQuote(BaseModel):
+    trip_id: str
+    # None when the trip does not exist
+    total_price: int | None = None
+
+
+class FareQuoteResponse(BaseModel):
+    seats: int
+    travel_class: str
+    quotes: list[FareQuote]
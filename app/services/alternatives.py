@@ -0,0 +1,189 @@
+"""
+K cheapest alternative routes (Yen's algorithm, with Lawler's refinement).
+
+Yen finds the next path by taking each prefix ("root") of the last path found
+and searching from its end ("spur" node) to the goal with the root's nodes and
+the already-used next edges removed. Run naively that is one full Dijkstra per
+spur node per path. Here every spur search of a request shares one reverse
+search tree grown from the goal: its distances are exact costs-to-goal on the
+full network, hence an admissible and consistent A* heuristic for every spur
+graph (removing nodes and edges only makes paths longer). With an exact
+heuristic a spur search mostly walks straight down the tree, and the reverse
+tree is only grown as far as the spur searches look. Lawler's refinement skips
+spur nodes before the point where a path left its parent, which can only
+reproduce candidates already found.
+
+The settled-node budget (ROUTE_ALTERNATIVES_MAX_SETTLED) is shared by all
+searches after the first path; when it runs out the alternatives found so far
+are returned.
+"""
+
+from __future__ import annotations
+
+import heapq
+import itertools
+from dataclasses import dataclass
+
+from app.core.metrics import ROUTE_HEAP_PUSHES, ROUTE_SETTLED
+from app.data.graph import CompiledGraph, get_reverse_graph
+
+_INF = float("inf")
+
+
+@dataclass(frozen=True)
+class Path:
+    km: int
+    edges: tuple[int, ...]  # positions in the graph's edge arrays
+    nodes: tuple[int, ...]
+    # index of the first edge that differs from the path this one was spurred from
+    deviation: int = 0
+
+
+class BudgetExhausted(Exception):
+    """The request's settled-node budget ran out."""
+
+
+class _Search:
+    """Search state shared by the spur searches of one (source, goal) query."""
+
+    def __init__(self, g: CompiledGraph, goal: int) -> None:
+        self.g = g
+        self.goal = goal
+        self.rev = get_reverse_graph(g)
+        # reverse Dijkstra from the goal, resumed whenever a lookup needs more of it
+        self.to_goal: dict[int, int] = {goal: 0}
+        self.next_edge: dict[int, int] = {}
+        self._done: set[int] = set()
+        self._frontier: list[tuple[int, int]] = [(0, goal)]
+        self.settled = self.pushes = 0
+        self.limit = _INF
+
+    def _spend(self) -> None:
+        self.settled += 1
+        if self.settled > self.limit:
+            raise BudgetExhausted
+
+    def cost_to_goal(self, v: int) -> int | float:
+        """Exact km from v to the goal on the full network (inf if unreachable)."""
+        if v in self._done:
+            return self.to_goal[v]
+        rev, km, to_goal, frontier = self.rev, self.g.km, self.to_goal, self._frontier
+        while frontier:
+            d, u = heapq.heappop(frontier)
+            if d != to_goal[u] or u in self._done:
+                continue
+            self._done.add(u)
+            self._spend()
+            for slot in range(rev.offsets[u], rev.offsets[u + 1]):
+                w, pos = rev.sources[slot], rev.positions[slot]
+                nd = d + km[pos]
+                if nd < to_goal.get(w, _INF):
+                    to_goal[w] = nd
+                    self.next_edge[w] = pos
+                    heapq.heappush(frontier, (nd, w))
+                    self.pushes += 1
+            if u == v:
+                return d
+        return _INF
+
+    def tree_path(self, source: int) -> Path | None:
+        """Cheapest source -> goal path, read off the reverse tree."""
+        total = self.cost_to_goal(source)
+        if total == _INF:
+            return None
+        edges, nodes = [], [source]
+        while nodes[-1] != self.goal:
+            pos = self.next_edge[nodes[-1]]
+            edges.append(pos)
+            nodes.append(self.g.targets[pos])
+        return Path(int(total), tuple(edges), tuple(nodes))
+
+    def spur(
+        self, start: int, blocked_nodes: set[int], blocked_edges: set[int]
+    ) -> tuple[int, list[int], list[int]] | None:
+        """A* from start to the goal avoiding the blocked nodes and edges."""
+        h = self.cost_to_goal
+        if h(start) == _INF:
+            return None
+        offsets, targets, km = self.g.offsets, self.g.targets, self.g.km
+        cost: dict[int, int] = {start: 0}
+        via: dict[int, tuple[int, int]] = {}  # node -> (previous node, edge position)
+        # ties on f go to the deeper node, so an exact heuristic walks straight to the goal
+        pq: list[tuple[int | float, int, int]] = [(h(start), 0, start)]
+        while pq:
+            _, neg_d, u = heapq.heappop(pq)
+            d = -neg_d
+            if d != cost[u]:
+                continue
+            self._spend()
+            if u == self.goal:
+                edges, nodes = [], [u]
+                while nodes[-1] != start:
+                    prev, pos = via[nodes[-1]]
+                    edges.append(pos)
+                    nodes.append(prev)
+                return d, edges[::-1], nodes[::-1]
+            for pos in range(offsets[u], offsets[u + 1]):
+                v = targets[pos]
+                if pos in blocked_edges or v in blocked_nodes:
+                    continue
+                nd = d + km[pos]
+                if nd < cost.get(v, _INF):
+                    hv = h(v)
+                    if hv == _INF:
+                        continue
+                    cost[v] = nd
+                    via[v] = (u, pos)
+                    heapq.heappush(pq, (nd + hv, -nd, v))
+                    self.pushes += 1
+        return None
+
+
+def k_shortest_paths(
+    g: CompiledGraph, source: int, goal: int, k: int, max_settled: int
+) -> tuple[list[Path], bool]:
+    """
+    Up to k + 1 loopless source -> goal paths, cheapest first: the cheapest
+    route and k alternatives. Paths over the same stations on different lines
+    count as different. Returns (paths, whether the budget cut the search short).
+
+    Raises ValueError when the goal is unreachable.
+    """
+    search = _Search(g, goal)
+    first = search.tree_path(source)
+    if first is None:
+        raise ValueError("No route found between these stations.")
+    search.limit = search.settled + max_settled
+
+    found = [first]
+    candidates: list[tuple[int, tuple[int, ...], Path]] = []
+    seen = {first.edges}
+    truncated = False
+    try:
+        while len(found) <= k:
+            last = found[-1]
+            root_km = list(itertools.accumulate((g.km[pos] for pos in last.edges), initial=0))
+            for i in range(last.deviation, len(last.edges)):
+                root = last.edges[:i]
+                blocked_edges = {
+                    p.edges[i] for p in found if len(p.edges) > i and p.edges[:i] == root
+                }
+                spur = search.spur(last.nodes[i], set(last.nodes[:i]), blocked_edges)
+                if spur is None:
+                    continue
+                spur_km, spur_edges, spur_nodes = spur
+                edges = root + tuple(spur_edges)
+                if edges in seen:
+                    continue
+                seen.add(edges)
+                path = Path(root_km[i] + spur_km, edges, last.nodes[:i] + tuple(spur_nodes), i)
+                heapq.heappush(candidates, (path.km, edges, path))
+            if not candidates:
+                break
+            found.append(heapq.heappop(candidates)[2])
+    except BudgetExhausted:
+        truncated = True
+
+    ROUTE_SETTLED.observe(search.settled)
+    ROUTE_HEAP_PUSHES.observe(search.pushes)
+    return found, truncated
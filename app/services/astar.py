@@ -0,0 +1,178 @@
+"""
+Bidirectional A* over station coordinates (ROUTING_ALGORITHM=astar).
+
+A forward search from the origin and a backward search from the goal run on
+the same reduced edge costs, built from the average of two potentials
+(Ikeda et al.): h_t, a lower bound on the km left to the goal, and h_s, one on
+the km from the origin. Both are great-circle distances multiplied by the
+smallest km / great-circle ratio of any edge in the network, rounded down,
+so they never overestimate whatever the track geometry, and are consistent;
+the searches then settle only nodes roughly in the direction of travel and
+stop as soon as no shorter meeting point is possible. The result is the same
+cheapest distance as a plain Dijkstra.
+
+When any station lacks coordinates the potentials are zero and this is a
+plain bidirectional Dijkstra.
+"""
+
+from __future__ import annotations
+
+import heapq
+import logging
+import math
+import threading
+from collections import OrderedDict
+from collections.abc import Sequence
+from dataclasses import dataclass
+
+from app.core.metrics import ROUTE_HEAP_PUSHES, ROUTE_PATH_EDGES, ROUTE_SETTLED
+from app.data.graph import CompiledGraph, get_reverse_graph
+
+logger = logging.getLogger("railway.astar")
+
+_INF = float("inf")
+_EARTH_RADIUS_KM = 6371.0
+# Shaves the edge ratio so float rounding in the distances can't break the bound.
+_SLACK = 1e-9
+
+
+@dataclass(frozen=True)
+class GeoIndex:
+    """Station coordinates in radians, per node."""
+
+    lat: Sequence[float]
+    lon: Sequence[float]
+    cos_lat: Sequence[float]
+    # km per great-circle km that no edge undercuts
+    scale: float
+
+    def crow_km(self, a: int, b: int) -> float:
+        lat, lon, cos_lat = self.lat, self.lon, self.cos_lat
+        h = (
+            math.sin((lat[b] - lat[a]) / 2) ** 2
+            + cos_lat[a] * cos_lat[b] * math.sin((lon[b] - lon[a]) / 2) ** 2
+        )
+        return 2 * _EARTH_RADIUS_KM * math.asin(math.sqrt(min(1.0, h)))
+
+
+def build_geo_index(g: CompiledGraph) -> GeoIndex | None:
+    """GeoIndex for g, or None when a station has no coordinates."""
+    lat: list[float] = []
+    lon: list[float] = []
+    for code in g.codes:
+        station = g.stations[code]
+        if station.lat is None or station.lon is None:
+            return None
+        lat.append(math.radians(station.lat))
+        lon.append(math.radians(station.lon))
+    geo = GeoIndex(lat, lon, [math.cos(x) for x in lat], 1.0)
+
+    scale = _INF
+    offsets, targets, km = g.offsets, g.targets, g.km
+    for u in range(g.node_count):
+        for pos in range(offsets[u], offsets[u + 1]):
+            crow = geo.crow_km(u, targets[pos])
+            if crow > 0:
+                scale = min(scale, km[pos] / crow)
+    if scale == _INF:
+        return None
+    logger.info("geo_index_built version=%s nodes=%s scale=%.4f", g.version, g.node_count, scale)
+    return GeoIndex(geo.lat, geo.lon, geo.cos_lat, scale * (1 - _SLACK))
+
+
+_GEO: OrderedDict[str, GeoIndex | None] = OrderedDict()
+_GEO_LOCK = threading.Lock()
+_KEEP_GEO = 2
+
+
+def get_geo_index(g: CompiledGraph) -> GeoIndex | None:
+    """GeoIndex for g's version, built once per version."""
+    if g.version in _GEO:
+        return _GEO[g.version]
+    with _GEO_LOCK:
+        if g.version not in _GEO:
+            _GEO[g.version] = build_geo_index(g)
+            while len(_GEO) > _KEEP_GEO:
+                _GEO.popitem(last=False)
+        return _GEO[g.version]
+
+
+def bidirectional_query(g: CompiledGraph, start: int, goal: int) -> tuple[int, list[int]]:
+    """Cheapest start -> goal path as (km, nodes); raises ValueError if there is none."""
+    if start == goal:
+        return 0, [start]
+    geo = get_geo_index(g)
+    rev = get_reverse_graph(g)
+    offsets, targets, km = g.offsets, g.targets, g.km
+
+    # phi(v) = h_t(v) - h_s(v). Keys are doubled reduced distances so they stay
+    # integers: forward 2 * d + phi(v), backward 2 * d - phi(v).
+    phi_memo: dict[int, int] = {}
+
+    def phi(v: int) -> int:
+        p = phi_memo.get(v)
+        if p is None:
+            if geo is None:
+                p = 0
+            else:
+                p = math.floor(geo.scale * geo.crow_km(v, goal)) - math.floor(
+                    geo.scale * geo.crow_km(v, start)
+                )
+            phi_memo[v] = p
+        return p
+
+    dist_f: dict[int, int] = {start: 0}
+    dist_r: dict[int, int] = {goal: 0}
+    prev: dict[int, int] = {}
+    succ: dict[int, int] = {}
+    pq_f: list[tuple[int, int, int]] = [(phi(start), 0, start)]
+    pq_r: list[tuple[int, int, int]] = [(-phi(goal), 0, goal)]
+    best: int | float = _INF
+    meet = -1
+    settled = pushes = 0
+
+    while pq_f and pq_r and pq_f[0][0] + pq_r[0][0] < 2 * best:
+        if pq_f[0][0] <= pq_r[0][0]:
+            _, d, u = heapq.heappop(pq_f)
+            if d != dist_f[u]:
+                continue
+            settled += 1
+            for pos in range(offsets[u], offsets[u + 1]):
+                v = targets[pos]
+                nd = d + km[pos]
+                if nd < dist_f.get(v, _INF):
+                    dist_f[v] = nd
+                    prev[v] = u
+                    heapq.heappush(pq_f, (2 * nd + phi(v), nd, v))
+                    pushes += 1
+                    if v in dist_r and nd + dist_r[v] < best:
+                        best, meet = nd + dist_r[v], v
+        else:
+            _, d, u = heapq.heappop(pq_r)
+            if d != dist_r[u]:
+                continue
+            settled += 1
+            for slot in range(rev.offsets[u], rev.offsets[u + 1]):
+                v = rev.sources[slot]
+                nd = d + km[rev.positions[slot]]
+                if nd < dist_r.get(v, _INF):
+                    dist_r[v] = nd
+                    succ[v] = u
+                    heapq.heappush(pq_r, (2 * nd - phi(v), nd, v))
+                    pushes += 1
+                    if v in dist_f and nd + dist_f[v] < best:
+                        best, meet = nd + dist_f[v], v
+
+    ROUTE_SETTLED.observe(settled)
+    ROUTE_HEAP_PUSHES.observe(pushes)
+    if meet < 0:
+        raise ValueError("No route found between these stations.")
+
+    nodes = [meet]
+    while nodes[-1] != start:
+        nodes.append(prev[nodes[-1]])
+    nodes.reverse()
+    while nodes[-1] != goal:
+        nodes.append(succ[nodes[-1]])
+    ROUTE_PATH_EDGES.observe(len(nodes) - 1)
+    return int(best), nodes
@@ -0,0 +1,144 @@
+from __future__ import annotations
+
+import base64
+import threading
+from bisect import bisect_left, bisect_right, insort
+from collections.abc import Iterator
+from datetime import datetime, timedelta, timezone
+
+from app.models.schemas import Booking
+
+UTC = timezone.utc
+_EPOCH = datetime(1970, 1, 1, tzinfo=UTC)
+
+# (booked_at in whole microseconds, booking_id): unique and totally ordered.
+Key = tuple[int, str]
+
+
+def _micros(value: datetime) -> int:
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=UTC)
+    return (value - _EPOCH) // timedelta(microseconds=1)
+
+
+def booking_key(booking: Booking) -> Key:
+    return _micros(booking.booked_at), booking.booking_id
+
+
+def encode_cursor(key: Key) -> str:
+    return base64.urlsafe_b64encode(f"{key[0]}:{key[1]}".encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Key:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        micros, booking_id = raw.split(":", 1)
+        return int(micros), booking_id
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError("Invalid cursor.") from None
+
+
+class BookingIndex:
+    """
+    Secondary indexes over bookings, newest first.
+
+    Every index is a list of keys kept sorted by (booked_at, booking_id), so a
+    page is one bisect to the cursor plus a walk of at most `limit` entries.
+    Bookings are nearly always added in booked_at order, which makes insort an
+    append in practice.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._by_key: dict[Key, Booking] = {}
+        self._all: list[Key] = []
+        self._by_trip: dict[str, list[Key]] = {}
+        self._by_passenger: dict[str, list[Key]] = {}
+
+    def add(self, booking: Booking) -> None:
+        key = booking_key(booking)
+        with self._lock:
+            if key in self._by_key:
+                return
+            self._by_key[key] = booking
+            insort(self._all, key)
+            insort(self._by_trip.setdefault(booking.trip.trip_id, []), key)
+            insort(self._by_passenger.setdefault(booking.passenger_name.casefold(), []), key)
+
+    def __len__(self) -> int:
+        return len(self._all)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._by_key.clear()
+            self._all.clear()
+            self._by_trip.clear()
+            self._by_passenger.clear()
+
+    def query(
+        self,
+        trip_id: str | None = None,
+        passenger_name: str | None = None,
+        limit: int | None = None,
+        cursor: str | None = None,
+    ) -> tuple[list[Booking], str | None]:
+        """
+        Newest-first page of bookings matching every given filter, plus the
+        cursor for the next page (None on the last page). Passenger names match
+        case-insensitively.
+        """
+        before = decode_cursor(cursor) if cursor else None
+        with self._lock:
+            candidates = [self._all]
+            if trip_id is not None:
+                candidates.append(self._by_trip.get(trip_id, []))
+            if passenger_name is not None:
+                candidates.append(self._by_passenger.get(passenger_name.casefold(), []))
+            # Walk the most selective index; check the other filters per entry.
+            keys = min(candidates, key=len)
+
+            end = bisect_left(keys, before) if before is not None else len(keys)
+            page: list[Booking] = []
+            i = end - 1
+            while i >= 0 and (limit is None or len(page) < limit):
+                booking = self._by_key[keys[i]]
+                if (trip_id is None or booking.trip.trip_id == trip_id) and (
+                    passenger_name is None
+                    or booking.passenger_name.casefold() == passenger_name.casefold()
+                ):
+                    page.append(booking)
+                i -= 1
+            more = i >= 0
+
+        next_cursor = encode_cursor(booking_key(page[-1])) if page and more else None
+        return page, next_cursor
+
+    def scan(
+        self,
+        booked_after: datetime | None = None,
+        booked_before: datetime | None = None,
+        chunk: int = 1000,
+    ) -> Iterator[list[Booking]]:
+        """
+        Bookings with booked_after <= booked_at < booked_before, oldest first,
+        in chunks of at most `chunk`. The lock is only held per chunk, so
+        bookings keep being taken during a long export; those landing after
+        the position reached are included.
+        """
+        stop = (_micros(booked_before), "") if booked_before is not None else None
+        last: Key | None = None
+        while True:
+            with self._lock:
+                keys = self._all
+                if last is not None:
+                    lo = bisect_right(keys, last)
+                else:
+                    start = (_micros(booked_after), "") if booked_after is not None else None
+                    lo = bisect_left(keys, start) if start is not None else 0
+                hi = bisect_left(keys, stop) if stop is not None else len(keys)
+                batch = keys[lo : min(hi, lo + chunk)]
+                page = [self._by_key[key] for key in batch]
+            if not page:
+                return
+            yield page
+            last = batch[-1]
@@ -1,17 +1,45 @@
 from __future__ import annotations
 
-from datetime import datetime, timezone
+import contextlib
 import logging
 import secrets
+import threading
+from collections.abc import Iterator, Sequence
+from datetime import datetime, timezone
 
+from app.core.cache import IdempotencyCache
+from app.core.config import settings
+from app.core.metrics import BOOKED_SEATS, BOOKINGS
 from app.data.seed import get_trip
-from app.models.schemas import Booking, BookingCreate
+from app.models.schemas import (
+    Booking,
+    BookingBulkResult,
+    BookingCreate,
+    FareQuote,
+    FareQuoteResponse,
+    SeatAvailability,
+    Trip,
+)
+from app.services.booking_index import BookingIndex
+from app.services.inventory import SeatInventory
+from app.services.pricing import fare_table
+from app.storage.base import DuplicateBookingId, SeatsUnavailable, StorageBackend, get_storage
 
 logger = logging.getLogger("railway.booking_service")
 
 UTC = timezone.utc
 
 _BOOKINGS: dict[str, Booking] = {}
+_INDEX = BookingIndex()
+_INVENTORY = SeatInventory(settings.inventory_lock_stripes)
+# Idempotency-Key -> booking, so client retries don't book twice.
+_IDEMPOTENCY: IdempotencyCache[Booking] = IdempotencyCache(
+    settings.idempotency_cache_size, settings.idempotency_ttl_s
+)
+_RESTORED = False
+_RESTORE_LOCK = threading.Lock()
+# Tries at storing a booking whose id turns out to be taken in the backend.
+_STORE_ATTEMPTS = 3
 
 
 def _now() -> datetime:
@@ -24,26 +52,96 @@ def _ticket_code() -> str:
     return f"RQ-{a}-{b} 🚆"
 
 
+def _new_booking_id() -> str:
+    return f"B{secrets.randbelow(10**8):08d}"
+
+
+def _claim_id(booking: Booking) -> None:
+    # setdefault is atomic, so two threads can never claim the same id.
+    while _BOOKINGS.setdefault(booking.booking_id, booking) is not booking:
+        booking.booking_id = _new_booking_id()
+
+
+def _store(storage: StorageBackend, bookings: list[Booking]) -> None:
+    """save_bookings, moving bookings to fresh ids if another process took theirs."""
+    for attempt in range(_STORE_ATTEMPTS):
+        try:
+            storage.save_bookings(bookings)
+            return
+        except DuplicateBookingId as e:
+            if attempt == _STORE_ATTEMPTS - 1:
+                raise
+            logger.warning("booking_id_collision ids=%s", ",".join(sorted(e.booking_ids)))
+            for booking in bookings:
+                if booking.booking_id in e.booking_ids:
+                    del _BOOKINGS[booking.booking_id]
+                    booking.booking_id = _new_booking_id()
+                    _claim_id(booking)
+
+
+def restore_bookings() -> None:
+    """Rebuild bookings and seat counters from the storage backend, once per process."""
+    global _RESTORED
+    if _RESTORED:
+        return
+    with _RESTORE_LOCK:
+        if _RESTORED:
+            return
+        storage = get_storage()
+        if storage is not None:
+            count = 0
+            for booking in storage.load_bookings():
+                _BOOKINGS[booking.booking_id] = booking
+                _INDEX.add(booking)
+                _INVENTORY.restore(booking.trip.trip_id, booking.seats)
+                count += 1
+            logger.info("bookings_restored count=%s", count)
+        _RESTORED = True
+
+
 def create_booking(payload: BookingCreate) -> Booking:
-    trip = get_trip(payload.trip_id)
-
-    booking_id = f"B{secrets.randbelow(10**8):08d}"
-    total_price = trip.base_fare * payload.seats
-
-    booking = Booking(
-        booking_id=booking_id,
-        ticket_code=_ticket_code(),
-        passenger_name=payload.passenger_name,
-        trip=trip,
-        seats=payload.seats,
-        total_price=total_price,
-        booked_at=_now(),
-    )
-    _BOOKINGS[booking_id] = booking
+    restore_bookings()
+    try:
+        table = fare_table(settings)
+        travel_class = table.resolve_class(payload.travel_class)
+        trip = get_trip(payload.trip_id)
+        _INVENTORY.reserve(trip.trip_id, payload.seats, trip.capacity)
+    except ValueError:
+        BOOKINGS.inc("rejected")
+        raise
+
+    try:
+        (total_price,) = table.trip_fares([trip], payload.seats, travel_class)
+        booking = Booking(
+            booking_id=_new_booking_id(),
+            ticket_code=_ticket_code(),
+            passenger_name=payload.passenger_name,
+            trip=trip,
+            seats=payload.seats,
+            travel_class=travel_class,
+            total_price=total_price,
+            booked_at=_now(),
+        )
+        _claim_id(booking)
+
+        storage = get_storage()
+        if storage is not None:
+            try:
+                _store(storage, [booking])
+            except BaseException:
+                del _BOOKINGS[booking.booking_id]
+                raise
+    except BaseException:
+        _INVENTORY.release(trip.trip_id, payload.seats)
+        BOOKINGS.inc("failed")
+        raise
+    _INDEX.add(booking)
+    BOOKINGS.inc("created")
+    BOOKED_SEATS.inc(amount=payload.seats)
 
     logger.info(
         "booking_stored booking_id=%s trip_id=%s seats=%s total_price=%s",
-        booking_id,
+        booking.booking_id,
         payload.trip_id,
         payload.seats,
         total_price,
@@ -51,6 +149,195 @@ def create_booking(payload: BookingCreate) -> Booking:
     return booking
 
 
+def create_bookings(
+    items: Sequence[tuple[int, BookingCreate]], all_or_nothing: bool = False
+) -> list[BookingBulkResult]:
+    """
+    Book a group of (index, payload) items with one seat reservation pass and
+    one storage write; index is echoed on each item's result.
+
+    Items that can't be booked get an error and the rest go ahead, unless
+    all_or_nothing, in which case nothing is booked if any item fails.
+    """
+    restore_bookings()
+    table = fare_table(settings)
+    results = [BookingBulkResult(index=index) for index, _ in items]
+
+    trips: dict[str, Trip] = {}
+    valid: list[tuple[BookingBulkResult, BookingCreate, Trip, str]] = []
+    for result, (_, payload) in zip(results, items, strict=True):
+        try:
+            travel_class = table.resolve_class(payload.travel_class)
+            trip = trips.get(payload.trip_id) or get_trip(payload.trip_id)
+        except ValueError as e:
+            result.error = str(e)
+            continue
+        trips[trip.trip_id] = trip
+        valid.append((result, payload, trip, travel_class))
+
+    to_book: list[tuple[BookingBulkResult, BookingCreate, Trip, str]] = []
+    if not all_or_nothing or len(valid) == len(items):
+        granted = _INVENTORY.reserve_many(
+            [(trip.trip_id, payload.seats, trip.capacity) for _, payload, trip, _ in valid],
+            all_or_nothing,
+        )
+        for item, ok in zip(valid, granted, strict=True):
+            if ok:
+                to_book.append(item)
+            else:
+                item[0].error = "Not enough seats available."
+        if all_or_nothing and len(to_book) < len(valid):
+            to_book = []
+
+    # Priced per (class, seats) group, of which a batch has only a handful.
+    groups: dict[tuple[str, int], list[int]] = {}
+    for n, (_, payload, _, travel_class) in enumerate(to_book):
+        groups.setdefault((travel_class, payload.seats), []).append(n)
+    prices = [0] * len(to_book)
+    for (travel_class, seats), members in groups.items():
+        fares = table.trip_fares([to_book[n][2] for n in members], seats, travel_class)
+        for n, fare in zip(members, fares, strict=True):
+            prices[n] = fare
+
+    booked_at = _now()
+    bookings: list[Booking] = []
+    for (_, payload, trip, travel_class), price in zip(to_book, prices, strict=True):
+        booking = Booking(
+            booking_id=_new_booking_id(),
+            ticket_code=_ticket_code(),
+            passenger_name=payload.passenger_name,
+            trip=trip,
+            seats=payload.seats,
+            travel_class=travel_class,
+            total_price=price,
+            booked_at=booked_at,
+        )
+        _claim_id(booking)
+        bookings.append(booking)
+
+    storage = get_storage()
+    try:
+        if storage is not None and bookings:
+            _store(storage, bookings)
+    except BaseException as e:
+        # Roll back like create_booking does, whatever interrupted the write.
+        for booking in bookings:
+            del _BOOKINGS[booking.booking_id]
+            _INVENTORY.release(booking.trip.trip_id, booking.seats)
+        BOOKINGS.inc("failed", amount=len(bookings))
+        if not isinstance(e, Exception):
+            raise
+        logger.exception("bookings_bulk_store_failed count=%s", len(bookings))
+        error = str(e) if isinstance(e, SeatsUnavailable) else "Booking could not be stored."
+        for result, *_ in to_book:
+            result.error = error
+        failed, bookings = len(bookings), []
+    else:
+        failed = 0
+        for (result, *_), booking in zip(to_book, bookings, strict=True):
+            _INDEX.add(booking)
+            result.booking = booking
+
+    if all_or_nothing:
+        for result in results:
+            if result.booking is None and result.error is None:
+                result.error = "Not booked: another item in the group failed."
+    created = len(bookings)
+    seats = sum(b.seats for b in bookings)
+    BOOKINGS.inc("created", amount=created)
+    BOOKINGS.inc("rejected", amount=len(results) - created - failed)
+    BOOKED_SEATS.inc(amount=seats)
+    logger.info(
+        "bookings_bulk_stored items=%s created=%s seats=%s all_or_nothing=%s",
+        len(results),
+        created,
+        seats,
+        all_or_nothing,
+    )
+    return results
+
+
+def create_booking_once(payload: BookingCreate, idempotency_key: str) -> tuple[Booking, bool]:
+    """
+    create_booking at most once per idempotency key, as (booking, replayed).
+
+    Repeats of a key get the first call's booking (waiting for it if it is
+    still running); repeats with a different payload raise IdempotencyKeyReused.
+    """
+    booking, replayed = _IDEMPOTENCY.run(
+        idempotency_key, payload.model_dump_json(), lambda: create_booking(payload)
+    )
+    if replayed:
+        BOOKINGS.inc("replayed")
+        logger.info(
+            "booking_replayed booking_id=%s idempotency_key=%s", booking.booking_id, idempotency_key
+        )
+    return booking, replayed
+
+
+def quote_fares(
+    trip_ids: list[str], seats: int = 1, travel_class: str | None = None
+) -> FareQuoteResponse:
+    """Price seats on each trip without booking; unknown trips get no price."""
+    table = fare_table(settings)
+    travel_class = table.resolve_class(travel_class)
+    trips = []
+    for trip_id in trip_ids:
+        with contextlib.suppress(ValueError):
+            trips.append(get_trip(trip_id))
+    prices = dict(
+        zip((t.trip_id for t in trips), table.trip_fares(trips, seats, travel_class), strict=True)
+    )
+    return FareQuoteResponse(
+        seats=seats,
+        travel_class=travel_class,
+        quotes=[FareQuote(trip_id=t, total_price=prices.get(t)) for t in trip_ids],
+    )
+
+
+def seat_availability(trip_id: str) -> SeatAvailability:
+    restore_bookings()
+    trip = get_trip(trip_id)
+    reserved = _INVENTORY.reserved(trip_id)
+    return SeatAvailability(
+        trip_id=trip_id,
+        capacity=trip.capacity,
+        reserved=reserved,
+        available=trip.capacity - reserved,
+    )
+
+
+def export_bookings(
+    booked_after: datetime | None = None,
+    booked_before: datetime | None = None,
+    chunk: int = 1000,
+) -> Iterator[list[Booking]]:
+    """Bookings by booked_at (after inclusive, before exclusive), oldest first, in chunks."""
+    restore_bookings()
+    return _INDEX.scan(booked_after, booked_before, chunk)
+
+
 def list_bookings() -> list[Booking]:
+    restore_bookings()
     logger.info("bookings_count count=%s", len(_BOOKINGS))
-    return sorted(_BOOKINGS.values(), key=lambda b: b.booked_at, reverse=True)
+    return _INDEX.query()[0]
+
+
+def query_bookings(
+    trip_id: str | None = None,
+    passenger_name: str | None = None,
+    limit: int | None = None,
+    cursor: str | None = None,
+) -> tuple[list[Booking], str | None]:
+    """Newest-first page of bookings and the cursor for the next one."""
+    restore_bookings()
+    page, next_cursor = _INDEX.query(trip_id, passenger_name, limit, cursor)
+    logger.info(
+        "bookings_query trip_id=%s passenger_name=%s limit=%s returned=%s more=%s",
+        trip_id,
+        passenger_name,
+        limit,
+        len(page),
+        next_cursor is not None,
+    )
+    return page, next_cursor
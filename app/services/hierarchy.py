@@ -0,0 +1,345 @@
+"""
+Contraction hierarchy (CH) over the compiled network.
+
+Preprocessing contracts nodes one by one in order of importance, adding a
+shortcut u->x whenever the only shortest u->x path ran through the contracted
+node. Queries then run two small Dijkstra searches that only climb towards
+more important nodes, and shortcuts are unpacked back into real edges.
+
+Build offline and store next to the network with:
+
+    python -m app.services.hierarchy build ch_index.pkl
+
+then point CH_INDEX_PATH at the file and set ROUTING_ALGORITHM=ch.
+"""
+
+from __future__ import annotations
+
+import argparse
+import heapq
+import logging
+import os
+import pickle
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from collections.abc import Sequence
+from dataclasses import dataclass, fields
+from itertools import pairwise
+
+from app.core.config import settings
+from app.data.graph import CompiledGraph, get_compiled_graph
+
+logger = logging.getLogger("railway.hierarchy")
+
+_INF = float("inf")
+
+# Settled-node budget for a single witness search during preprocessing.
+# Lower is faster to build but adds more (harmless) shortcuts.
+WITNESS_SETTLE_LIMIT = 500
+
+
+@dataclass(frozen=True)
+class ContractionHierarchy:
+    graph_version: str
+    rank: Sequence[int]
+    # Upward edges u->v (rank[v] > rank[u]), CSR by u; searched from the origin.
+    up_offsets: Sequence[int]
+    up_targets: Sequence[int]
+    up_km: Sequence[int]
+    # Edges u->v with rank[u] > rank[v], CSR by v; searched backwards from the goal.
+    down_offsets: Sequence[int]
+    down_targets: Sequence[int]
+    down_km: Sequence[int]
+    # (u, v) -> contracted middle node, for every edge that is a shortcut
+    shortcuts: dict[tuple[int, int], int]
+
+    @property
+    def shortcut_count(self) -> int:
+        return len(self.shortcuts)
+
+
+def _to_csr(n: int, adjacency: list[list[tuple[int, int]]]) -> tuple[array, array, array]:
+    offsets = array("i", [0])
+    targets = array("i")
+    km = array("i")
+    for u in range(n):
+        for v, w in adjacency[u]:
+            targets.append(v)
+            km.append(w)
+        offsets.append(len(targets))
+    return offsets, targets, km
+
+
+def build_hierarchy(
+    g: CompiledGraph, witness_limit: int = WITNESS_SETTLE_LIMIT
+) -> ContractionHierarchy:
+    n = g.node_count
+    out: list[dict[int, int]] = [{} for _ in range(n)]
+    inc: list[dict[int, int]] = [{} for _ in range(n)]
+    for u in range(n):
+        for i in range(g.offsets[u], g.offsets[u + 1]):
+            v, w = g.targets[i], g.km[i]
+            if u != v and w < out[u].get(v, _INF):
+                out[u][v] = w
+                inc[v][u] = w
+
+    # Every edge of the final hierarchy, original or shortcut, cheapest per pair.
+    edges: dict[tuple[int, int], int] = {(u, v): w for u in range(n) for v, w in out[u].items()}
+    shortcuts: dict[tuple[int, int], int] = {}
+    deleted_neighbors = [0] * n
+    rank = [0] * n
+
+    def witness_search(
+        source: int, skip: int, max_dist: int, targets: dict[int, int]
+    ) -> dict[int, int]:
+        dist = {source: 0}
+        pq = [(0, source)]
+        settled = 0
+        remaining = len(targets) - (source in targets)
+        while pq and remaining > 0:
+            d, u = heapq.heappop(pq)
+            if d != dist[u]:
+                continue
+            if d > max_dist or settled >= witness_limit:
+                break
+            settled += 1
+            if u in targets and u != source:
+                remaining -= 1
+            for v, w in out[u].items():
+                if v == skip:
+                    continue
+                nd = d + w
+                if nd < dist.get(v, _INF):
+                    dist[v] = nd
+                    heapq.heappush(pq, (nd, v))
+        return dist
+
+    def needed_shortcuts(v: int) -> list[tuple[int, int, int]]:
+        result: list[tuple[int, int, int]] = []
+        if not out[v]:
+            return result
+        max_out = max(out[v].values())
+        for u, wu in inc[v].items():
+            dist = witness_search(u, v, wu + max_out, out[v])
+            for x, wx in out[v].items():
+                if x != u and dist.get(x, _INF) > wu + wx:
+                    result.append((u, x, wu + wx))
+        return result
+
+    def priority(v: int, shortcut_count: int) -> int:
+        # Edge difference plus a spreading term so contraction stays uniform.
+        return shortcut_count - len(inc[v]) - len(out[v]) + deleted_neighbors[v]
+
+    heap = [(priority(v, len(needed_shortcuts(v))), v) for v in range(n)]
+    heapq.heapify(heap)
+
+    order = 0
+    while heap:
+        _, v = heapq.heappop(heap)
+        added = needed_shortcuts(v)
+        prio = priority(v, len(added))
+        if heap and prio > heap[0][0]:
+            # Lazy update: importance grew since it was queued.
+            heapq.heappush(heap, (prio, v))
+            continue
+
+        rank[v] = order
+        order += 1
+        for u, x, w in added:
+            if w < out[u].get(x, _INF):
+                out[u][x] = w
+                inc[x][u] = w
+                edges[(u, x)] = w
+                shortcuts[(u, x)] = v
+        for u in inc[v]:
+            del out[u][v]
+            deleted_neighbors[u] += 1
+        for x in out[v]:
+            del inc[x][v]
+            deleted_neighbors[x] += 1
+        out[v] = {}
+        inc[v] = {}
+
+    up: list[list[tuple[int, int]]] = [[] for _ in range(n)]
+    down: list[list[tuple[int, int]]] = [[] for _ in range(n)]
+    for (u, v), w in edges.items():
+        if rank[u] < rank[v]:
+            up[u].append((v, w))
+        else:
+            down[v].append((u, w))
+
+    up_offsets, up_targets, up_km = _to_csr(n, up)
+    down_offsets, down_targets, down_km = _to_csr(n, down)
+    return ContractionHierarchy(
+        graph_version=g.version,
+        rank=array("i", rank),
+        up_offsets=up_offsets,
+        up_targets=up_targets,
+        up_km=up_km,
+        down_offsets=down_offsets,
+        down_targets=down_targets,
+        down_km=down_km,
+        shortcuts=shortcuts,
+    )
+
+
+def _unpack(shortcuts: dict[tuple[int, int], int], u: int, v: int, nodes: list[int]) -> None:
+    """Append the real nodes after u on the (possibly shortcut) edge u->v."""
+    stack = [(u, v)]
+    while stack:
+        a, b = stack.pop()
+        mid = shortcuts.get((a, b))
+        if mid is None:
+            nodes.append(b)
+        else:
+            stack.append((mid, b))
+            stack.append((a, mid))
+
+
+def hierarchy_query(ch: ContractionHierarchy, start: int, goal: int) -> tuple[int, list[int]]:
+    """Same contract as routing_service._dijkstra: (total_km, real path nodes)."""
+    if start == goal:
+        return 0, [start]
+
+    dist_f: dict[int, int] = {start: 0}
+    dist_b: dict[int, int] = {goal: 0}
+    prev_f: dict[int, int] = {}
+    prev_b: dict[int, int] = {}
+    pq_f: list[tuple[int, int]] = [(0, start)]
+    pq_b: list[tuple[int, int]] = [(0, goal)]
+    best: float = _INF
+    meet = -1
+
+    while pq_f or pq_b:
+        forward = bool(pq_f) and (not pq_b or pq_f[0][0] <= pq_b[0][0])
+        if forward:
+            pq, dist, other, prev = pq_f, dist_f, dist_b, prev_f
+            offsets, targets, km = ch.up_offsets, ch.up_targets, ch.up_km
+        else:
+            pq, dist, other, prev = pq_b, dist_b, dist_f, prev_b
+            offsets, targets, km = ch.down_offsets, ch.down_targets, ch.down_km
+
+        d, u = heapq.heappop(pq)
+        if d != dist[u]:
+            continue
+        if d >= best:
+            # Nothing left on this side can improve the meeting point.
+            pq.clear()
+            continue
+        if u in other and d + other[u] < best:
+            best = d + other[u]
+            meet = u
+
+        for i in range(offsets[u], offsets[u + 1]):
+            v = targets[i]
+            nd = d + km[i]
+            if nd < dist.get(v, _INF):
+                dist[v] = nd
+                prev[v] = u
+                heapq.heappush(pq, (nd, v))
+
+    if meet < 0:
+        raise ValueError("No route found between these stations.")
+
+    up_chain = [meet]
+    while up_chain[-1] != start:
+        up_chain.append(prev_f[up_chain[-1]])
+    up_chain.reverse()
+    down_chain = [meet]
+    while down_chain[-1] != goal:
+        down_chain.append(prev_b[down_chain[-1]])
+
+    nodes = [start]
+    chain = up_chain + down_chain[1:]
+    for u, v in pairwise(chain):
+        _unpack(ch.shortcuts, u, v, nodes)
+    return int(best), nodes
+
+
+def save_hierarchy(ch: ContractionHierarchy, path: str) -> None:
+    # Stored as a plain dict so the file does not depend on the class's import path.
+    data = {f.name: getattr(ch, f.name) for f in fields(ch)}
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as fh:
+        pickle.dump(data, fh, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, path)
+
+
+def load_hierarchy(path: str) -> ContractionHierarchy:
+    with open(path, "rb") as fh:
+        data = pickle.load(fh)
+    try:
+        return ContractionHierarchy(**data)
+    except TypeError as e:
+        raise ValueError(f"{path} does not contain a contraction hierarchy.") from e
+
+
+# By graph version. Two are kept so that routing calls still finishing on the
+# previous network after a hot swap don't evict (and rebuild) the new one.
+_HIERARCHIES: OrderedDict[str, ContractionHierarchy] = OrderedDict()
+_HIERARCHY_LOCK = threading.Lock()
+_KEEP_HIERARCHIES = 2
+
+
+def get_hierarchy(g: CompiledGraph) -> ContractionHierarchy:
+    """
+    Hierarchy matching g's version: loaded from settings.ch_index_path when that
+    file was built for this network, otherwise built in-process (once).
+    """
+    ch = _HIERARCHIES.get(g.version)
+    if ch is not None:
+        return ch
+
+    with _HIERARCHY_LOCK:
+        ch = _HIERARCHIES.get(g.version)
+        if ch is not None:
+            return ch
+
+        path = settings.ch_index_path
+        if path and os.path.exists(path):
+            ch = load_hierarchy(path)
+            if ch.graph_version != g.version:
+                logger.warning(
+                    "ch_index_stale path=%s index_version=%s graph_version=%s",
+                    path,
+                    ch.graph_version,
+                    g.version,
+                )
+                ch = None
+
+        if ch is None:
+            start = time.perf_counter()
+            ch = build_hierarchy(g)
+            logger.info(
+                "ch_built nodes=%s shortcuts=%s duration_ms=%.2f",
+                g.node_count,
+                ch.shortcut_count,
+                (time.perf_counter() - start) * 1000.0,
+            )
+        _HIERARCHIES[g.version] = ch
+        while len(_HIERARCHIES) > _KEEP_HIERARCHIES:
+            _HIERARCHIES.popitem(last=False)
+        return ch
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Contraction hierarchy preprocessing.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build = sub.add_parser("build", help="Build a hierarchy for the current network.")
+    build.add_argument("out", help="Output file, e.g. ch_index.pkl")
+    args = parser.parse_args(argv)
+
+    g = get_compiled_graph()
+    start = time.perf_counter()
+    ch = build_hierarchy(g)
+    save_hierarchy(ch, args.out)
+    print(
+        f"built hierarchy for graph {g.version}: {g.node_count} nodes, "
+        f"{ch.shortcut_count} shortcuts in {time.perf_counter() - start:.2f}s -> {args.out}"
+    )
+
+
+if __name__ == "__main__":
+    main()
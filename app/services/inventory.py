@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+import threading
+import zlib
+from collections.abc import Sequence
+
+
+class SeatInventory:
+    """
+    Reserved-seat counters per trip.
+
+    Each trip maps onto one of a fixed set of striped locks, so a reservation
+    only serialises against other reservations on the same stripe: bookings on
+    different trips (almost always different stripes) never wait on each other,
+    while check-and-increment on a single trip is atomic.
+    """
+
+    def __init__(self, stripes: int = 64) -> None:
+        self._locks = [threading.Lock() for _ in range(stripes)]
+        self._reserved: dict[str, int] = {}
+
+    def _stripe(self, trip_id: str) -> int:
+        # crc32 rather than hash(): stable across processes and runs
+        return zlib.crc32(trip_id.encode()) % len(self._locks)
+
+    def _lock_for(self, trip_id: str) -> threading.Lock:
+        return self._locks[self._stripe(trip_id)]
+
+    def reserve(self, trip_id: str, seats: int, capacity: int) -> int:
+        """Atomically take seats on a trip; returns the seats left afterwards."""
+        if seats < 1:
+            raise ValueError("seats must be positive.")
+        with self._lock_for(trip_id):
+            reserved = self._reserved.get(trip_id, 0)
+            if reserved + seats > capacity:
+                raise ValueError("Not enough seats available.")
+            self._reserved[trip_id] = reserved + seats
+        return capacity - reserved - seats
+
+    def reserve_many(
+        self, requests: Sequence[tuple[str, int, int]], all_or_nothing: bool = False
+    ) -> list[bool]:
+        """
+        Take seats for many (trip_id, seats, capacity) requests under one
+        acquisition of the stripes involved; returns which were granted.
+
+        Requests are granted in order while seats last. With all_or_nothing,
+        nothing is taken unless every request fits (the result still says
+        which ones did).
+        """
+        if any(seats < 1 for _, seats, _ in requests):
+            raise ValueError("seats must be positive.")
+        # Stripes are taken in index order, so two batches can't deadlock.
+        stripes = sorted({self._stripe(trip_id) for trip_id, _, _ in requests})
+        for i in stripes:
+            self._locks[i].acquire()
+        try:
+            taken: dict[str, int] = {}
+            granted: list[bool] = []
+            for trip_id, seats, capacity in requests:
+                reserved = self._reserved.get(trip_id, 0) + taken.get(trip_id, 0)
+                ok = reserved + seats <= capacity
+                if ok:
+                    taken[trip_id] = taken.get(trip_id, 0) + seats
+                granted.append(ok)
+            if all_or_nothing and not all(granted):
+                return granted
+            for trip_id, seats in taken.items():
+                self._reserved[trip_id] = self._reserved.get(trip_id, 0) + seats
+            return granted
+        finally:
+            for i in stripes:
+                self._locks[i].release()
+
+    def release(self, trip_id: str, seats: int) -> None:
+        with self._lock_for(trip_id):
+            reserved = self._reserved.get(trip_id, 0)
+            if seats > reserved:
+                raise RuntimeError(f"Releasing {seats} seats but only {reserved} reserved.")
+            self._reserved[trip_id] = reserved - seats
+
+    def restore(self, trip_id: str, seats: int) -> None:
+        """Count seats of an already-confirmed booking (e.g. replayed from storage)."""
+        with self._lock_for(trip_id):
+            self._reserved[trip_id] = self._reserved.get(trip_id, 0) + seats
+
+    def reserved(self, trip_id: str) -> int:
+        return self._reserved.get(trip_id, 0)
+
+    def clear(self) -> None:
+        for lock in self._locks:
+            lock.acquire()
+        try:
+            self._reserved.clear()
+        finally:
+            for lock in self._locks:
+                lock.release()
@@ -0,0 +1,184 @@
+from __future__ import annotations
+
+import logging
+import threading
+from array import array
+from bisect import bisect_left
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from itertools import pairwise
+
+from app.core.config import settings
+from app.data.graph import get_compiled_graph
+from app.data.seed import list_trips, trips_version
+from app.models.schemas import Journey, Trip
+
+logger = logging.getLogger("railway.journey_service")
+
+UTC = timezone.utc
+
+_INF = float("inf")
+
+
+@dataclass(frozen=True)
+class Timetable:
+    """
+    Trips flattened into departure-sorted parallel arrays ("connections").
+
+    Times are POSIX timestamps; stops are dense ids from stop_index. run is
+    the train run (Trip.run_id, else the trip itself) of each connection, and
+    prev_in_run the run's previous connection (-1 for its first).
+    """
+
+    version: int
+    stop_index: dict[str, int]
+    dep_time: array
+    arr_time: array
+    dep_stop: array
+    arr_stop: array
+    run: array
+    prev_in_run: array
+    trips: list[Trip]
+
+
+def build_timetable(trips: list[Trip], version: int = 0) -> Timetable:
+    stop_index: dict[str, int] = {}
+    run_index: dict[str, int] = {}
+    last_in_run: dict[int, int] = {}
+    dep_time, arr_time = array("d"), array("d")
+    dep_stop, arr_stop = array("i"), array("i")
+    run, prev_in_run = array("i"), array("i")
+    ordered = sorted(trips, key=lambda t: t.depart_at)
+    for c, trip in enumerate(ordered):
+        dep_time.append(trip.depart_at.timestamp())
+        arr_time.append(trip.arrive_at.timestamp())
+        dep_stop.append(stop_index.setdefault(trip.from_station, len(stop_index)))
+        arr_stop.append(stop_index.setdefault(trip.to_station, len(stop_index)))
+        r = run_index.setdefault(trip.run_id or trip.trip_id, len(run_index))
+        run.append(r)
+        prev_in_run.append(last_in_run.get(r, -1))
+        last_in_run[r] = c
+    return Timetable(
+        version, stop_index, dep_time, arr_time, dep_stop, arr_stop, run, prev_in_run, ordered
+    )
+
+
+_TIMETABLE: Timetable | None = None
+_TIMETABLE_LOCK = threading.Lock()
+
+
+def get_timetable() -> Timetable:
+    """Timetable for the current trip store, rebuilt only when trips change."""
+    global _TIMETABLE
+    version = trips_version()
+    tt = _TIMETABLE
+    if tt is not None and tt.version == version:
+        return tt
+    with _TIMETABLE_LOCK:
+        if _TIMETABLE is None or _TIMETABLE.version != version:
+            _TIMETABLE = build_timetable(list_trips(), version)
+        return _TIMETABLE
+
+
+def _connection_scan(
+    tt: Timetable, source: int, goal: int, after: float, transfer_s: float
+) -> list[int]:
+    """
+    Earliest-arrival Connection Scan. Returns the connection indexes of the
+    best itinerary in travel order, or [] when the goal can't be reached.
+
+    Transfer time is only needed to board a run: once on it, every later
+    connection of the same run can be ridden, however short the dwell.
+    """
+    dep_time, arr_time = tt.dep_time, tt.arr_time
+    dep_stop, arr_stop = tt.dep_stop, tt.arr_stop
+    run, prev_in_run = tt.run, tt.prev_in_run
+
+    # ready: earliest time a passenger can board at a stop (arrival + transfer)
+    ready: dict[int, float] = {source: after}
+    # run -> connection it was first boarded at
+    boarded: dict[int, int] = {}
+    arrival: dict[int, float] = {}
+    via: dict[int, int] = {}
+    best = _INF
+
+    for c in range(bisect_left(dep_time, after), len(dep_time)):
+        departs = dep_time[c]
+        if departs >= best:
+            break
+        if run[c] not in boarded:
+            if ready.get(dep_stop[c], _INF) > departs:
+                continue
+            boarded[run[c]] = c
+        stop, arrives = arr_stop[c], arr_time[c]
+        if stop == source or arrives >= arrival.get(stop, _INF):
+            continue
+        arrival[stop] = arrives
+        ready[stop] = arrives + transfer_s
+        via[stop] = c
+        if stop == goal:
+            best = arrives
+
+    if goal not in via:
+        return []
+    path: list[int] = []
+    stop = goal
+    while stop != source:
+        c = via[stop]
+        # Back along the run to where it was boarded, then to how we got there.
+        enter = boarded[run[c]]
+        path.append(c)
+        while c != enter:
+            c = prev_in_run[c]
+            path.append(c)
+        stop = dep_stop[enter]
+    path.reverse()
+    return path
+
+
+def _transfers(tt: Timetable, path: list[int]) -> int:
+    """Changes of train along a path of connections."""
+    return sum(1 for a, b in pairwise(path) if tt.run[a] != tt.run[b])
+
+
+def plan_journey(
+    from_station: str, to_station: str, depart_after: datetime | None = None
+) -> Journey:
+    stations = get_compiled_graph().stations
+    if from_station not in stations or to_station not in stations:
+        raise ValueError("Unknown station code(s).")
+    if from_station == to_station:
+        raise ValueError("Origin and destination must differ.")
+
+    depart_after = depart_after or datetime.now(tz=UTC)
+    if depart_after.tzinfo is None:
+        depart_after = depart_after.replace(tzinfo=UTC)
+
+    tt = get_timetable()
+    source = tt.stop_index.get(from_station)
+    goal = tt.stop_index.get(to_station)
+    path: list[int] = []
+    if source is not None and goal is not None:
+        transfer_s = timedelta(minutes=settings.min_transfer_minutes).total_seconds()
+        path = _connection_scan(tt, source, goal, depart_after.timestamp(), transfer_s)
+    if not path:
+        raise ValueError("No journey found between these stations after the given time.")
+
+    legs = [tt.trips[c] for c in path]
+    journey = Journey(
+        from_station=from_station,
+        to_station=to_station,
+        depart_at=legs[0].depart_at,
+        arrive_at=legs[-1].arrive_at,
+        transfers=_transfers(tt, path),
+        legs=legs,
+    )
+    logger.info(
+        "journey_planned from=%s to=%s depart_at=%s arrive_at=%s legs=%s",
+        from_station,
+        to_station,
+        journey.depart_at.isoformat(),
+        journey.arrive_at.isoformat(),
+        len(legs),
+    )
+    return journey
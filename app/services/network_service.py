@@ -0,0 +1,135 @@
+"""
+Hot swapping of the routing network.
+
+The active network is one immutable CompiledGraph (CSR arrays, stations and
+a content version) behind a single reference in app.data.graph. A reload
+loads the new snapshot and prepares what depends on it (contraction
+hierarchy, routing worker processes) while the old graph keeps serving, then
+replaces the reference in one assignment, RCU-style: calls that already hold
+the old graph finish on it, new calls see the new one, and the old graph is
+freed once its last reader is done.
+
+Reloads are triggered through POST /admin/network/reload or, with
+NETWORK_WATCH_INTERVAL_S > 0, by replacing the file at NETWORK_SNAPSHOT_PATH.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+
+from app.core.config import settings
+from app.core.metrics import REGISTRY
+from app.data.graph import CompiledGraph, get_compiled_graph, swap_compiled_graph
+from app.data.snapshot import load_snapshot
+from app.services.routing_pool import replace_routing_pool
+from app.services.routing_service import prepare_routing
+
+logger = logging.getLogger("railway.network_service")
+
+_RELOAD_LOCK = threading.Lock()
+
+NETWORK_RELOADS = REGISTRY.counter(
+    "railway_network_reloads_total", "Network reloads by outcome.", ("outcome",)
+)
+REGISTRY.gauge(
+    "railway_network_info",
+    "The active network (always 1), labelled with its version.",
+    lambda: [((get_compiled_graph().version,), 1)],
+    ("version",),
+)
+
+
+def reload_network() -> tuple[CompiledGraph, bool]:
+    """
+    Load NETWORK_SNAPSHOT_PATH and make it the active network.
+
+    Returns (active graph, whether it changed). Blocking; run it off the
+    event loop. Concurrent reloads are serialized.
+    """
+    path = settings.network_snapshot_path
+    if not path:
+        raise ValueError("No network snapshot configured (NETWORK_SNAPSHOT_PATH).")
+
+    with _RELOAD_LOCK:
+        current = get_compiled_graph()
+        start = time.perf_counter()
+        try:
+            g = load_snapshot(path, verify=True)
+        except (OSError, ValueError):
+            NETWORK_RELOADS.inc("failed")
+            raise
+        if g.version == current.version:
+            NETWORK_RELOADS.inc("unchanged")
+            return current, False
+
+        prepare_routing(g)
+        replace_routing_pool(path)
+        swap_compiled_graph(g)
+        NETWORK_RELOADS.inc("swapped")
+        logger.info(
+            "network_swapped previous=%s version=%s nodes=%s edges=%s duration_ms=%.2f",
+            current.version,
+            g.version,
+            g.node_count,
+            g.edge_count,
+            (time.perf_counter() - start) * 1000.0,
+        )
+        return g, True
+
+
+class SnapshotWatcher:
+    """Polls the snapshot file and reloads the network when it is replaced."""
+
+    def __init__(self, path: str, interval_s: float) -> None:
+        self.path = path
+        self.interval_s = interval_s
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="network-watch", daemon=True)
+
+    def _signature(self) -> tuple[int, int, int] | None:
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+    def _run(self) -> None:
+        seen = self._signature()
+        while not self._stop.wait(self.interval_s):
+            signature = self._signature()
+            if signature is None or signature == seen:
+                continue
+            seen = signature
+            try:
+                reload_network()
+            except Exception:
+                logger.exception("network_reload_failed path=%s", self.path)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+
+_WATCHER: SnapshotWatcher | None = None
+
+
+def start_network_watcher() -> None:
+    global _WATCHER
+    if settings.network_snapshot_path and settings.network_watch_interval_s > 0 and not _WATCHER:
+        _WATCHER = SnapshotWatcher(
+            settings.network_snapshot_path, settings.network_watch_interval_s
+        )
+        _WATCHER.start()
+
+
+def stop_network_watcher() -> None:
+    global _WATCHER
+    if _WATCHER is not None:
+        _WATCHER.stop()
+        _WATCHER = None
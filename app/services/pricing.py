@@ -0,0 +1,157 @@
+"""
+Fare quotes from the tables in app/core/config.py.
+
+A fare is built from three tables:
+
+    distance tiers   the per-km rate tapers along a journey, like tax brackets:
+                     each km costs fare_per_km times the multiplier of its band
+    classes          multiply the whole fare; the first class is the default
+    time of day      multiply a trip's fare by its (local) departure hour
+
+The distance tiers are turned into prefix sums once, so pricing a distance is
+one bisect and a multiply. Route legs are priced on the cumulative distance
+along the route (leg fare = fare up to its end - fare up to its start), which
+makes leg fares add up to the route fare and tapers the whole journey rather
+than each leg. Trips already carry a distance-based base_fare, which class and
+time of day scale.
+
+Everything takes batches (a page of routes, a matrix, a list of trips) and
+prices them in one pass over flat lists, with the per-call lookups (class,
+table, settings) done once instead of per item.
+"""
+
+from __future__ import annotations
+
+import itertools
+from bisect import bisect_right
+from collections.abc import Sequence
+from dataclasses import dataclass
+from datetime import timezone
+
+from app.core.config import Settings
+from app.models.schemas import Trip
+
+UTC = timezone.utc
+
+
+@dataclass(frozen=True)
+class FareTable:
+    band_starts: tuple[int, ...]
+    # fare per km within each band, and the fare of all km below the band's start
+    band_rates: tuple[float, ...]
+    band_base: tuple[float, ...]
+    classes: tuple[tuple[str, float], ...]
+    # multiplier per local departure hour, 0..23
+    hourly: tuple[float, ...]
+    utc_offset_minutes: int
+
+    @classmethod
+    def from_settings(cls, s: Settings) -> FareTable:
+        starts = tuple(int(start) for start, _ in s.fare_distance_tiers)
+        rates = tuple(s.fare_per_km * float(mult) for _, mult in s.fare_distance_tiers)
+        base = tuple(
+            itertools.accumulate(
+                (
+                    rate * (end - start)
+                    for (start, end), rate in zip(
+                        itertools.pairwise(starts), rates[:-1], strict=True
+                    )
+                ),
+                initial=0.0,
+            )
+        )
+        hour_starts = [int(start) for start, _ in s.fare_time_of_day]
+        hourly = tuple(
+            float(s.fare_time_of_day[bisect_right(hour_starts, hour) - 1][1]) for hour in range(24)
+        )
+        return cls(
+            band_starts=starts,
+            band_rates=rates,
+            band_base=base,
+            classes=tuple((name, float(mult)) for name, mult in s.fare_classes),
+            hourly=hourly,
+            utc_offset_minutes=s.fare_utc_offset_minutes,
+        )
+
+    @property
+    def default_class(self) -> str:
+        return self.classes[0][0]
+
+    def resolve_class(self, travel_class: str | None) -> str:
+        """travel_class, or the default class for None; ValueError if unknown."""
+        if travel_class is None:
+            return self.default_class
+        if not any(name == travel_class for name, _ in self.classes):
+            known = ", ".join(name for name, _ in self.classes)
+            raise ValueError(f"Unknown travel class {travel_class!r} (expected one of {known}).")
+        return travel_class
+
+    def _class_multiplier(self, travel_class: str | None) -> float:
+        travel_class = self.resolve_class(travel_class)
+        return next(mult for name, mult in self.classes if name == travel_class)
+
+    def _distance_costs(self, kms: Sequence[int | None], multiplier: float) -> list[float | None]:
+        """Unrounded fare for each distance (None stays None)."""
+        if len(self.band_starts) == 1:
+            rate = self.band_rates[0] * multiplier
+            return [None if km is None else km * rate for km in kms]
+        starts, rates, base = self.band_starts, self.band_rates, self.band_base
+        costs: list[float | None] = []
+        for km in kms:
+            if km is None:
+                costs.append(None)
+                continue
+            band = bisect_right(starts, km) - 1
+            costs.append((base[band] + (km - starts[band]) * rates[band]) * multiplier)
+        return costs
+
+    def distance_fares(
+        self, kms: Sequence[int | None], travel_class: str | None = None
+    ) -> list[int | None]:
+        """Fare for each total distance; None (unreachable) stays None."""
+        costs = self._distance_costs(kms, self._class_multiplier(travel_class))
+        return [None if c is None else round(c) for c in costs]
+
+    def leg_fares(
+        self, routes: Sequence[Sequence[int]], travel_class: str | None = None
+    ) -> list[list[int]]:
+        """Per-leg fares for each route, given as the km of its legs in order."""
+        cumulative = [list(itertools.accumulate(legs, initial=0)) for legs in routes]
+        flat = [km for points in cumulative for km in points]
+        costs = self._distance_costs(flat, self._class_multiplier(travel_class))
+        rounded = [round(c) for c in costs]
+
+        fares: list[list[int]] = []
+        pos = 0
+        for points in cumulative:
+            totals = rounded[pos : pos + len(points)]
+            fares.append([b - a for a, b in itertools.pairwise(totals)])
+            pos += len(points)
+        return fares
+
+    def trip_fares(
+        self, trips: Sequence[Trip], seats: int = 1, travel_class: str | None = None
+    ) -> list[int]:
+        """Fare of `seats` seats on each trip."""
+        multiplier = self._class_multiplier(travel_class) * seats
+        hourly, offset = self.hourly, self.utc_offset_minutes
+        fares: list[int] = []
+        for trip in trips:
+            depart = trip.depart_at.astimezone(UTC)
+            hour = (depart.hour * 60 + depart.minute + offset) // 60 % 24
+            fares.append(round(trip.base_fare * multiplier * hourly[hour]))
+        return fares
+
+
+_TABLE: tuple[Settings, FareTable] | None = None
+
+
+def fare_table(s: Settings) -> FareTable:
+    """FareTable for s, rebuilt only when the settings object changes."""
+    global _TABLE
+    cached = _TABLE
+    if cached is not None and cached[0] is s:
+        return cached[1]
+    table = FareTable.from_settings(s)
+    _TABLE = (s, table)
+    return table
@@ -0,0 +1,217 @@
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import logging
+import multiprocessing
+import threading
+from collections.abc import Callable
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import TypeVar
+
+from app.core.config import settings
+from app.core.metrics import REGISTRY
+from app.core.profiling import add_offloaded_stats, profiled_call, profiling_active
+
+logger = logging.getLogger("railway.routing_pool")
+
+T = TypeVar("T")
+
+
+class RoutingOverloaded(RuntimeError):
+    """More routing jobs are queued or running than routing_queue_limit allows."""
+
+
+class RoutingTimeout(TimeoutError):
+    """A routing job did not finish within routing_timeout_s."""
+
+
+def _init_worker(network_path: str = "") -> None:
+    # Runs once per worker process: load the graph (and any routing index) up front so
+    # no request pays for it. network_path is the snapshot the parent switched
+    # to, if it hot-swapped away from the startup network.
+    from app.core.logging import configure_logging
+    from app.data.graph import get_compiled_graph, swap_compiled_graph
+    from app.data.snapshot import load_snapshot
+    from app.services.routing_service import prepare_routing
+
+    configure_logging()
+    if network_path:
+        swap_compiled_graph(load_snapshot(network_path))
+    prepare_routing(get_compiled_graph())
+
+
+def _noop() -> None:
+    return None
+
+
+def _call_with_metrics(fn: Callable[..., T], *args) -> tuple[T, dict]:
+    # Worker side: metrics recorded during the call are shipped back with the result.
+    result = fn(*args)
+    return result, REGISTRY.drain()
+
+
+class RoutingPool:
+    """
+    Runs CPU-bound routing calls off the event loop.
+
+    With workers > 0 calls go to a process pool, so a long Dijkstra no longer
+    holds the GIL of the process serving bookings and health checks; with 0
+    they run on a thread pool of their own. At most queue_limit calls may
+    be queued or running; a call that times out stops being awaited but keeps
+    its slot until the worker actually finishes it.
+    """
+
+    def __init__(
+        self,
+        workers: int = 0,
+        queue_limit: int = 64,
+        timeout_s: float = 10.0,
+        network_path: str = "",
+    ) -> None:
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self.timeout_s = timeout_s
+        self._executor: Executor
+        if workers > 0:
+            # spawn, not fork: forking a process with live threads can copy held locks
+            self._executor = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(network_path,),
+            )
+        else:
+            self._executor = ThreadPoolExecutor(thread_name_prefix="routing")
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self.rejected = 0
+        self.timeouts = 0
+
+    def _release(self, _: Future) -> None:
+        with self._lock:
+            self._in_flight -= 1
+
+    async def run(self, fn: Callable[..., T], *args) -> T:
+        with self._lock:
+            if self._in_flight >= self.queue_limit:
+                self.rejected += 1
+                raise RoutingOverloaded("Routing queue is full, try again later.")
+            self._in_flight += 1
+
+        # A request being profiled gets its pool work profiled where it runs.
+        profiled = profiling_active()
+        call, call_args = (profiled_call, (fn, *args)) if profiled else (fn, args)
+        try:
+            if self.workers > 0:
+                future = self._executor.submit(_call_with_metrics, call, *call_args)
+            else:
+                # Threads can share the caller's context (request_id for logs); processes can't.
+                future = self._executor.submit(contextvars.copy_context().run, call, *call_args)
+        except BaseException:
+            with self._lock:
+                self._in_flight -= 1
+            raise
+        future.add_done_callback(self._release)
+
+        try:
+            # shield: on timeout only stop waiting, the job itself can't be interrupted
+            waiter = asyncio.shield(asyncio.wrap_future(future))
+            result = await asyncio.wait_for(waiter, self.timeout_s)
+        except asyncio.TimeoutError:
+            future.cancel()  # drops it if still queued
+            with self._lock:
+                self.timeouts += 1
+            logger.warning("routing_timeout fn=%s timeout_s=%s", fn.__name__, self.timeout_s)
+            raise RoutingTimeout("Route computation timed out.") from None
+        if self.workers > 0:
+            result, drained = result
+            REGISTRY.merge(drained)
+        if profiled:
+            result, stats = result
+            add_offloaded_stats(stats)
+        return result
+
+    def warm(self) -> None:
+        """Start every worker process now (each loads the graph) rather than on first use."""
+        for future in [self._executor.submit(_noop) for _ in range(self.workers)]:
+            future.result()
+
+    def stats(self) -> dict[str, int | float]:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "in_flight": self._in_flight,
+                "queue_limit": self.queue_limit,
+                "timeout_s": self.timeout_s,
+                "rejected": self.rejected,
+                "timeouts": self.timeouts,
+            }
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def retire(self) -> None:
+        """Stop taking work; jobs already submitted still finish, then workers exit."""
+        self._executor.shutdown(wait=False)
+
+
+_POOL: RoutingPool | None = None
+_POOL_LOCK = threading.Lock()
+
+REGISTRY.gauge(
+    "railway_routing_pool_in_flight",
+    "Routing jobs queued or running.",
+    lambda: [((), _POOL.stats()["in_flight"])] if _POOL is not None else [],
+)
+
+
+def get_routing_pool() -> RoutingPool:
+    global _POOL
+    if _POOL is None:
+        with _POOL_LOCK:
+            if _POOL is None:
+                _POOL = RoutingPool(
+                    settings.routing_workers,
+                    settings.routing_queue_limit,
+                    settings.routing_timeout_s,
+                )
+                logger.info(
+                    "routing_pool_started workers=%s queue_limit=%s timeout_s=%s",
+                    settings.routing_workers,
+                    settings.routing_queue_limit,
+                    settings.routing_timeout_s,
+                )
+    return _POOL
+
+
+def replace_routing_pool(network_path: str) -> None:
+    """
+    After a network swap, move process workers onto the snapshot at
+    network_path: a new pool is started and warmed first, then takes over,
+    while the old one finishes its queued jobs on the old network. Thread
+    pools share the parent's graph and are left alone.
+    """
+    global _POOL
+    if settings.routing_workers <= 0 or _POOL is None:
+        return
+    pool = RoutingPool(
+        settings.routing_workers,
+        settings.routing_queue_limit,
+        settings.routing_timeout_s,
+        network_path,
+    )
+    pool.warm()
+    with _POOL_LOCK:
+        old, _POOL = _POOL, pool
+    if old is not None:
+        old.retire()
+    logger.info("routing_pool_replaced workers=%s network_path=%s", pool.workers, network_path)
+
+
+def shutdown_routing_pool() -> None:
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is not None:
+            _POOL.shutdown()
+            _POOL = None
@@ -2,81 +2,410 @@ from __future__ import annotations
 
 import heapq
 import logging
-from typing import Dict, List, Tuple
+from collections.abc import Callable, Collection, Sequence
+from itertools import pairwise
+from typing import TypeVar
 
+from app.core.cache import TTLCache
 from app.core.config import settings
-from app.data.network import GRAPH
-from app.models.schemas import RouteLeg, RouteResponse
+from app.core.metrics import REGISTRY, ROUTE_HEAP_PUSHES, ROUTE_PATH_EDGES, ROUTE_SETTLED
+from app.data.graph import CompiledGraph, get_compiled_graph, get_reverse_graph
+from app.models.schemas import (
+    RouteAlternative,
+    RouteBatchItem,
+    RouteLeg,
+    RouteMatrixResponse,
+    RouteResponse,
+)
+from app.services.alternatives import k_shortest_paths
+from app.services.astar import bidirectional_query, get_geo_index
+from app.services.hierarchy import get_hierarchy, hierarchy_query
+from app.services.pricing import FareTable, fare_table
 
 logger = logging.getLogger("railway.routing_service")
 
+_INF = float("inf")
+
+T = TypeVar("T")
+
+# Keyed on (from, to, graph version, travel class, alternatives, fare table).
+# Cached responses are shared between callers and must be treated as read-only.
+_ROUTE_CACHE: TTLCache[RouteResponse] = TTLCache(
+    settings.route_cache_size, settings.route_cache_ttl_s
+)
+_cache_generation: tuple[str, FareTable] | None = None
+
+REGISTRY.gauge(
+    "railway_route_cache_entries",
+    "Routes currently cached.",
+    lambda: [((), len(_ROUTE_CACHE))],
+)
+REGISTRY.gauge(
+    "railway_route_cache_hit_ratio",
+    "Route cache hits / lookups since start.",
+    lambda: [((), _ROUTE_CACHE.stats()["hit_ratio"])],
+)
 
-def _dijkstra(start: str, goal: str) -> Tuple[int, List[Tuple[str, str]]]:
-    if start not in GRAPH or goal not in GRAPH:
-        raise ValueError("Unknown station code(s).")
 
-    dist: Dict[str, float] = {node: float("inf") for node in GRAPH}
-    prev: Dict[str, str | None] = {node: None for node in GRAPH}
-    dist[start] = 0
+def _search_tree(
+    g: CompiledGraph, start: int, goals: Collection[int] | None = None
+) -> tuple[dict[int, int], dict[int, int]]:
+    """
+    Single-source Dijkstra over the compiled graph that stops once every goal
+    is settled (or explores everything reachable when goals is None),
+    returning (dist, prev) for all touched nodes.
 
-    pq: list[tuple[float, str]] = [(0, start)]
+    dist/prev only hold nodes the search actually touched, so the per-query
+    cost scales with the explored region instead of the whole network.
+    """
+    offsets, targets, km = g.offsets, g.targets, g.km
+    remaining = set(goals) if goals is not None else None
+
+    dist: dict[int, int] = {start: 0}
+    prev: dict[int, int] = {}
+    pq: list[tuple[int, int]] = [(0, start)]
+    settled = pushes = 0
     while pq:
         d, u = heapq.heappop(pq)
         if d != dist[u]:
             continue
-        if u == goal:
-            break
+        settled += 1
+        if remaining is not None:
+            remaining.discard(u)
+            if not remaining:
+                break
 
-        for e in GRAPH[u]:
-            nd = d + e.km
-            if nd < dist[e.to]:
-                dist[e.to] = nd
-                prev[e.to] = u
-                heapq.heappush(pq, (nd, e.to))
+        for i in range(offsets[u], offsets[u + 1]):
+            v = targets[i]
+            nd = d + km[i]
+            if nd < dist.get(v, _INF):
+                dist[v] = nd
+                prev[v] = u
+                heapq.heappush(pq, (nd, v))
+                pushes += 1
+
+    ROUTE_SETTLED.observe(settled)
+    ROUTE_HEAP_PUSHES.observe(pushes)
+    return dist, prev
 
-    if dist[goal] == float("inf"):
-        raise ValueError("No route found between these stations.")
 
-    # rebuild path nodes
-    nodes: list[str] = []
-    cur: str | None = goal
-    while cur is not None:
-        nodes.append(cur)
-        cur = prev[cur]
+def _path_nodes(prev: dict[int, int], start: int, goal: int) -> list[int]:
+    nodes = [goal]
+    while nodes[-1] != start:
+        nodes.append(prev[nodes[-1]])
     nodes.reverse()
+    return nodes
 
-    edges = [(nodes[i], nodes[i + 1]) for i in range(len(nodes) - 1)]
-    return int(dist[goal]), edges
 
+def _dijkstra(g: CompiledGraph, start: int, goal: int) -> tuple[int, list[int]]:
+    dist, prev = _search_tree(g, start, (goal,))
+    if goal not in dist:
+        raise ValueError("No route found between these stations.")
+    nodes = _path_nodes(prev, start, goal)
+    ROUTE_PATH_EDGES.observe(len(nodes) - 1)
+    return dist[goal], nodes
 
-def find_cheapest_route(from_station: str, to_station: str) -> RouteResponse:
-    logger.info("route_compute_start from=%s to=%s", from_station, to_station)
 
-    total_km, edges = _dijkstra(from_station, to_station)
+def _shortest_path(g: CompiledGraph, start: int, goal: int) -> tuple[int, list[int]]:
+    if settings.routing_algorithm == "ch":
+        return hierarchy_query(get_hierarchy(g), start, goal)
+    if settings.routing_algorithm == "astar":
+        return bidirectional_query(g, start, goal)
+    return _dijkstra(g, start, goal)
+
 
-    legs: list[RouteLeg] = []
-    for u, v in edges:
-        edge = next((e for e in GRAPH[u] if e.to == v), None)
-        if edge is None:
-            logger.error("graph_inconsistent missing_edge from=%s to=%s", u, v)
+def prepare_routing(g: CompiledGraph) -> None:
+    """Build what the configured algorithm needs for g now, so no query pays for it."""
+    if settings.routing_algorithm == "ch":
+        get_hierarchy(g)
+    elif settings.routing_algorithm == "astar":
+        get_geo_index(g)
+        get_reverse_graph(g)
+
+
+def _path_edges(g: CompiledGraph, nodes: list[int]) -> list[int]:
+    """Edge positions along a path given as nodes (the cheapest of parallel edges)."""
+    positions: list[int] = []
+    for u, v in pairwise(nodes):
+        pos = g.edge_lookup.get((u, v))
+        if pos is None:
+            logger.error("graph_inconsistent missing_edge from=%s to=%s", g.codes[u], g.codes[v])
             raise RuntimeError("Graph inconsistent: missing edge.")
-        fare = edge.km * settings.fare_per_km
-        legs.append(RouteLeg(**{"from": u, "to": v, "km": edge.km, "line": edge.line, "fare": fare}))
+        positions.append(pos)
+    return positions
+
+
+def _priced_legs(
+    g: CompiledGraph,
+    paths: Sequence[tuple[Sequence[int], Sequence[int]]],
+    travel_class: str | None,
+) -> list[list[RouteLeg]]:
+    """Legs for each (nodes, edge positions) path, all priced in one batch."""
+    codes, km, lines, line_ids = g.codes, g.km, g.lines, g.line_ids
+    fares = fare_table(settings).leg_fares(
+        [[km[pos] for pos in edges] for _, edges in paths], travel_class
+    )
+    return [
+        [
+            RouteLeg(
+                **{
+                    "from": codes[u],
+                    "to": codes[v],
+                    "km": km[pos],
+                    "line": lines[line_ids[pos]],
+                    "fare": fare,
+                }
+            )
+            for (u, v), pos, fare in zip(pairwise(nodes), edges, leg_fares, strict=True)
+        ]
+        for (nodes, edges), leg_fares in zip(paths, fares, strict=True)
+    ]
+
+
+def _route_cache_key(
+    version: str,
+    from_station: str,
+    to_station: str,
+    alternatives: int,
+    travel_class: str,
+) -> tuple:
+    """Cache key for a route; travel_class must already be resolved."""
+    global _cache_generation
+    table = fare_table(settings)
+    generation = (get_compiled_graph().version, table)
+    if generation != _cache_generation:
+        # Network or fare config changed: drop everything computed against the old one.
+        _ROUTE_CACHE.clear()
+        _cache_generation = generation
+    # Keyed on the version the route was computed against, which is the previous
+    # one for calls that were in flight during a network swap.
+    return (from_station, to_station, version, travel_class, alternatives, table)
+
+
+def route_cache_stats() -> dict[str, int | float]:
+    return _ROUTE_CACHE.stats()
+
+
+def clear_route_cache() -> None:
+    _ROUTE_CACHE.clear()
+
+
+def cached_route(
+    from_station: str,
+    to_station: str,
+    alternatives: int = 0,
+    travel_class: str | None = None,
+) -> tuple[str, RouteResponse] | None:
+    """
+    Cache lookup only, as (network version, route); lets callers skip
+    offloading a route that is already known. Raises ValueError for an
+    unknown travel class.
+    """
+    version = get_compiled_graph().version
+    travel_class = fare_table(settings).resolve_class(travel_class)
+    key = _route_cache_key(version, from_station, to_station, alternatives, travel_class)
+    resp = _ROUTE_CACHE.get(key)
+    return None if resp is None else (version, resp)
+
+
+def cache_route(version: str, resp: RouteResponse, alternatives: int = 0) -> None:
+    """Store a route computed elsewhere (e.g. in a routing pool worker) against version."""
+    key = _route_cache_key(
+        version, resp.from_station, resp.to_station, alternatives, resp.travel_class
+    )
+    _ROUTE_CACHE.put(key, resp)
 
+
+def with_network_version(fn: Callable[..., T], *args) -> tuple[str, T]:
+    """
+    Run a routing call against the active graph and return (its version,
+    result). The graph is read once, so a network swap mid-call can't mix
+    versions. Module-level, so routing pool processes can run it.
+    """
+    g = get_compiled_graph()
+    return g.version, fn(*args, graph=g)
+
+
+def find_cheapest_route(
+    from_station: str,
+    to_station: str,
+    alternatives: int = 0,
+    travel_class: str | None = None,
+    graph: CompiledGraph | None = None,
+) -> RouteResponse:
+    """
+    Cheapest route, plus up to `alternatives` next-cheapest loopless routes
+    (cheapest first) when asked for, priced for travel_class (default class
+    when None).
+    """
+    g = graph or get_compiled_graph()
+    travel_class = fare_table(settings).resolve_class(travel_class)
+    key = _route_cache_key(g.version, from_station, to_station, alternatives, travel_class)
+    cached = _ROUTE_CACHE.get(key)
+    if cached is not None:
+        return cached
+
+    logger.info("route_compute_start from=%s to=%s", from_station, to_station)
+    if from_station not in g.index or to_station not in g.index:
+        raise ValueError("Unknown station code(s).")
+    if not 0 <= alternatives <= settings.route_max_alternatives:
+        raise ValueError(f"alternatives must be between 0 and {settings.route_max_alternatives}.")
+
+    start, goal = g.index[from_station], g.index[to_station]
+    if alternatives:
+        found, truncated = k_shortest_paths(
+            g, start, goal, alternatives, settings.route_alternatives_max_settled
+        )
+        if truncated:
+            logger.warning(
+                "route_alternatives_truncated from=%s to=%s wanted=%s found=%s",
+                from_station,
+                to_station,
+                alternatives,
+                len(found) - 1,
+            )
+        paths = [(p.nodes, p.edges) for p in found]
+        kms = [p.km for p in found]
+    else:
+        total_km, nodes = _shortest_path(g, start, goal)
+        paths = [(nodes, _path_edges(g, nodes))]
+        kms = [total_km]
+
+    (legs, *other_legs) = _priced_legs(g, paths, travel_class)
+    others = [
+        RouteAlternative(total_km=km, total_fare=sum(leg.fare for leg in alt), legs=alt)
+        for km, alt in zip(kms[1:], other_legs, strict=True)
+    ]
     resp = RouteResponse(
         from_station=from_station,
         to_station=to_station,
-        total_km=total_km,
-        total_fare=total_km * settings.fare_per_km,
+        total_km=kms[0],
+        total_fare=sum(leg.fare for leg in legs),
+        travel_class=travel_class,
         legs=legs,
+        alternatives=others if alternatives else None,
     )
+    _ROUTE_CACHE.put(key, resp)
 
     logger.info(
-        "route_compute_done from=%s to=%s total_km=%s total_fare=%s legs=%s",
+        "route_compute_done from=%s to=%s total_km=%s total_fare=%s legs=%s alternatives=%s",
         from_station,
         to_station,
-        total_km,
+        resp.total_km,
         resp.total_fare,
         len(legs),
+        len(others),
     )
     return resp
+
+
+def find_routes_batch(
+    pairs: list[tuple[str, str]],
+    include_legs: bool = False,
+    travel_class: str | None = None,
+    graph: CompiledGraph | None = None,
+) -> list[RouteBatchItem]:
+    """
+    Answer many (from, to) pairs with one search tree per distinct origin,
+    pricing every found route in one batch.
+
+    Per-pair problems (unknown code, unreachable) are reported on the item
+    instead of failing the whole batch; an unknown travel class fails it.
+    """
+    g = graph or get_compiled_graph()
+    index = g.index
+    table = fare_table(settings)
+    travel_class = table.resolve_class(travel_class)
+
+    goals_by_origin: dict[str, set[int]] = {}
+    for frm, to in pairs:
+        if frm in index and to in index:
+            goals_by_origin.setdefault(frm, set()).add(index[to])
+    trees = {frm: _search_tree(g, index[frm], goals) for frm, goals in goals_by_origin.items()}
+
+    results: list[RouteBatchItem] = []
+    found: list[tuple[RouteBatchItem, list[int]]] = []
+    for frm, to in pairs:
+        item = RouteBatchItem(from_station=frm, to_station=to)
+        if frm not in index or to not in index:
+            item.error = "Unknown station code(s)."
+        else:
+            dist, prev = trees[frm]
+            goal = index[to]
+            if goal not in dist:
+                item.error = "No route found between these stations."
+            else:
+                item.total_km = dist[goal]
+                found.append((item, _path_nodes(prev, index[frm], goal) if include_legs else []))
+        results.append(item)
+
+    fares = table.distance_fares([item.total_km for item, _ in found], travel_class)
+    for (item, _), fare in zip(found, fares, strict=True):
+        item.total_fare = fare
+    if include_legs:
+        paths = [(nodes, _path_edges(g, nodes)) for _, nodes in found]
+        for (item, _), legs in zip(found, _priced_legs(g, paths, travel_class), strict=True):
+            item.legs = legs
+
+    logger.info(
+        "route_batch_done pairs=%s origins=%s include_legs=%s",
+        len(pairs),
+        len(trees),
+        include_legs,
+    )
+    return results
+
+
+def route_matrix(
+    sources: list[str],
+    targets: list[str],
+    include_legs: bool = False,
+    travel_class: str | None = None,
+    graph: CompiledGraph | None = None,
+) -> RouteMatrixResponse:
+    """
+    sources x targets distance/fare table; unreachable cells are None.
+    Runs one search tree per distinct source and prices all cells in one batch.
+    """
+    g = graph or get_compiled_graph()
+    index = g.index
+    unknown = [code for code in (*sources, *targets) if code not in index]
+    if unknown:
+        raise ValueError(f"Unknown station code(s): {', '.join(sorted(set(unknown)))}.")
+    table = fare_table(settings)
+    travel_class = table.resolve_class(travel_class)
+
+    goal_ids = [index[t] for t in targets]
+    trees = {frm: _search_tree(g, index[frm], goal_ids) for frm in dict.fromkeys(sources)}
+
+    km_rows = [[trees[frm][0].get(goal) for goal in goal_ids] for frm in sources]
+    fares = table.distance_fares([d for row in km_rows for d in row], travel_class)
+    width = max(len(targets), 1)
+    fare_rows = [fares[i : i + width] for i in range(0, len(fares), width)]
+
+    leg_rows: list[list[list[RouteLeg] | None]] | None = None
+    if include_legs:
+        paths = []
+        for frm in sources:
+            dist, prev = trees[frm]
+            for goal in goal_ids:
+                if goal in dist:
+                    nodes = _path_nodes(prev, index[frm], goal)
+                    paths.append((nodes, _path_edges(g, nodes)))
+        priced = iter(_priced_legs(g, paths, travel_class))
+        leg_rows = [[None if d is None else next(priced) for d in row] for row in km_rows]
+
+    logger.info(
+        "route_matrix_done sources=%s targets=%s searches=%s",
+        len(sources),
+        len(targets),
+        len(trees),
+    )
+    return RouteMatrixResponse(
+        sources=sources,
+        targets=targets,
+        travel_class=travel_class,
+        km=km_rows,
+        fare=fare_rows,
+        legs=leg_rows,
+    )
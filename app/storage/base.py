@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+import threading
+from collections.abc import Iterator, Sequence
+from typing import Protocol
+
+from app.core.config import settings
+from app.models.schemas import Booking, Trip
+
+
+class SeatsUnavailable(ValueError):
+    """The store's own seat count rejected a booking (e.g. another process sold the seats)."""
+
+
+class DuplicateBookingId(Exception):
+    """booking_ids already taken in the store, e.g. by another process."""
+
+    def __init__(self, booking_ids: set[str]) -> None:
+        super().__init__(f"Booking id(s) already stored: {', '.join(sorted(booking_ids))}")
+        self.booking_ids = booking_ids
+
+
+class StorageBackend(Protocol):
+    """
+    Durable store behind the in-memory trip and booking dicts.
+
+    The services keep serving reads from memory; a backend receives every write
+    and is read back once at startup to rebuild the in-memory state.
+
+    save_bookings stores all of its bookings or none of them. It raises
+    DuplicateBookingId rather than overwriting or dropping a stored booking,
+    and SeatsUnavailable if the backend tracks seats itself and they ran out.
+    """
+
+    def save_trips(self, trips: Sequence[Trip]) -> None: ...
+
+    def load_trips(self) -> list[Trip]: ...
+
+    def save_bookings(self, bookings: Sequence[Booking]) -> None: ...
+
+    def load_bookings(self) -> Iterator[Booking]: ...
+
+    def get_booking(self, booking_id: str) -> Booking | None: ...
+
+    def bookings_for_trip(self, trip_id: str) -> list[Booking]: ...
+
+    def close(self) -> None: ...
+
+
+_STORAGE: StorageBackend | None = None
+_STORAGE_LOCK = threading.Lock()
+
+
+def get_storage() -> StorageBackend | None:
+    """The configured backend, or None when running purely in memory."""
+    global _STORAGE
+    if settings.storage_backend == "memory":
+        return None
+    if _STORAGE is not None:
+        return _STORAGE
+
+    with _STORAGE_LOCK:
+        if _STORAGE is None:
+            _STORAGE = _create_storage()
+        return _STORAGE
+
+
+def _create_storage() -> StorageBackend:
+    # Imported lazily so SQLAlchemy is only loaded when the SQL backend is used.
+    if settings.storage_backend == "journal":
+        from app.storage.journal import JournalStorage
+
+        return JournalStorage(
+            settings.journal_dir,
+            snapshot_every=settings.journal_snapshot_every,
+            fsync=settings.journal_fsync,
+        )
+
+    from app.storage.sql import SqlStorage
+
+    return SqlStorage(
+        settings.database_url,
+        pool_size=settings.database_pool_size,
+        max_overflow=settings.database_max_overflow,
+        create_schema=settings.database_create_schema,
+    )
+
+
+def close_storage() -> None:
+    global _STORAGE
+    with _STORAGE_LOCK:
+        if _STORAGE is not None:
+            _STORAGE.close()
+            _STORAGE = None
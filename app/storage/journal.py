@@ -0,0 +1,279 @@
+from __future__ import annotations
+
+import json
+import logging
+import os
+import threading
+from collections.abc import Iterator, Sequence
+
+from app.models.schemas import Booking, Trip
+
+logger = logging.getLogger("railway.storage.journal")
+
+# Journal lines: "T" + trip JSON or "B" + booking JSON (trip embedded).
+# Snapshot lines: "T" + trip JSON, then "b" + booking JSON with trip_id instead of trip.
+# Replay order: snapshot, then the segment being compacted (if any), then the journal.
+JOURNAL_FILE = "journal.log"
+ROTATED_FILE = "journal.compacting.log"
+SNAPSHOT_FILE = "snapshot.log"
+
+
+class _Batch:
+    __slots__ = ("records", "done", "error")
+
+    def __init__(self) -> None:
+        self.records: list[bytes] = []
+        self.done = False
+        self.error: BaseException | None = None
+
+
+def _fsync(fd: int) -> None:
+    if hasattr(os, "fdatasync"):
+        os.fdatasync(fd)
+    else:
+        os.fsync(fd)
+
+
+class JournalStorage:
+    """
+    Append-only write-ahead journal with group commit.
+
+    Each save blocks until its records are on disk, but concurrent writers
+    share fsyncs: the first writer to find no flush in progress becomes the
+    leader and writes everything queued so far in one write + fsync, while the
+    rest wait for it. Once the journal holds snapshot_every records, and at
+    least as many as the snapshot, it is compacted into a snapshot (trips
+    stored once, bookings referencing them by id), which keeps replay on
+    startup fast; scaling with the snapshot keeps bulk imports from
+    recompacting an ever larger store every snapshot_every records.
+
+    Compaction never holds up writers: the leader only renames the journal
+    aside and starts a fresh one, and a background thread folds the renamed
+    segment into the snapshot. A failed compaction is logged and retried after
+    another snapshot_every records, leaving the segment in place for replay.
+    """
+
+    def __init__(self, directory: str, snapshot_every: int = 10_000, fsync: bool = True) -> None:
+        os.makedirs(directory, exist_ok=True)
+        self.journal_path = os.path.join(directory, JOURNAL_FILE)
+        self.rotated_path = os.path.join(directory, ROTATED_FILE)
+        self.snapshot_path = os.path.join(directory, SNAPSHOT_FILE)
+        self.snapshot_every = snapshot_every
+        self.fsync = fsync
+
+        self._repair_tail()
+        self._fd = os.open(self.journal_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        self._cond = threading.Condition()
+        self._open_batch: _Batch | None = None
+        self._flushing = False
+        self._since_snapshot = sum(1 for _ in self._lines(self.journal_path))
+        self._snapshot_records = sum(1 for _ in self._lines(self.snapshot_path))
+        # Held while reading the files, and while compaction swaps them.
+        self._files_lock = threading.Lock()
+        self._compactor: threading.Thread | None = None
+        self.commits = 0
+        self.records_written = 0
+
+        self._replayed: tuple[list[Trip], list[Booking]] | None = None
+
+    def _repair_tail(self) -> None:
+        """Cut off a torn final record left by a crash mid-write."""
+        try:
+            with open(self.journal_path, "rb+") as f:
+                size = f.seek(0, os.SEEK_END)
+                pos = size
+                while pos > 0:
+                    step = min(4096, pos)
+                    f.seek(pos - step)
+                    chunk = f.read(step)
+                    newline = chunk.rfind(b"\n")
+                    if newline >= 0:
+                        pos = pos - step + newline + 1
+                        break
+                    pos -= step
+                if pos < size:
+                    logger.warning("journal_torn_tail_truncated bytes=%s", size - pos)
+                    f.truncate(pos)
+        except FileNotFoundError:
+            return
+
+    # --- writes ---
+
+    def _commit(self, records: list[bytes]) -> None:
+        with self._cond:
+            batch = self._open_batch
+            if batch is None:
+                batch = self._open_batch = _Batch()
+            batch.records.extend(records)
+
+            while not batch.done:
+                if self._flushing:
+                    self._cond.wait()
+                    continue
+
+                # Leader: flush everything queued so far, which includes our batch.
+                to_flush, self._open_batch = batch, None
+                self._flushing = True
+                self._cond.release()
+                try:
+                    self._write(to_flush.records)
+                except BaseException as e:
+                    to_flush.error = e
+                finally:
+                    self._cond.acquire()
+                    self._flushing = False
+                    to_flush.done = True
+                    self._cond.notify_all()
+
+        if batch.error is not None:
+            raise batch.error
+
+    def _write(self, records: list[bytes]) -> None:
+        # Only ever called by the current leader, so no lock is needed here.
+        os.write(self._fd, b"".join(records))
+        if self.fsync:
+            _fsync(self._fd)
+        self.commits += 1
+        self.records_written += len(records)
+        self._since_snapshot += len(records)
+        if self._compaction_due():
+            try:
+                self._start_compaction()
+            except Exception:
+                # The records are on disk; a failed rotation only delays compaction.
+                logger.exception("journal_rotation_failed")
+                self._since_snapshot = 0
+
+    def _compaction_due(self) -> bool:
+        if self._compactor is not None and self._compactor.is_alive():
+            return False
+        return bool(self.snapshot_every) and self._since_snapshot >= max(
+            self.snapshot_every, self._snapshot_records
+        )
+
+    def _start_compaction(self) -> None:
+        # Leader only. A segment left by a failed compaction is retried as it is.
+        if not os.path.exists(self.rotated_path):
+            with self._files_lock:
+                os.rename(self.journal_path, self.rotated_path)
+                try:
+                    fd = os.open(self.journal_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+                except OSError:
+                    os.rename(self.rotated_path, self.journal_path)
+                    raise
+                old_fd, self._fd = self._fd, fd
+            os.close(old_fd)
+        self._since_snapshot = 0
+        self._compactor = threading.Thread(
+            target=self._run_compaction, name="journal-compactor", daemon=True
+        )
+        self._compactor.start()
+
+    def _run_compaction(self) -> None:
+        try:
+            self._compact()
+        except Exception:
+            # The segment stays and is replayed; the next due compaction retries it.
+            logger.exception("journal_compaction_failed")
+
+    def save_trips(self, trips: Sequence[Trip]) -> None:
+        if trips:
+            self._commit([b"T" + t.model_dump_json().encode() + b"\n" for t in trips])
+
+    def save_bookings(self, bookings: Sequence[Booking]) -> None:
+        if bookings:
+            self._commit([b"B" + b.model_dump_json().encode() + b"\n" for b in bookings])
+
+    # --- snapshots ---
+
+    def _compact(self) -> None:
+        """Fold the rotated segment into a new snapshot, then drop the segment."""
+        # No lock: the leader doesn't rotate again while this runs.
+        trips, bookings = self._read_files(include_journal=False)
+        for booking in bookings.values():
+            trips.setdefault(booking.trip.trip_id, booking.trip)
+        tmp = f"{self.snapshot_path}.tmp"
+        with open(tmp, "wb") as f:
+            for trip in trips.values():
+                f.write(b"T" + trip.model_dump_json().encode() + b"\n")
+            for booking in bookings.values():
+                data = booking.model_dump(mode="json", exclude={"trip"})
+                data["trip_id"] = booking.trip.trip_id
+                f.write(b"b" + json.dumps(data, separators=(",", ":")).encode() + b"\n")
+            f.flush()
+            _fsync(f.fileno())
+        with self._files_lock:
+            os.replace(tmp, self.snapshot_path)
+            # A crash here leaves records in both files; replay dedupes by id.
+            os.remove(self.rotated_path)
+        self._snapshot_records = len(trips) + len(bookings)
+        logger.info("journal_compacted trips=%s bookings=%s", len(trips), len(bookings))
+
+    # --- replay ---
+
+    @staticmethod
+    def _lines(path: str) -> Iterator[bytes]:
+        try:
+            with open(path, "rb") as f:
+                for line in f:
+                    # A torn final line (crash mid-write) has no newline; skip it.
+                    if line.endswith(b"\n"):
+                        yield line[:-1]
+        except FileNotFoundError:
+            return
+
+    def _read_all(self) -> tuple[dict[str, Trip], dict[str, Booking]]:
+        with self._files_lock:
+            return self._read_files(include_journal=True)
+
+    def _read_files(self, include_journal: bool) -> tuple[dict[str, Trip], dict[str, Booking]]:
+        trips: dict[str, Trip] = {}
+        bookings: dict[str, Booking] = {}
+        for line in self._lines(self.snapshot_path):
+            kind, body = line[:1], line[1:]
+            if kind == b"T":
+                trip = Trip.model_validate_json(body)
+                trips[trip.trip_id] = trip
+            elif kind == b"b":
+                data = json.loads(body)
+                data["trip"] = trips[data.pop("trip_id")]
+                booking = Booking.model_validate(data)
+                bookings[booking.booking_id] = booking
+        segments = (
+            [self.rotated_path, self.journal_path] if include_journal else [self.rotated_path]
+        )
+        for line in (line for path in segments for line in self._lines(path)):
+            kind, body = line[:1], line[1:]
+            if kind == b"T":
+                trip = Trip.model_validate_json(body)
+                trips[trip.trip_id] = trip
+            elif kind == b"B":
+                booking = Booking.model_validate_json(body)
+                bookings[booking.booking_id] = booking
+        return trips, bookings
+
+    def _replay(self) -> tuple[list[Trip], list[Booking]]:
+        if self._replayed is None:
+            trips, bookings = self._read_all()
+            self._replayed = (list(trips.values()), list(bookings.values()))
+        return self._replayed
+
+    def load_trips(self) -> list[Trip]:
+        return self._replay()[0]
+
+    def load_bookings(self) -> Iterator[Booking]:
+        bookings = self._replay()[1]
+        self._replayed = None  # startup replay is one-shot; don't pin it in memory
+        return iter(bookings)
+
+    def get_booking(self, booking_id: str) -> Booking | None:
+        # Not indexed: the journal is for durability, reads come from memory.
+        return self._read_all()[1].get(booking_id)
+
+    def bookings_for_trip(self, trip_id: str) -> list[Booking]:
+        return [b for b in self._read_all()[1].values() if b.trip.trip_id == trip_id]
+
+    def close(self) -> None:
+        if self._compactor is not None:
+            self._compactor.join()
+        os.close(self._fd)
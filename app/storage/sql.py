@@ -0,0 +1,259 @@
+from __future__ import annotations
+
+from collections.abc import Collection, Iterator, Sequence
+from datetime import datetime, timezone
+
+from sqlalchemy import (
+    Column,
+    DateTime,
+    ForeignKey,
+    Integer,
+    MetaData,
+    String,
+    Table,
+    create_engine,
+    event,
+    select,
+    update,
+)
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import Engine, Row
+from sqlalchemy.exc import IntegrityError
+
+from app.models.schemas import STATION_CODE_MAX_LENGTH, Booking, Trip
+from app.storage.base import DuplicateBookingId, SeatsUnavailable
+
+UTC = timezone.utc
+
+metadata = MetaData()
+
+trips_table = Table(
+    "trips",
+    metadata,
+    Column("trip_id", String(32), primary_key=True),
+    Column("train_no", String(16), nullable=False),
+    Column("from_station", String(STATION_CODE_MAX_LENGTH), nullable=False),
+    Column("to_station", String(STATION_CODE_MAX_LENGTH), nullable=False),
+    Column("depart_at", DateTime(timezone=True), nullable=False, index=True),
+    Column("arrive_at", DateTime(timezone=True), nullable=False),
+    Column("base_fare", Integer, nullable=False),
+    Column("capacity", Integer, nullable=False),
+    Column("run_id", String(64), nullable=True),
+    # Seats sold, kept by the database so instances sharing it can't oversell.
+    Column("reserved", Integer, nullable=False, server_default="0"),
+)
+
+bookings_table = Table(
+    "bookings",
+    metadata,
+    Column("booking_id", String(16), primary_key=True),
+    Column("ticket_code", String(32), nullable=False),
+    Column("passenger_name", String(60), nullable=False),
+    Column("trip_id", String(32), ForeignKey("trips.trip_id"), nullable=False, index=True),
+    Column("seats", Integer, nullable=False),
+    Column("travel_class", String(16), nullable=False, server_default="second"),
+    Column("total_price", Integer, nullable=False),
+    Column("booked_at", DateTime(timezone=True), nullable=False, index=True),
+)
+
+# Rows per executemany() call for bulk writes.
+BULK_CHUNK = 1000
+
+
+def _utc(value: datetime) -> datetime:
+    # SQLite drops the offset; everything is stored and returned as UTC.
+    if value.tzinfo is None:
+        return value.replace(tzinfo=UTC)
+    return value.astimezone(UTC)
+
+
+def _trip_row(trip: Trip) -> dict:
+    row = trip.model_dump()
+    row["depart_at"] = _utc(trip.depart_at)
+    row["arrive_at"] = _utc(trip.arrive_at)
+    return row
+
+
+def _booking_row(booking: Booking) -> dict:
+    return {
+        "booking_id": booking.booking_id,
+        "ticket_code": booking.ticket_code,
+        "passenger_name": booking.passenger_name,
+        "trip_id": booking.trip.trip_id,
+        "seats": booking.seats,
+        "travel_class": booking.travel_class,
+        "total_price": booking.total_price,
+        "booked_at": _utc(booking.booked_at),
+    }
+
+
+def _trip_from_row(row: Row) -> Trip:
+    return Trip(
+        trip_id=row.trip_id,
+        train_no=row.train_no,
+        from_station=row.from_station,
+        to_station=row.to_station,
+        depart_at=_utc(row.depart_at),
+        arrive_at=_utc(row.arrive_at),
+        base_fare=row.base_fare,
+        capacity=row.capacity,
+        run_id=row.run_id,
+    )
+
+
+class SqlStorage:
+    """
+    SQLAlchemy Core backend; SQLite locally, PostgreSQL (psycopg) in production.
+
+    Schema changes go through Alembic (see migrations/); create_schema=True
+    additionally creates missing tables on startup, which is handy for SQLite.
+
+    Several instances may share one database: each booking write claims its
+    seats against trips.reserved in the same transaction, and a booking_id
+    that is already stored raises DuplicateBookingId instead of being dropped.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        pool_size: int = 5,
+        max_overflow: int = 10,
+        create_schema: bool = False,
+    ) -> None:
+        self.engine = _make_engine(url, pool_size, max_overflow)
+        if create_schema:
+            metadata.create_all(self.engine)
+        # Trips referenced by bookings are cached so loads don't re-parse them per booking.
+        self._trip_cache: dict[str, Trip] = {}
+
+    def _upsert(self, table: Table, columns: Collection[str]):
+        """Insert, replacing the given columns of existing rows with the same primary key."""
+        dialect = self.engine.dialect.name
+        if dialect not in ("postgresql", "sqlite"):
+            return table.insert()
+        stmt = (postgresql if dialect == "postgresql" else sqlite).insert(table)
+        key = [c.name for c in table.primary_key]
+        updates = {name: stmt.excluded[name] for name in columns if name not in key}
+        return stmt.on_conflict_do_update(index_elements=key, set_=updates)
+
+    def save_trips(self, trips: Sequence[Trip]) -> None:
+        # Re-imported timetables update trips in place; their seat counts are kept.
+        rows = [_trip_row(t) for t in trips]
+        if rows:
+            stmt = self._upsert(trips_table, rows[0].keys())
+            with self.engine.begin() as conn:
+                for i in range(0, len(rows), BULK_CHUNK):
+                    conn.execute(stmt, rows[i : i + BULK_CHUNK])
+        for trip in trips:
+            if trip.trip_id in self._trip_cache:
+                self._trip_cache[trip.trip_id] = trip
+
+    def load_trips(self) -> list[Trip]:
+        with self.engine.connect() as conn:
+            rows = conn.execute(select(trips_table))
+            trips = [_trip_from_row(row) for row in rows]
+        self._trip_cache.update((t.trip_id, t) for t in trips)
+        return trips
+
+    def save_bookings(self, bookings: Sequence[Booking]) -> None:
+        if not bookings:
+            return
+        seats: dict[str, int] = {}
+        for b in bookings:
+            seats[b.trip.trip_id] = seats.get(b.trip.trip_id, 0) + b.seats
+        rows = [_booking_row(b) for b in bookings]
+        try:
+            with self.engine.begin() as conn:
+                # Row locks make the check-and-add atomic across instances.
+                for trip_id, n in seats.items():
+                    claimed = conn.execute(
+                        update(trips_table)
+                        .where(trips_table.c.trip_id == trip_id)
+                        .where(trips_table.c.reserved + n <= trips_table.c.capacity)
+                        .values(reserved=trips_table.c.reserved + n)
+                    )
+                    if claimed.rowcount != 1:
+                        raise SeatsUnavailable("Not enough seats available.")
+                for i in range(0, len(rows), BULK_CHUNK):
+                    conn.execute(bookings_table.insert(), rows[i : i + BULK_CHUNK])
+        except IntegrityError:
+            taken = self._stored_ids([row["booking_id"] for row in rows])
+            if taken:
+                raise DuplicateBookingId(taken) from None
+            raise
+
+    def _stored_ids(self, booking_ids: list[str]) -> set[str]:
+        column = bookings_table.c.booking_id
+        with self.engine.connect() as conn:
+            return {
+                row.booking_id
+                for i in range(0, len(booking_ids), BULK_CHUNK)
+                for row in conn.execute(
+                    select(column).where(column.in_(booking_ids[i : i + BULK_CHUNK]))
+                )
+            }
+
+    def _bookings(self, query) -> Iterator[Booking]:
+        with self.engine.connect() as conn:
+            result = conn.execution_options(stream_results=True, yield_per=BULK_CHUNK).execute(
+                query
+            )
+            for row in result:
+                trip = self._trip_cache.get(row.trip_id) or self._load_trip(conn, row.trip_id)
+                yield Booking(
+                    booking_id=row.booking_id,
+                    ticket_code=row.ticket_code,
+                    passenger_name=row.passenger_name,
+                    trip=trip,
+                    seats=row.seats,
+                    travel_class=row.travel_class,
+                    total_price=row.total_price,
+                    booked_at=_utc(row.booked_at),
+                )
+
+    def _load_trip(self, conn, trip_id: str) -> Trip:
+        row = conn.execute(select(trips_table).where(trips_table.c.trip_id == trip_id)).one()
+        trip = _trip_from_row(row)
+        self._trip_cache[trip_id] = trip
+        return trip
+
+    def load_bookings(self) -> Iterator[Booking]:
+        return self._bookings(select(bookings_table).order_by(bookings_table.c.booked_at))
+
+    def get_booking(self, booking_id: str) -> Booking | None:
+        query = select(bookings_table).where(bookings_table.c.booking_id == booking_id)
+        found = list(self._bookings(query))
+        return found[0] if found else None
+
+    def bookings_for_trip(self, trip_id: str) -> list[Booking]:
+        query = (
+            select(bookings_table)
+            .where(bookings_table.c.trip_id == trip_id)
+            .order_by(bookings_table.c.booked_at)
+        )
+        return list(self._bookings(query))
+
+    def close(self) -> None:
+        self.engine.dispose()
+
+
+def _make_engine(url: str, pool_size: int, max_overflow: int) -> Engine:
+    if url.startswith("sqlite"):
+        engine = create_engine(url, connect_args={"check_same_thread": False})
+
+        @event.listens_for(engine, "connect")
+        def _sqlite_pragmas(dbapi_conn, _record) -> None:
+            cursor = dbapi_conn.cursor()
+            cursor.execute("PRAGMA journal_mode=WAL")
+            cursor.execute("PRAGMA synchronous=NORMAL")
+            cursor.execute("PRAGMA foreign_keys=ON")
+            cursor.close()
+
+        return engine
+
+    return create_engine(
+        url,
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_pre_ping=True,
+    )
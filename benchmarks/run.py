@@ -0,0 +1,282 @@
+"""
+Routing/booking micro-benchmarks over synthetic networks.
+
+    python -m benchmarks.run --sizes 1000,5000 --out bench.json
+    python -m benchmarks.run --sizes 1000,5000 --compare bench.json
+
+Every case reports ops/sec plus tracemalloc figures: peak bytes allocated
+above the starting point while replaying the op, and bytes retained per op.
+--compare prints the ratio against a previous run and exits non-zero when any
+case got slower than --max-regression allows.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections.abc import Callable
+from dataclasses import asdict, dataclass, replace
+from datetime import datetime, timedelta, timezone
+
+from app.core.cache import TTLCache
+from app.data import network, seed
+from app.data.graph import compile_graph, rebuild_compiled_graph
+from app.data.snapshot import load_snapshot, write_snapshot
+from app.data.synthetic import generate_booking_requests, generate_network, generate_trips
+from app.services import booking_service, routing_service
+
+# Upper bound on operations replayed under tracemalloc (it is slow).
+TRACED_OPS = 200
+
+
+@dataclass
+class Result:
+    name: str
+    size: int
+    ops: int
+    seconds: float
+    ops_per_sec: float
+    alloc_peak_bytes: int
+    alloc_retained_bytes_per_op: float
+
+
+def _measure(name: str, size: int, op: Callable[[int], object], ops: int) -> Result:
+    op(0)  # warm-up
+
+    start = time.perf_counter()
+    for i in range(ops):
+        op(i)
+    seconds = time.perf_counter() - start
+
+    traced = min(ops, TRACED_OPS)
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    tracemalloc.reset_peak()
+    for i in range(traced):
+        op(i)
+    after, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return Result(
+        name=name,
+        size=size,
+        ops=ops,
+        seconds=round(seconds, 6),
+        ops_per_sec=round(ops / seconds, 2) if seconds else float("inf"),
+        alloc_peak_bytes=peak - before,
+        alloc_retained_bytes_per_op=round((after - before) / traced, 1),
+    )
+
+
+def _install(size: int, rng_seed: int) -> None:
+    """Swap the synthetic network, trips and an empty booking store into the app."""
+    graph, stations = generate_network(size, seed=rng_seed)
+    network.GRAPH.clear()
+    network.GRAPH.update(graph)
+    network.STATIONS.clear()
+    network.STATIONS.update(stations)
+    rebuild_compiled_graph()
+
+    seed._TRIPS.clear()
+    seed._INDEX.clear()
+    seed.add_trips(generate_trips(graph, size * 2, seed=rng_seed))
+    booking_service._BOOKINGS.clear()
+    booking_service._INDEX.clear()
+
+
+def run_size(size: int, ops_scale: float, rng_seed: int) -> list[Result]:
+    _install(size, rng_seed)
+    rng = random.Random(rng_seed)
+    codes = list(network.GRAPH)
+    pairs = [(rng.choice(codes), rng.choice(codes)) for _ in range(256)]
+    trips = seed.list_trips()
+    requests = generate_booking_requests(trips, 4096, seed=rng_seed)
+
+    def ops(n: int) -> int:
+        return max(1, int(n * ops_scale))
+
+    results: list[Result] = []
+
+    # Startup: compiling the Edge models vs mapping a prebuilt snapshot.
+    results.append(
+        _measure(
+            "load_network[compile]",
+            size,
+            lambda i: compile_graph(network.GRAPH, network.STATIONS),
+            ops(5),
+        )
+    )
+    fd, snap_path = tempfile.mkstemp(suffix=".snap")
+    os.close(fd)
+    try:
+        write_snapshot(snap_path, compile_graph(network.GRAPH, network.STATIONS))
+        results.append(
+            _measure("load_network[snapshot]", size, lambda i: load_snapshot(snap_path), ops(5))
+        )
+    finally:
+        os.unlink(snap_path)
+
+    cache = routing_service._ROUTE_CACHE
+    routing_service._ROUTE_CACHE = TTLCache(0, 0)
+    try:
+        results.append(
+            _measure(
+                "find_cheapest_route",
+                size,
+                lambda i: routing_service.find_cheapest_route(*pairs[i % len(pairs)]),
+                ops(200),
+            )
+        )
+        plain_settings = routing_service.settings
+        routing_service.settings = replace(plain_settings, routing_algorithm="astar")
+        try:
+            results.append(
+                _measure(
+                    "find_cheapest_route[astar]",
+                    size,
+                    lambda i: routing_service.find_cheapest_route(*pairs[i % len(pairs)]),
+                    ops(200),
+                )
+            )
+        finally:
+            routing_service.settings = plain_settings
+        results.append(
+            _measure(
+                "find_cheapest_route[alternatives=3]",
+                size,
+                lambda i: routing_service.find_cheapest_route(*pairs[i % len(pairs)], 3),
+                ops(50),
+            )
+        )
+    finally:
+        routing_service._ROUTE_CACHE = cache
+    routing_service.clear_route_cache()
+    for pair in pairs[:16]:
+        routing_service.find_cheapest_route(*pair)
+    results.append(
+        _measure(
+            "find_cheapest_route[cached]",
+            size,
+            lambda i: routing_service.find_cheapest_route(*pairs[i % 16]),
+            ops(5000),
+        )
+    )
+
+    results.append(
+        _measure(
+            "create_booking",
+            size,
+            lambda i: booking_service.create_booking(requests[i % len(requests)]),
+            ops(5000),
+        )
+    )
+
+    # Listing cost grows with the store: fill it up to `size` bookings first.
+    for i in range(max(0, size - len(booking_service._BOOKINGS))):
+        booking_service.create_booking(requests[i % len(requests)])
+    results.append(
+        _measure("list_bookings", size, lambda i: booking_service.list_bookings(), ops(20))
+    )
+    results.append(
+        _measure(
+            "query_bookings[page]",
+            size,
+            lambda i: booking_service.query_bookings(
+                trip_id=trips[i % len(trips)].trip_id, limit=50
+            ),
+            ops(5000),
+        )
+    )
+    results.append(_measure("list_trips", size, lambda i: seed.list_trips(), ops(20)))
+    corridors = [(t.from_station, t.to_station, t.depart_at) for t in trips[:256]]
+    results.append(
+        _measure(
+            "list_trips[corridor window]",
+            size,
+            lambda i: seed.list_trips(
+                corridors[i % len(corridors)][0],
+                corridors[i % len(corridors)][1],
+                corridors[i % len(corridors)][2],
+                corridors[i % len(corridors)][2] + timedelta(hours=6),
+            ),
+            ops(5000),
+        )
+    )
+    return results
+
+
+def compare(results: list[Result], baseline_path: str, max_regression: float) -> bool:
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = {(r["name"], r["size"]): r for r in json.load(f)["results"]}
+
+    ok = True
+    print(f"\n{'case':<34} {'size':>7} {'base ops/s':>12} {'now ops/s':>12} {'ratio':>7}")
+    for r in results:
+        base = baseline.get((r.name, r.size))
+        if base is None:
+            continue
+        ratio = r.ops_per_sec / base["ops_per_sec"] if base["ops_per_sec"] else float("inf")
+        flag = ""
+        if ratio < 1.0 - max_regression:
+            flag = "  REGRESSION"
+            ok = False
+        print(
+            f"{r.name:<34} {r.size:>7} {base['ops_per_sec']:>12.1f} "
+            f"{r.ops_per_sec:>12.1f} {ratio:>7.2f}{flag}"
+        )
+    return ok
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Railway Quest micro-benchmarks.")
+    parser.add_argument("--sizes", default="100,1000,5000", help="Comma separated station counts.")
+    parser.add_argument("--ops-scale", type=float, default=1.0, help="Multiply op counts.")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", help="Write results as JSON to this file.")
+    parser.add_argument("--compare", help="Baseline JSON from an earlier run.")
+    parser.add_argument("--max-regression", type=float, default=0.2)
+    args = parser.parse_args(argv)
+
+    logging.disable(logging.INFO)
+    sizes = [int(s) for s in args.sizes.split(",") if s]
+
+    results: list[Result] = []
+    print(f"{'case':<34} {'size':>7} {'ops/s':>12} {'peak B':>11} {'kept B/op':>11}")
+    for size in sizes:
+        for r in run_size(size, args.ops_scale, args.seed):
+            results.append(r)
+            print(
+                f"{r.name:<34} {r.size:>7} {r.ops_per_sec:>12.1f} "
+                f"{r.alloc_peak_bytes:>11} {r.alloc_retained_bytes_per_op:>11.1f}"
+            )
+
+    if args.out:
+        payload = {
+            "meta": {
+                "created_at": datetime.now(tz=timezone.utc).isoformat(),
+                "python": sys.version.split()[0],
+                "platform": platform.platform(),
+                "seed": args.seed,
+                "ops_scale": args.ops_scale,
+            },
+            "results": [asdict(r) for r in results],
+        }
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(payload, f, indent=2)
+        print(f"\nwrote {args.out}")
+
+    if args.compare and not compare(results, args.compare, args.max_regression):
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
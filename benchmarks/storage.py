@@ -0,0 +1,165 @@
+"""
+Throughput of the in-memory path against the SQL and journal storage backends.
+
+    python -m benchmarks.storage --bookings 5000
+    python -m benchmarks.storage --url postgresql+psycopg://user:pw@localhost/railway
+
+Defaults to a throwaway SQLite file; point --url only at a scratch database,
+as the run leaves its rows behind. Measures single-booking writes through
+create_booking, bulk inserts, full reload and indexed lookups by booking and
+trip id, plus concurrent create_booking against the group-commit journal.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+
+from app.data import seed
+from app.data.synthetic import generate_booking_requests, generate_network, generate_trips
+from app.models.schemas import Booking
+from app.services import booking_service
+from app.services.inventory import SeatInventory
+from app.storage.journal import JournalStorage
+from app.storage.sql import SqlStorage
+
+
+def _rate(label: str, n: int, fn: Callable[[], object]) -> dict:
+    start = time.perf_counter()
+    fn()
+    seconds = time.perf_counter() - start
+    row = {
+        "case": label,
+        "ops": n,
+        "seconds": round(seconds, 4),
+        "ops_per_sec": round(n / seconds, 1),
+    }
+    print(f"{label:<36} {n:>8} ops {row['ops_per_sec']:>12.1f} ops/s")
+    return row
+
+
+def _reset_bookings() -> None:
+    booking_service._BOOKINGS.clear()
+    booking_service._INDEX.clear()
+    booking_service._INVENTORY = SeatInventory()
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Memory vs SQL storage throughput.")
+    parser.add_argument("--bookings", type=int, default=5000)
+    parser.add_argument("--url", help="SQLAlchemy URL; defaults to a temporary SQLite file.")
+    parser.add_argument(
+        "--threads", type=int, default=16, help="Concurrent writers for journal cases."
+    )
+    parser.add_argument("--out", help="Write results as JSON to this file.")
+    args = parser.parse_args(argv)
+    logging.disable(logging.INFO)
+
+    tmpdir = tempfile.mkdtemp(prefix="railway-bench-")
+    url = args.url or f"sqlite:///{os.path.join(tmpdir, 'bench.db')}"
+    storage = SqlStorage(url, create_schema=True)
+
+    graph, _ = generate_network(500, seed=1)
+    trips = generate_trips(graph, 2000, seed=1)
+    for trip in trips:
+        trip.capacity = 10_000
+    seed.add_trips(trips)
+    requests = generate_booking_requests(trips, args.bookings, seed=1)
+    n = len(requests)
+    results: list[dict] = []
+
+    print(f"storage url: {url}\n")
+    results.append(_rate("save_trips (bulk)", len(trips), lambda: storage.save_trips(trips)))
+
+    # create_booking: memory only, then write-through to SQL
+    booking_service._RESTORED = True
+    _reset_bookings()
+    results.append(
+        _rate(
+            "create_booking [memory]",
+            n,
+            lambda: [booking_service.create_booking(r) for r in requests],
+        )
+    )
+    _reset_bookings()
+    original = booking_service.get_storage
+    booking_service.get_storage = lambda: storage
+    try:
+        results.append(
+            _rate(
+                "create_booking [sql write-through]",
+                n,
+                lambda: [booking_service.create_booking(r) for r in requests],
+            )
+        )
+    finally:
+        booking_service.get_storage = original
+
+    journal = JournalStorage(os.path.join(tmpdir, "journal"), snapshot_every=0)
+    booking_service.get_storage = lambda: journal
+    try:
+        for threads in (1, args.threads):
+            _reset_bookings()
+            with ThreadPoolExecutor(max_workers=threads) as pool:
+                results.append(
+                    _rate(
+                        f"create_booking [journal, {threads} thr]",
+                        n,
+                        lambda pool=pool: list(pool.map(booking_service.create_booking, requests)),
+                    )
+                )
+    finally:
+        booking_service.get_storage = original
+    print(f"{'':<36} journal fsyncs: {journal.commits} for {journal.records_written} records")
+    journal.close()
+
+    bookings: list[Booking] = [
+        b.model_copy(update={"booking_id": f"X{i:08d}"})
+        for i, b in enumerate(booking_service._BOOKINGS.values())
+    ]
+    results.append(
+        _rate("save_bookings (bulk)", len(bookings), lambda: storage.save_bookings(bookings))
+    )
+    results.append(
+        _rate("load_bookings (stream)", 2 * n, lambda: sum(1 for _ in storage.load_bookings()))
+    )
+
+    rng = random.Random(1)
+    ids = [rng.choice(bookings).booking_id for _ in range(500)]
+    results.append(
+        _rate("get_booking [sql]", len(ids), lambda: [storage.get_booking(i) for i in ids])
+    )
+    results.append(
+        _rate(
+            "get_booking [memory]",
+            len(ids),
+            lambda: [booking_service._BOOKINGS.get(i) for i in ids],
+        )
+    )
+    trip_ids = [rng.choice(trips).trip_id for _ in range(200)]
+    results.append(
+        _rate(
+            "bookings_for_trip [sql]",
+            len(trip_ids),
+            lambda: [storage.bookings_for_trip(t) for t in trip_ids],
+        )
+    )
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump({"url": url.split("@")[-1], "results": results}, f, indent=2)
+
+    storage.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
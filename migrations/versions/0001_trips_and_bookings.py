@@ -0,0 +1,50 @@
+"""create trips and bookings
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "trips",
+        sa.Column("trip_id", sa.String(32), primary_key=True),
+        sa.Column("train_no", sa.String(16), nullable=False),
+        sa.Column("from_station", sa.String(8), nullable=False),
+        sa.Column("to_station", sa.String(8), nullable=False),
+        sa.Column("depart_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("arrive_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("base_fare", sa.Integer, nullable=False),
+        sa.Column("capacity", sa.Integer, nullable=False),
+    )
+    op.create_index("ix_trips_depart_at", "trips", ["depart_at"])
+
+    op.create_table(
+        "bookings",
+        sa.Column("booking_id", sa.String(16), primary_key=True),
+        sa.Column("ticket_code", sa.String(32), nullable=False),
+        sa.Column("passenger_name", sa.String(60), nullable=False),
+        sa.Column("trip_id", sa.String(32), sa.ForeignKey("trips.trip_id"), nullable=False),
+        sa.Column("seats", sa.Integer, nullable=False),
+        sa.Column("total_price", sa.Integer, nullable=False),
+        sa.Column("booked_at", sa.DateTime(timezone=True), nullable=False),
+    )
+    op.create_index("ix_bookings_trip_id", "bookings", ["trip_id"])
+    op.create_index("ix_bookings_booked_at", "bookings", ["booked_at"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_bookings_booked_at", table_name="bookings")
+    op.drop_index("ix_bookings_trip_id", table_name="bookings")
+    op.drop_table("bookings")
+    op.drop_index("ix_trips_depart_at", table_name="trips")
+    op.drop_table("trips")
@@ -0,0 +1,26 @@
+"""add bookings.travel_class
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Existing bookings predate fare classes and were all priced as second class.
+    op.add_column(
+        "bookings",
+        sa.Column("travel_class", sa.String(16), nullable=False, server_default="second"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("bookings", "travel_class")
@@ -0,0 +1,23 @@
+"""add trips.run_id
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Existing trips are each a whole run.
+    op.add_column("trips", sa.Column("run_id", sa.String(64), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("trips", "run_id")
@@ -0,0 +1,31 @@
+"""widen trips.from_station / to_station
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # GTFS imports use stop codes/ids as station codes, which are often longer than 8.
+    with op.batch_alter_table("trips") as batch:
+        for column in ("from_station", "to_station"):
+            batch.alter_column(
+                column, type_=sa.String(64), existing_type=sa.String(8), existing_nullable=False
+            )
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("trips") as batch:
+        for column in ("from_station", "to_station"):
+            batch.alter_column(
+                column, type_=sa.String(8), existing_type=sa.String(64), existing_nullable=False
+            )
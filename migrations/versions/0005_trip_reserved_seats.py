@@ -0,0 +1,27 @@
+"""add trips.reserved
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Seats sold per trip, checked by every booking write; seeded from existing bookings.
+    op.add_column("trips", sa.Column("reserved", sa.Integer(), nullable=False, server_default="0"))
+    op.execute(
+        "UPDATE trips SET reserved = "
+        "(SELECT COALESCE(SUM(seats), 0) FROM bookings WHERE bookings.trip_id = trips.trip_id)"
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("trips", "reserved")
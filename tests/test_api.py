@@ -0,0 +1,108 @@
+from fastapi.testclient import TestClient
+
+from app.main import app
+
+client = TestClient(app)
+
+
+def test_route_batch_reuses_origin_and_reports_errors():
+    resp = client.post(
+        "/route/batch",
+        json={
+            "pairs": [
+                {"from_station": "ndls", "to_station": "BPL"},
+                {"from_station": "NDLS", "to_station": "HWH"},
+                {"from_station": "XXXX", "to_station": "BPL"},
+            ]
+        },
+    )
+    assert resp.status_code == 200
+    first, second, bad = resp.json()["results"]
+    assert (
+        first["total_km"]
+        == client.get("/route?from_station=NDLS&to_station=BPL").json()["total_km"]
+    )
+    assert "legs" not in first
+    assert second["total_fare"] == second["total_km"] * 2
+    assert bad["error"] == "Unknown station code(s)."
+
+
+def test_route_matrix():
+    resp = client.post(
+        "/route/matrix",
+        json={"sources": ["NDLS", "HWH"], "targets": ["NDLS", "BPL"], "include_legs": True},
+    )
+    assert resp.status_code == 200
+    body = resp.json()
+    assert body["km"][0][0] == 0
+    assert body["km"][1][1] == 350 + 967
+    assert [leg["from"] for leg in body["legs"][1][1]] == ["HWH", "NGP"]
+
+    resp = client.post("/route/matrix", json={"sources": ["NOPE"], "targets": ["BPL"]})
+    assert resp.status_code == 400
+
+
+def test_bookings_are_cursor_paginated():
+    for name in ("Page A", "Page B", "Page A"):
+        resp = client.post(
+            "/bookings", json={"passenger_name": name, "trip_id": "T1001", "seats": 1}
+        )
+        assert resp.status_code == 200
+
+    first = client.get("/bookings", params={"passenger_name": "page a", "limit": 1})
+    assert first.status_code == 200
+    assert len(first.json()) == 1
+    cursor = first.headers["X-Next-Cursor"]
+    second = client.get(
+        "/bookings", params={"passenger_name": "page a", "limit": 1, "cursor": cursor}
+    )
+    assert second.json()[0]["booking_id"] != first.json()[0]["booking_id"]
+    assert "X-Next-Cursor" not in second.headers
+
+    assert client.get("/bookings", params={"cursor": "%%%"}).status_code == 400
+
+
+def test_trips_filter_by_corridor_and_window():
+    all_trips = client.get("/trips").json()
+    departures = [t["depart_at"] for t in all_trips]
+    assert departures == sorted(departures)
+
+    resp = client.get("/trips", params={"from": "agc", "to": "BPL"})
+    assert [t["trip_id"] for t in resp.json()] == ["T1002"]
+    t1002 = resp.json()[0]["depart_at"]
+    assert (
+        client.get("/trips", params={"from": "AGC", "after": t1002}).json()[0]["trip_id"] == "T1002"
+    )
+    assert client.get("/trips", params={"from": "AGC", "before": t1002}).json() == []
+    assert "T1005" in [t["trip_id"] for t in client.get("/trips", params={"to": "HWH"}).json()]
+
+
+def test_static_listings_are_etagged():
+    first = client.get("/stations")
+    assert first.status_code == 200
+    assert [s["code"] for s in first.json()] == sorted(s["code"] for s in first.json())
+    etag = first.headers["ETag"]
+    assert first.headers["Cache-Control"].startswith("public, max-age=")
+
+    again = client.get("/stations", headers={"If-None-Match": etag})
+    assert again.status_code == 304
+    assert again.headers["ETag"] == etag
+    assert client.get("/stations", headers={"If-None-Match": '"stale"'}).status_code == 200
+
+    trips = client.get("/trips")
+    assert client.get("/trips", headers={"If-None-Match": trips.headers["ETag"]}).status_code == 304
+    filtered = client.get("/trips", params={"from": "NDLS"})
+    assert filtered.headers["ETag"] != trips.headers["ETag"]
+    revalidated = client.get(
+        "/trips", params={"from": "NDLS"}, headers={"If-None-Match": filtered.headers["ETag"]}
+    )
+    assert revalidated.status_code == 304
+
+
+def test_station_codes_longer_than_six_characters_are_looked_up():
+    # Unknown, but valid: the lookup answers rather than the validator.
+    assert client.get("/route?from_station=NDLS&to_station=GWALIOR-JN").status_code == 400
+    resp = client.post(
+        "/route/batch", json={"pairs": [{"from_station": "GWALIOR-JN", "to_station": "BPL"}]}
+    )
+    assert resp.json()["results"][0]["error"] == "Unknown station code(s)."
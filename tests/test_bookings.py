@@ -0,0 +1,362 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.models.schemas import Booking, Trip
+from app.services.booking_index import BookingIndex
+
+T0 = datetime(2025, 3, 1, 9, 0, tzinfo=timezone.utc)
+
+
+def _trip(trip_id):
+    return Trip(
+        trip_id=trip_id,
+        train_no="12345",
+        from_station="NDLS",
+        to_station="AGC",
+        depart_at=T0,
+        arrive_at=T0 + timedelta(hours=2),
+        base_fare=100,
+    )
+
+
+def _index(n):
+    trips = [_trip("IX1"), _trip("IX2")]
+    index = BookingIndex()
+    bookings = [
+        Booking(
+            booking_id=f"B{i:03d}",
+            ticket_code="RQ-0000-0000",
+            passenger_name=["Asha", "Ravi", "Meera"][i % 3],
+            trip=trips[i % 2],
+            seats=1,
+            total_price=100,
+            # pairs of bookings share a timestamp; booking_id breaks the tie
+            booked_at=T0 + timedelta(seconds=i // 2),
+        )
+        for i in range(n)
+    ]
+    # out of order on purpose: the index must not depend on insertion order
+    for booking in bookings[::2] + bookings[1::2]:
+        index.add(booking)
+    return index, bookings
+
+
+def _pages(index, **filters):
+    seen, cursor = [], None
+    while True:
+        page, cursor = index.query(limit=7, cursor=cursor, **filters)
+        seen.extend(b.booking_id for b in page)
+        if cursor is None:
+            return seen
+
+
+def test_pages_cover_every_booking_newest_first():
+    index, bookings = _index(50)
+    newest_first = [b.booking_id for b in reversed(bookings)]
+    assert [b.booking_id for b in index.query()[0]] == newest_first
+    assert _pages(index) == newest_first
+
+
+def test_filters_use_secondary_indexes():
+    index, bookings = _index(50)
+    by_trip = [b.booking_id for b in reversed(bookings) if b.trip.trip_id == "IX2"]
+    assert _pages(index, trip_id="IX2") == by_trip
+    by_name = [b.booking_id for b in reversed(bookings) if b.passenger_name == "Ravi"]
+    assert _pages(index, passenger_name="ravi") == by_name
+    both = [b for b in by_name if b in by_trip]
+    assert _pages(index, trip_id="IX2", passenger_name="Ravi") == both
+    assert index.query(trip_id="nope")[0] == []
+
+
+def test_last_page_has_no_cursor_and_bad_cursor_is_rejected():
+    index, _ = _index(7)
+    page, cursor = index.query(limit=7)
+    assert len(page) == 7 and cursor is None
+    with pytest.raises(ValueError):
+        index.query(cursor="not-a-cursor")
+
+
+def test_trip_fares_by_class_and_departure_hour():
+    from app.core.config import Settings
+    from app.services.pricing import FareTable
+
+    # twice the price from 17:00 to 21:00 local time, UTC+05:30
+    table = FareTable.from_settings(
+        Settings(fare_time_of_day=((0, 1.0), (17, 2.0), (21, 1.0)), fare_utc_offset_minutes=330)
+    )
+    morning = _trip("M")  # 09:00 UTC, 14:30 local
+    evening = morning.model_copy(update={"trip_id": "E", "depart_at": T0 + timedelta(hours=3)})
+    assert table.trip_fares([morning, evening]) == [100, 200]
+    assert table.trip_fares([morning, evening], seats=2, travel_class="sleeper") == [300, 600]
+    with pytest.raises(ValueError):
+        table.trip_fares([morning], travel_class="royal")
+
+
+def test_fare_quote_endpoint():
+    from fastapi.testclient import TestClient
+
+    from app.data.seed import list_trips
+    from app.main import app
+
+    trip = list_trips()[0]
+    client = TestClient(app)
+    resp = client.post(
+        "/bookings/quote",
+        json={"trip_ids": [trip.trip_id, "NOPE"], "seats": 2, "travel_class": "ac2"},
+    ).json()
+    assert resp["travel_class"] == "ac2"
+    assert resp["quotes"] == [
+        {"trip_id": trip.trip_id, "total_price": round(trip.base_fare * 2 * 3.5)},
+        {"trip_id": "NOPE"},
+    ]
+    bad = client.post("/bookings/quote", json={"trip_ids": [trip.trip_id], "travel_class": "x"})
+    assert bad.status_code == 400
+
+
+def test_idempotency_cache_runs_each_key_once():
+    import threading
+    import time
+
+    from app.core.cache import IdempotencyCache, IdempotencyKeyReused
+
+    cache = IdempotencyCache(10, 60)
+    calls = []
+
+    def work():
+        calls.append(1)
+        time.sleep(0.05)
+        return len(calls)
+
+    # concurrent repeats wait for the first call instead of running again
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(cache.run("k", "req", work)))
+        for _ in range(8)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(calls) == 1
+    assert sorted(results) == [(1, False)] + [(1, True)] * 7
+    assert cache.run("k", "req", work) == (1, True)
+    with pytest.raises(IdempotencyKeyReused):
+        cache.run("k", "other", work)
+
+    # failures are not remembered
+    def fail():
+        raise ValueError("sold out")
+
+    with pytest.raises(ValueError):
+        cache.run("f", "req", fail)
+    assert cache.run("f", "req", work) == (2, False)
+
+
+def test_booking_retry_with_idempotency_key():
+    from fastapi.testclient import TestClient
+
+    from app.data.seed import list_trips
+    from app.main import app
+
+    trip = list_trips()[1]
+    client = TestClient(app)
+    payload = {"passenger_name": "Asha", "trip_id": trip.trip_id, "seats": 2}
+
+    def reserved():
+        return client.get(f"/trips/{trip.trip_id}/availability").json()["reserved"]
+
+    before = reserved()
+    first = client.post("/bookings", json=payload, headers={"Idempotency-Key": "retry-1"})
+    retry = client.post("/bookings", json=payload, headers={"Idempotency-Key": "retry-1"})
+    assert first.status_code == retry.status_code == 200
+    assert retry.json() == first.json()
+    assert "idempotent-replayed" not in first.headers
+    assert retry.headers["idempotent-replayed"] == "true"
+    assert reserved() == before + 2
+
+    reused = client.post(
+        "/bookings", json={**payload, "seats": 1}, headers={"Idempotency-Key": "retry-1"}
+    )
+    assert reused.status_code == 422
+    assert reserved() == before + 2
+
+
+def test_bulk_booking_modes():
+    import json
+
+    from fastapi.testclient import TestClient
+
+    from app.data.seed import add_trips
+    from app.main import app
+
+    add_trips([_trip("BULK1").model_copy(update={"capacity": 5})])
+    client = TestClient(app)
+
+    def reserved():
+        return client.get("/trips/BULK1/availability").json()["reserved"]
+
+    group = [{"passenger_name": f"P{i}", "trip_id": "BULK1", "seats": 2} for i in range(3)]
+    failed = client.post("/bookings/bulk?mode=all_or_nothing", json=group)
+    assert failed.status_code == 409
+    lines = [json.loads(line) for line in failed.text.splitlines()]
+    assert [("booking" in r, r.get("error")) for r in lines] == [
+        (False, "Not booked: another item in the group failed."),
+        (False, "Not booked: another item in the group failed."),
+        (False, "Not enough seats available."),
+    ]
+    assert reserved() == 0
+    invalid = client.post("/bookings/bulk?mode=all_or_nothing", json=[*group[:2], {"seats": 1}])
+    assert invalid.status_code == 422
+    assert reserved() == 0
+
+    body = "\n".join(json.dumps(item) for item in [*group, {"trip_id": "BULK1"}, group[0]])
+    resp = client.post(
+        "/bookings/bulk", content=body, headers={"Content-Type": "application/x-ndjson"}
+    )
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in resp.text.splitlines()]
+    assert [r["index"] for r in lines] == [0, 1, 2, 3, 4]
+    assert [r["booking"]["passenger_name"] for r in lines[:2]] == ["P0", "P1"]
+    assert lines[2]["error"] == "Not enough seats available."
+    assert lines[3]["error"].startswith("passenger_name:")
+    assert lines[4]["error"] == "Not enough seats available."
+    assert reserved() == 4
+
+    assert client.post("/bookings/bulk", json={"not": "a list"}).status_code == 400
+
+
+def test_bulk_ndjson_sent_in_chunks_answers_every_item():
+    import asyncio
+    import json
+
+    from app.data.seed import add_trips
+    from app.main import app
+
+    add_trips([_trip("BULK2").model_copy(update={"capacity": 100})])
+    body = "".join(
+        json.dumps({"passenger_name": f"P{i}", "trip_id": "BULK2", "seats": 1}) + "\n"
+        for i in range(40)
+    ).encode()
+    # Uneven pieces, so lines are split across body messages.
+    parts = [body[start : start + 97] for start in range(0, len(body), 97)]
+
+    async def post() -> bytes:
+        # TestClient sends a body in one message; a real server sends it as it arrives.
+        done = asyncio.Event()
+        received = []
+
+        async def receive():
+            if parts:
+                await asyncio.sleep(0)
+                return {"type": "http.request", "body": parts.pop(0), "more_body": bool(parts)}
+            await done.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            if message["type"] == "http.response.body":
+                received.append(message.get("body", b""))
+                if not message.get("more_body", False):
+                    done.set()
+
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": "POST",
+            "scheme": "http",
+            "path": "/bookings/bulk",
+            "raw_path": b"/bookings/bulk",
+            "query_string": b"",
+            "root_path": "",
+            "headers": [(b"content-type", b"application/x-ndjson")],
+            "client": ("test", 1),
+            "server": ("test", 80),
+        }
+        await app(scope, receive, send)
+        return b"".join(received)
+
+    resp = asyncio.run(asyncio.wait_for(post(), 10))
+    lines = [json.loads(line) for line in resp.splitlines()]
+    assert [r["index"] for r in lines] == list(range(40))
+    assert [r["booking"]["passenger_name"] for r in lines] == [f"P{i}" for i in range(40)]
+
+
+def test_bulk_limits_answer_413_in_both_modes(monkeypatch):
+    import dataclasses
+    import json
+
+    from fastapi.testclient import TestClient
+
+    from app.api.routes import bookings
+    from app.main import app
+
+    monkeypatch.setattr(
+        bookings,
+        "settings",
+        dataclasses.replace(
+            bookings.settings, bulk_booking_max_items=3, bulk_booking_max_bytes=400
+        ),
+    )
+    client = TestClient(app)
+    group = [{"passenger_name": f"P{i}", "trip_id": "NOPE", "seats": 1} for i in range(4)]
+    ndjson = {"Content-Type": "application/x-ndjson"}
+    body = "\n".join(json.dumps(item) for item in group)
+
+    for mode in ("best_effort", "all_or_nothing"):
+        url = f"/bookings/bulk?mode={mode}"
+        assert client.post(url, json=group).status_code == 413
+        too_many = client.post(url, content=body, headers=ndjson)
+        assert too_many.status_code == 413
+        assert too_many.json()["detail"] == "Too many items (at most 3 per request)."
+        too_big = client.post(url, content=body + " " * 400, headers=ndjson)
+        assert too_big.status_code == 413
+        assert too_big.json()["detail"].startswith("Body too large")
+
+
+def test_scan_streams_booked_at_window_in_chunks():
+    index, bookings = _index(50)
+    window = list(index.scan(T0 + timedelta(seconds=5), T0 + timedelta(seconds=20), chunk=4))
+    assert all(0 < len(chunk) <= 4 for chunk in window)
+    # booked_at 5s..19s: bookings 10..39, oldest first
+    assert [b for chunk in window for b in chunk] == bookings[10:40]
+    assert [b for chunk in index.scan(chunk=7) for b in chunk] == bookings
+
+
+def test_export_endpoints():
+    import csv
+    import io
+    import json
+
+    from fastapi.testclient import TestClient
+
+    from app.data.seed import list_trips
+    from app.main import app
+
+    client = TestClient(app)
+    trip = list_trips()[2]
+    payload = {"passenger_name": "Export", "trip_id": trip.trip_id, "seats": 1}
+    booked = client.post("/bookings", json=payload).json()
+    window = {"booked_after": booked["booked_at"]}
+
+    resp = client.get("/bookings/export", params=window)
+    assert resp.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in resp.text.splitlines()]
+    assert booked in lines
+
+    text = client.get("/bookings/export", params={**window, "format": "csv"}).text
+    rows = list(csv.DictReader(io.StringIO(text)))
+    row = next(r for r in rows if r["booking_id"] == booked["booking_id"])
+    assert (row["trip_id"], row["seats"], row["travel_class"]) == (trip.trip_id, "1", "second")
+    # CSV timestamps are written exactly as the JSON ones, in UTC with a Z suffix.
+    assert row["booked_at"] == booked["booked_at"]
+    assert row["depart_at"] == booked["trip"]["depart_at"]
+    assert row["booked_at"].endswith("Z")
+
+    trips = [json.loads(line) for line in client.get("/trips/export").text.splitlines()]
+    assert trips == json.loads(client.get("/trips").text)
+    rows = list(csv.DictReader(io.StringIO(client.get("/trips/export?format=csv").text)))
+    assert [r["trip_id"] for r in rows] == [t["trip_id"] for t in trips]
+    assert [r["depart_at"] for r in rows] == [t["depart_at"] for t in trips]
+    assert client.get("/trips/export?format=xml").status_code == 422
@@ -0,0 +1,138 @@
+from datetime import date, datetime, timezone
+
+import pytest
+
+from app.data.gtfs import import_feed
+from app.services.journey_service import _connection_scan, _transfers, build_timetable
+
+DAY = date(2025, 5, 5)  # a Monday
+
+FEED = {
+    "agency.txt": "agency_id,agency_name,agency_timezone\nIR,Indian Railways,Asia/Kolkata\n",
+    "stops.txt": (
+        "stop_id,stop_code,stop_name,stop_lat,stop_lon,parent_station\n"
+        "ndls,NDLS,New Delhi,28.6430,77.2194,\n"
+        "ndls-p1,,New Delhi Platform 1,,,ndls\n"
+        "agc,AGC,Agra Cantt,27.1585,77.9910,\n"
+        "gwl,GWL,Gwalior,26.2183,78.1828,\n"
+    ),
+    "routes.txt": "route_id,route_short_name,route_long_name\nR1,Red Line,\nR2,,Blue Express\n",
+    "trips.txt": (
+        "route_id,service_id,trip_id,trip_short_name\n"
+        "R1,WEEKDAY,r1-a,12951\n"
+        "R1,WEEKEND,r1-b,12953\n"
+        "R2,WEEKDAY,r2-a,\n"
+    ),
+    "calendar.txt": (
+        "service_id,monday,tuesday,wednesday,thursday,friday,saturday,sunday,start_date,end_date\n"
+        "WEEKDAY,1,1,1,1,1,0,0,20250101,20251231\n"
+        "WEEKEND,0,0,0,0,0,1,1,20250101,20251231\n"
+    ),
+    "stop_times.txt": (
+        "trip_id,arrival_time,departure_time,stop_id,stop_sequence,shape_dist_traveled\n"
+        "r1-a,06:00:00,06:00:00,ndls-p1,1,0\n"
+        "r1-a,08:05:00,08:10:00,agc,2,188\n"
+        "r1-a,,,gwl,3,\n"
+        "r1-a,25:30:00,25:30:00,gwl,4,306\n"
+        "r1-b,06:00:00,06:00:00,ndls,1,0\n"
+        "r1-b,08:00:00,08:00:00,agc,2,188\n"
+        "r2-a,09:00:00,09:00:00,agc,1,\n"
+        "r2-a,10:00:00,10:00:00,gwl,2,\n"
+    ),
+}
+
+
+def _write_feed(path, **overrides):
+    for name, content in {**FEED, **overrides}.items():
+        (path / name).write_text(content)
+    return str(path)
+
+
+def test_import_streams_segments_and_network(tmp_path):
+    feed_dir = _write_feed(tmp_path)
+    chunks = []
+    feed = import_feed(feed_dir, DAY, sink=chunks.append, chunk_size=2)
+
+    trips = [t for chunk in chunks for t in chunk]
+    assert [len(c) for c in chunks] == [2, 1]
+    assert feed.stats.trips == 2 and feed.stats.segments == 3  # r1-b only runs at weekends
+    assert feed.stats.rows > 0 and feed.stats.rows_per_sec > 0
+
+    first, second, express = trips
+    assert (first.trip_id, first.train_no) == ("r1-a:1", "12951")
+    # platform stops belong to their parent station; times are local (UTC+5:30)
+    assert (first.from_station, first.to_station) == ("NDLS", "AGC")
+    assert first.depart_at == datetime(2025, 5, 5, 0, 30, tzinfo=timezone.utc)
+    assert first.base_fare == 188 * 2
+    # the untimed stop is skipped, and times past 24:00 roll into the next day
+    assert (second.from_station, second.to_station) == ("AGC", "GWL")
+    assert second.arrive_at == datetime(2025, 5, 5, 20, 0, tzinfo=timezone.utc)
+    assert express.train_no == "r2-a"
+
+    assert set(feed.stations) == {"NDLS", "AGC", "GWL"}
+    edges = {(frm, e.to, e.line): e.km for frm, out in feed.graph.items() for e in out}
+    # shape_dist_traveled when present, otherwise great-circle distance
+    assert edges[("NDLS", "AGC", "Red Line")] == 188
+    assert edges[("AGC", "GWL", "Red Line")] == 118
+    assert 100 < edges[("AGC", "GWL", "Blue Express")] < 110
+
+
+def test_reimport_only_touches_changed_routes(tmp_path):
+    feed_dir = _write_feed(tmp_path)
+    first = import_feed(feed_dir, DAY, sink=lambda chunk: None)
+
+    unchanged = import_feed(
+        feed_dir, DAY, sink=lambda chunk: None, previous_digests=first.route_digests
+    )
+    assert unchanged.stats.segments == 0 and unchanged.stats.routes_unchanged == 2
+    assert unchanged.route_digests == first.route_digests
+    assert unchanged.graph == first.graph
+
+    retimed = FEED["stop_times.txt"].replace("r2-a,10:00:00,10:00:00", "r2-a,10:15:00,10:15:00")
+    _write_feed(tmp_path, **{"stop_times.txt": retimed})
+    chunks = []
+    changed = import_feed(feed_dir, DAY, sink=chunks.append, previous_digests=first.route_digests)
+    assert [t.trip_id for chunk in chunks for t in chunk] == ["r2-a:1"]
+    assert (changed.stats.routes_changed, changed.stats.routes_unchanged) == (1, 1)
+    assert changed.route_digests["R1"] == first.route_digests["R1"]
+    assert changed.route_digests["R2"] != first.route_digests["R2"]
+
+
+def test_through_train_with_short_dwell_is_one_journey(tmp_path):
+    # r1-a stops at Agra for only 2 minutes, less than the 5 minute transfer time,
+    # and reaches Gwalior before the r2-a connection from Agra
+    dwell = (
+        FEED["stop_times.txt"]
+        .replace("08:05:00,08:10:00", "08:05:00,08:07:00")
+        .replace("25:30:00,25:30:00", "09:30:00,09:30:00")
+    )
+    chunks = []
+    import_feed(_write_feed(tmp_path, **{"stop_times.txt": dwell}), DAY, sink=chunks.append)
+    trips = [t for chunk in chunks for t in chunk]
+    assert {t.run_id for t in trips} == {"r1-a", "r2-a"}
+
+    tt = build_timetable(trips)
+    after = datetime(2025, 5, 5, tzinfo=timezone.utc).timestamp()
+    path = _connection_scan(tt, tt.stop_index["NDLS"], tt.stop_index["GWL"], after, 5 * 60)
+    assert [tt.trips[c].trip_id for c in path] == ["r1-a:1", "r1-a:2"]
+    assert _transfers(tt, path) == 0
+
+
+def test_split_trips_and_unknown_stops_are_rejected(tmp_path):
+    split = FEED["stop_times.txt"] + "r1-a,26:00:00,26:00:00,agc,5,\n"
+    with pytest.raises(ValueError, match="more than one place"):
+        import_feed(_write_feed(tmp_path, **{"stop_times.txt": split}), DAY, sink=lambda c: None)
+
+    unknown = FEED["stop_times.txt"].replace("10:00:00,gwl", "10:00:00,xx")
+    with pytest.raises(ValueError, match="unknown stop"):
+        import_feed(_write_feed(tmp_path, **{"stop_times.txt": unknown}), DAY, sink=lambda c: None)
+
+
+def test_long_stop_codes_import_up_to_the_storage_width(tmp_path):
+    stops = FEED["stops.txt"].replace(",GWL,", ",GWALIOR-JN,")
+    feed = import_feed(_write_feed(tmp_path, **{"stops.txt": stops}), DAY, sink=lambda c: None)
+    assert "GWALIOR-JN" in feed.stations
+
+    too_long = FEED["stops.txt"].replace(",GWL,", f",{'G' * 65},")
+    with pytest.raises(ValueError, match="longer than 64"):
+        import_feed(_write_feed(tmp_path, **{"stops.txt": too_long}), DAY, sink=lambda c: None)
@@ -0,0 +1,109 @@
+import random
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.data.seed import add_trips
+from app.models.schemas import BookingCreate, Trip
+from app.services import booking_service
+from app.services.inventory import SeatInventory
+
+T0 = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+
+class _YieldingDict(dict):
+    def get(self, *args):
+        value = super().get(*args)
+        time.sleep(0)  # hand the GIL over between read and write of a counter
+        return value
+
+
+@pytest.fixture
+def racy(monkeypatch):
+    # Force frequent thread switches so races actually interleave.
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    inventory = booking_service._INVENTORY
+    monkeypatch.setattr(inventory, "_reserved", _YieldingDict(inventory._reserved))
+    yield
+    sys.setswitchinterval(interval)
+
+
+def _trips(prefix, count, capacity):
+    trips = [
+        Trip(
+            trip_id=f"{prefix}{i}",
+            train_no="99999",
+            from_station="NDLS",
+            to_station="AGC",
+            depart_at=T0,
+            arrive_at=T0 + timedelta(hours=2),
+            base_fare=100,
+            capacity=capacity,
+        )
+        for i in range(count)
+    ]
+    add_trips(trips)
+    return trips
+
+
+def _fire(requests):
+    def book(req):
+        try:
+            return booking_service.create_booking(req)
+        except ValueError:
+            return None
+
+    with ThreadPoolExecutor(max_workers=32) as pool:
+        return list(pool.map(book, requests))
+
+
+def test_no_overselling_under_concurrent_load(racy):
+    trips = _trips("STRESS", 8, capacity=250)
+    rng = random.Random(0)
+    requests = [
+        BookingCreate(
+            passenger_name=f"P{i}", trip_id=rng.choice(trips).trip_id, seats=rng.randint(1, 4)
+        )
+        for i in range(4000)
+    ]
+    results = _fire(requests)
+
+    booked = [b for b in results if b is not None]
+    assert len({b.booking_id for b in booked}) == len(booked)
+    for trip in trips:
+        seats = sum(b.seats for b in booked if b.trip.trip_id == trip.trip_id)
+        stored = sum(
+            b.seats for b in booking_service._BOOKINGS.values() if b.trip.trip_id == trip.trip_id
+        )
+        assert seats == stored == booking_service._INVENTORY.reserved(trip.trip_id)
+        # Demand is ~8x capacity, so every trip must end up (nearly) full but never over.
+        assert trip.capacity - 3 <= seats <= trip.capacity
+        assert booking_service.seat_availability(trip.trip_id).available == trip.capacity - seats
+
+
+def test_reserve_and_release():
+    inventory = SeatInventory(stripes=4)
+    assert inventory.reserve("T", 3, capacity=5) == 2
+    with pytest.raises(ValueError):
+        inventory.reserve("T", 3, capacity=5)
+    inventory.release("T", 2)
+    assert inventory.reserve("T", 4, capacity=5) == 0
+    with pytest.raises(RuntimeError):
+        inventory.release("T", 6)
+
+
+def test_reserve_many_best_effort_and_all_or_nothing():
+    inv = SeatInventory(stripes=4)
+    inv.reserve("T1", 8, 10)
+    requests = [("T1", 1, 10), ("T2", 3, 5), ("T1", 2, 10), ("T2", 2, 5), ("T1", 1, 10)]
+
+    assert inv.reserve_many(requests, all_or_nothing=True) == [True, True, False, True, True]
+    assert (inv.reserved("T1"), inv.reserved("T2")) == (8, 0)
+
+    # granted in order while seats last
+    assert inv.reserve_many(requests) == [True, True, False, True, True]
+    assert (inv.reserved("T1"), inv.reserved("T2")) == (10, 5)
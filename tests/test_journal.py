@@ -0,0 +1,109 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+from app.models.schemas import Booking, Trip
+from app.storage.journal import JournalStorage
+
+T0 = datetime(2025, 1, 1, 8, 0, tzinfo=timezone.utc)
+TRIP = Trip(
+    trip_id="J1",
+    train_no="22222",
+    from_station="JP",
+    to_station="ADI",
+    depart_at=T0,
+    arrive_at=T0 + timedelta(hours=9),
+    base_fare=850,
+)
+
+
+def _booking(i):
+    return Booking(
+        booking_id=f"B{i:08d}",
+        ticket_code="RQ-0000-0000",
+        passenger_name=f"P{i}",
+        trip=TRIP,
+        seats=1,
+        total_price=850,
+        booked_at=T0 + timedelta(seconds=i),
+    )
+
+
+def test_group_commit_batches_concurrent_writers(tmp_path):
+    journal = JournalStorage(str(tmp_path), snapshot_every=0)
+    bookings = [_booking(i) for i in range(500)]
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        list(pool.map(lambda b: journal.save_bookings([b]), bookings))
+
+    assert journal.records_written == 500
+    assert journal.commits < 500
+    journal.close()
+
+    replayed = list(JournalStorage(str(tmp_path)).load_bookings())
+    assert sorted(b.booking_id for b in replayed) == [b.booking_id for b in bookings]
+
+
+def test_snapshot_compaction_and_torn_tail(tmp_path):
+    journal = JournalStorage(str(tmp_path), snapshot_every=10)
+    journal.save_trips([TRIP])
+    for i in range(25):
+        journal.save_bookings([_booking(i)])
+    journal.close()
+    assert os.path.getsize(tmp_path / "snapshot.log") > 0
+    assert os.path.getsize(tmp_path / "journal.log") < os.path.getsize(tmp_path / "snapshot.log")
+
+    # Simulate a crash halfway through appending a record.
+    with open(tmp_path / "journal.log", "ab") as f:
+        f.write(b'B{"booking_id":"B999')
+
+    reopened = JournalStorage(str(tmp_path), snapshot_every=10)
+    reopened.save_bookings([_booking(25)])
+    assert [t.trip_id for t in reopened.load_trips()] == ["J1"]
+    assert [b.booking_id for b in reopened.load_bookings()] == [f"B{i:08d}" for i in range(26)]
+    assert reopened.get_booking("B00000003") == _booking(3)
+
+
+def test_compaction_runs_beside_writers(tmp_path, monkeypatch):
+    import threading
+
+    journal = JournalStorage(str(tmp_path), snapshot_every=5)
+    release = threading.Event()
+    compact = journal._compact
+
+    def slow_compact():
+        release.wait(5)
+        compact()
+
+    monkeypatch.setattr(journal, "_compact", slow_compact)
+    for i in range(20):
+        journal.save_bookings([_booking(i)])
+    # every save returned while the first compaction was still held up
+    assert not release.is_set() and (tmp_path / "journal.compacting.log").exists()
+    assert journal.get_booking("B00000019") == _booking(19)
+
+    release.set()
+    journal.close()
+    assert not (tmp_path / "journal.compacting.log").exists()
+    replayed = list(JournalStorage(str(tmp_path)).load_bookings())
+    assert [b.booking_id for b in replayed] == [f"B{i:08d}" for i in range(20)]
+
+
+def test_failed_compaction_does_not_fail_committed_write(tmp_path, monkeypatch):
+    journal = JournalStorage(str(tmp_path), snapshot_every=2)
+    attempts = []
+
+    def broken_compact():
+        attempts.append(1)
+        raise OSError("disk full")
+
+    monkeypatch.setattr(journal, "_compact", broken_compact)
+    for i in range(5):
+        journal.save_bookings([_booking(i)])
+        if journal._compactor is not None:
+            journal._compactor.join()
+    # retried once every snapshot_every records, not on every commit
+    assert len(attempts) == 2
+    journal.close()
+
+    replayed = list(JournalStorage(str(tmp_path)).load_bookings())
+    assert [b.booking_id for b in replayed] == [f"B{i:08d}" for i in range(5)]
@@ -0,0 +1,83 @@
+from datetime import datetime, timedelta, timezone
+
+from app.models.schemas import Trip
+from app.services.journey_service import _connection_scan, _transfers, build_timetable
+
+UTC = timezone.utc
+T0 = datetime(2025, 1, 1, 6, 0, tzinfo=UTC)
+
+
+def _trip(trip_id, a, b, dep_min, arr_min, run_id=None):
+    return Trip(
+        trip_id=trip_id,
+        train_no="00000",
+        from_station=a,
+        to_station=b,
+        depart_at=T0 + timedelta(minutes=dep_min),
+        arrive_at=T0 + timedelta(minutes=arr_min),
+        base_fare=100,
+        run_id=run_id,
+    )
+
+
+TRIPS = [
+    _trip("direct", "A", "C", 0, 300),
+    _trip("a-b", "A", "B", 10, 60),
+    _trip("b-c-tight", "B", "C", 62, 120),  # misses a 5 minute transfer
+    _trip("b-c", "B", "C", 70, 150),
+    _trip("c-d", "C", "D", 160, 200),
+    _trip("early", "A", "D", -60, 30),  # departs before the query time
+]
+
+
+def _plan(a, b, after_min=0, transfer_min=5):
+    tt = build_timetable(TRIPS)
+    after = (T0 + timedelta(minutes=after_min)).timestamp()
+    path = _connection_scan(tt, tt.stop_index[a], tt.stop_index[b], after, transfer_min * 60)
+    return [tt.trips[c].trip_id for c in path]
+
+
+def test_earliest_arrival_with_transfers():
+    assert _plan("A", "C") == ["a-b", "b-c"]
+    assert _plan("A", "C", transfer_min=0) == ["a-b", "b-c-tight"]
+    assert _plan("A", "D") == ["a-b", "b-c", "c-d"]
+
+
+def test_respects_departure_time_and_unreachable():
+    assert _plan("A", "C", transfer_min=100) == ["direct"]
+    assert _plan("A", "D", after_min=-60) == ["early"]
+    assert _plan("A", "C", after_min=20) == []
+    assert _plan("D", "A") == []
+
+
+def test_through_train_needs_no_transfer_time():
+    # one train A -> B -> C with a 2 minute stop at B, and a later change at C
+    trips = [
+        _trip("r1:1", "A", "B", 0, 60, run_id="r1"),
+        _trip("r1:2", "B", "C", 62, 120, run_id="r1"),
+        _trip("c-d", "C", "D", 122, 180),
+        _trip("c-d-later", "C", "D", 130, 200),
+    ]
+    tt = build_timetable(trips)
+    after = T0.timestamp()
+    path = _connection_scan(tt, tt.stop_index["A"], tt.stop_index["D"], after, 5 * 60)
+    assert [tt.trips[c].trip_id for c in path] == ["r1:1", "r1:2", "c-d-later"]
+    assert _transfers(tt, path) == 1
+
+    # boarding mid-run still needs the train to be there
+    path = _connection_scan(tt, tt.stop_index["B"], tt.stop_index["C"], after, 5 * 60)
+    assert [tt.trips[c].trip_id for c in path] == ["r1:2"]
+    late = (T0 + timedelta(minutes=63)).timestamp()
+    assert _connection_scan(tt, tt.stop_index["B"], tt.stop_index["C"], late, 5 * 60) == []
+
+
+def test_journey_endpoint_validates_stations():
+    from fastapi.testclient import TestClient
+
+    from app.main import app
+
+    client = TestClient(app)
+    assert client.get("/journey?from_station=XXXX&to_station=BPL").status_code == 400
+    resp = client.get("/journey?from_station=NDLS&to_station=AGC")
+    assert resp.status_code == 200
+    assert [leg["trip_id"] for leg in resp.json()["legs"]] == ["T1001"]
@@ -0,0 +1,56 @@
+import json
+import logging
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.core.logging import JsonFormatter, get_request_id
+from app.core.middleware import MAX_REQUEST_ID_LENGTH, RequestContextMiddleware
+
+
+def _app(sample_rate):
+    app = FastAPI()
+    app.add_middleware(RequestContextMiddleware, sample_rate=sample_rate)
+
+    @app.get("/ok")
+    async def ok():
+        return {"request_id": get_request_id()}
+
+    @app.get("/boom")
+    async def boom():
+        raise RuntimeError("boom")
+
+    return TestClient(app, raise_server_exceptions=False)
+
+
+def _access_lines(caplog):
+    return [r for r in caplog.records if r.getMessage().startswith("request completed")]
+
+
+def test_request_id_is_propagated_and_echoed(caplog):
+    client = _app(1.0)
+    with caplog.at_level(logging.INFO, logger="railway"):
+        resp = client.get("/ok", headers={"X-Request-ID": "req-42"})
+    assert resp.headers["X-Request-ID"] == "req-42"
+    assert resp.json() == {"request_id": "req-42"}
+    assert "status=200" in _access_lines(caplog)[0].getMessage()
+
+    generated = client.get("/ok", headers={"X-Request-ID": "x" * (MAX_REQUEST_ID_LENGTH + 1)})
+    assert len(generated.headers["X-Request-ID"]) == 32
+    assert get_request_id() == "-"
+
+
+def test_access_log_sampling_keeps_errors(caplog):
+    client = _app(0.0)
+    with caplog.at_level(logging.INFO, logger="railway"):
+        assert client.get("/ok").status_code == 200
+        assert client.get("/boom").status_code == 500
+    lines = _access_lines(caplog)
+    assert len(lines) == 1 and "status=500" in lines[0].getMessage()
+
+
+def test_json_formatter():
+    record = logging.LogRecord("railway.x", logging.INFO, __file__, 1, "a=%s", ("b",), None)
+    record.request_id = "r1"
+    entry = json.loads(JsonFormatter().format(record))
+    assert entry["msg"] == "a=b" and entry["request_id"] == "r1" and entry["logger"] == "railway.x"
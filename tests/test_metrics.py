@@ -0,0 +1,78 @@
+import threading
+
+from fastapi.testclient import TestClient
+
+from app.core.metrics import Registry
+from app.main import app
+from app.services.routing_service import clear_route_cache
+
+client = TestClient(app)
+
+
+def _sample(text, line_prefix):
+    for line in text.splitlines():
+        if line.startswith(line_prefix + " "):
+            return float(line.rsplit(" ", 1)[1])
+    return 0.0
+
+
+def test_sharded_counters_and_histograms():
+    registry = Registry()
+    hits = registry.counter("t_hits_total", "hits", ("kind",))
+    latency = registry.histogram("t_latency_seconds", "latency", buckets=(0.1, 1.0))
+
+    def work():
+        for _ in range(1000):
+            hits.inc("a")
+            latency.observe(0.5)
+
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    latency.observe(5.0)
+
+    text = registry.render()
+    assert "# TYPE t_hits_total counter" in text
+    assert _sample(text, 't_hits_total{kind="a"}') == 8000
+    assert _sample(text, 't_latency_seconds_bucket{le="0.1"}') == 0
+    assert _sample(text, 't_latency_seconds_bucket{le="1"}') == 8000
+    assert _sample(text, 't_latency_seconds_bucket{le="+Inf"}') == 8001
+    assert _sample(text, "t_latency_seconds_count") == 8001
+
+    # drain/merge is how routing workers ship their numbers to the parent
+    other = Registry()
+    other_hits = other.counter("t_hits_total", "hits", ("kind",))
+    other.histogram("t_latency_seconds", "latency", buckets=(0.1, 1.0))
+    other.merge(registry.drain())
+    assert other_hits.values() == {("a",): 8000}
+    assert hits.values() == {}
+
+
+def test_metrics_endpoint_reports_routes_routing_and_bookings():
+    clear_route_cache()
+    before = client.get("/metrics").text
+    client.get("/route", params={"from_station": "JP", "to_station": "HWH"})
+    client.post("/bookings", json={"passenger_name": "Metrics", "trip_id": "T1003", "seats": 2})
+    client.post("/bookings", json={"passenger_name": "Metrics", "trip_id": "nope", "seats": 1})
+
+    resp = client.get("/metrics")
+    assert resp.headers["content-type"].startswith("text/plain; version=0.0.4")
+    text = resp.text
+    route_ok = 'railway_http_requests_total{route="/route",method="GET",status="200"}'
+    assert _sample(text, route_ok) == _sample(before, route_ok) + 1
+    assert (
+        'railway_http_request_duration_seconds_bucket{route="/route",method="GET",le="+Inf"}'
+        in text
+    )
+    assert _sample(text, "railway_route_settled_nodes_count") > _sample(
+        before, "railway_route_settled_nodes_count"
+    )
+    assert _sample(text, "railway_route_heap_pushes_sum") > 0
+    assert _sample(text, "railway_route_path_edges_sum") > 0
+    created = 'railway_bookings_total{outcome="created"}'
+    rejected = 'railway_bookings_total{outcome="rejected"}'
+    assert _sample(text, created) == _sample(before, created) + 1
+    assert _sample(text, rejected) == _sample(before, rejected) + 1
+    assert _sample(text, "railway_booked_seats_total") >= 2
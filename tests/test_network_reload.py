@@ -0,0 +1,114 @@
+import asyncio
+import dataclasses
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.api.routes import admin
+from app.data import graph as graph_module
+from app.data import network
+from app.data.graph import compile_graph, get_compiled_graph
+from app.data.snapshot import write_snapshot
+from app.main import app
+from app.models.schemas import Edge
+from app.services import network_service
+from app.services.routing_pool import RoutingPool
+from app.services.routing_service import find_cheapest_route, with_network_version
+
+client = TestClient(app)
+ROUTE = {"from_station": "NDLS", "to_station": "HWH"}
+TOKEN = {"X-Admin-Token": "s3cret"}
+
+
+def _write(path, graph=network.GRAPH):
+    compiled = compile_graph(graph, network.STATIONS)
+    write_snapshot(str(path), compiled)
+    return compiled
+
+
+def _detour_graph():
+    # make every edge out of NDLS far longer, so routes from it change
+    graph = dict(network.GRAPH)
+    graph["NDLS"] = [Edge(to=e.to, km=e.km * 10, line=e.line) for e in graph["NDLS"]]
+    return graph
+
+
+@pytest.fixture
+def snapshot(tmp_path, monkeypatch):
+    path = tmp_path / "network.snap"
+    for module in (admin, graph_module, network_service):
+        monkeypatch.setattr(
+            module,
+            "settings",
+            dataclasses.replace(
+                module.settings, network_snapshot_path=str(path), admin_token="s3cret"
+            ),
+        )
+    # restored on teardown, so later tests see the built-in network again
+    monkeypatch.setattr(graph_module, "_COMPILED", compile_graph(network.GRAPH, network.STATIONS))
+    return path
+
+
+def test_reload_swaps_network_for_new_requests(snapshot):
+    before = client.get("/route", params=ROUTE)
+    old_version = before.headers["X-Network-Version"]
+    assert client.get("/health").json()["network_version"] == old_version
+
+    assert client.post("/admin/network/reload").status_code == 403
+    assert client.post("/admin/network/reload", headers=TOKEN).status_code == 422  # no file yet
+
+    _write(snapshot)
+    unchanged = client.post("/admin/network/reload", headers=TOKEN).json()
+    assert unchanged["changed"] is False and unchanged["version"] == old_version
+
+    new = _write(snapshot, _detour_graph())
+    body = client.post("/admin/network/reload", headers=TOKEN).json()
+    assert body["changed"] is True and body["previous_version"] == old_version
+    assert body["version"] == new.version
+
+    after = client.get("/route", params=ROUTE)
+    assert after.headers["X-Network-Version"] == new.version
+    assert after.json()["total_km"] > before.json()["total_km"]
+    assert client.get("/stations").headers["X-Network-Version"] == new.version
+    assert client.get("/admin/network", headers=TOKEN).json()["version"] == new.version
+
+
+def test_in_flight_calls_finish_on_their_graph(snapshot):
+    old = get_compiled_graph()
+    expected = find_cheapest_route("NDLS", "HWH")
+    _write(snapshot, _detour_graph())
+    network_service.reload_network()
+
+    assert get_compiled_graph() is not old
+    # a call that picked up the old graph before the swap still answers from it
+    assert find_cheapest_route("NDLS", "HWH", graph=old) == expected
+    version, resp = with_network_version(find_cheapest_route, "NDLS", "HWH")
+    assert version == get_compiled_graph().version and resp.total_km > expected.total_km
+
+
+def test_watcher_reloads_replaced_file(snapshot):
+    _write(snapshot)
+    watcher = network_service.SnapshotWatcher(str(snapshot), 0.01)
+    watcher.start()
+    try:
+        new = _write(snapshot, _detour_graph())
+        deadline = time.monotonic() + 5
+        while get_compiled_graph().version != new.version and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert get_compiled_graph().version == new.version
+    finally:
+        watcher.stop()
+
+
+def test_process_workers_load_the_pool_network(snapshot):
+    new = _write(snapshot, _detour_graph())
+    pool = RoutingPool(workers=1, network_path=str(snapshot))
+    try:
+        version, resp = asyncio.run(
+            pool.run(with_network_version, find_cheapest_route, "NDLS", "HWH")
+        )
+        assert version == new.version
+        assert resp.total_km > find_cheapest_route("NDLS", "HWH").total_km
+    finally:
+        pool.shutdown()
@@ -0,0 +1,128 @@
+import dataclasses
+import pstats
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api.routes import admin
+from app.api.routes.routing import router as routing_router
+from app.core.profiling import ProfilingMiddleware
+from app.services.routing_service import clear_route_cache
+
+TOKEN = {"X-Admin-Token": "s3cret"}
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(
+        admin,
+        "settings",
+        dataclasses.replace(admin.settings, profiling_enabled=True, admin_token="s3cret"),
+    )
+    app = FastAPI()
+    app.add_middleware(ProfilingMiddleware, admin_token="s3cret")
+    app.include_router(routing_router, prefix="/route")
+    app.include_router(admin.router, prefix="/admin")
+    return TestClient(app)
+
+
+def test_profiled_request_is_downloadable(client, tmp_path):
+    clear_route_cache()
+    plain = client.get("/route", params={"from_station": "ADI", "to_station": "HWH"})
+    assert "X-Profile-Id" not in plain.headers
+
+    # X-Profile alone is ignored: profiling a request needs the admin token too
+    clear_route_cache()
+    params = {"from_station": "ADI", "to_station": "HWH"}
+    untrusted = client.get("/route", params=params, headers={"X-Profile": "1"})
+    assert untrusted.status_code == 200 and "X-Profile-Id" not in untrusted.headers
+    assert untrusted.headers["X-Profile-Status"] == "unauthorized"
+
+    clear_route_cache()
+    resp = client.get("/route", params=params, headers={"X-Profile": "1", **TOKEN})
+    assert resp.status_code == 200
+    profile_id = resp.headers["X-Profile-Id"]
+
+    assert client.get(f"/admin/profiles/{profile_id}").status_code == 403
+    listed = client.get("/admin/profiles", headers=TOKEN).json()
+    assert listed[0]["profile_id"] == profile_id and listed[0]["path"] == "/route"
+
+    dump = client.get(f"/admin/profiles/{profile_id}", headers=TOKEN)
+    path = tmp_path / "route.pstats"
+    path.write_bytes(dump.content)
+    functions = {name for _, _, name in pstats.Stats(str(path)).stats}
+    # the search itself ran on the routing pool and was merged into the profile
+    assert "_search_tree" in functions
+
+    text = client.get(f"/admin/profiles/{profile_id}", params={"format": "text"}, headers=TOKEN)
+    assert "cumulative" in text.text
+    assert client.get("/admin/profiles/nope", headers=TOKEN).status_code == 404
+
+
+def test_profiled_request_survives_a_process_wide_profiler(client, monkeypatch):
+    # Python 3.12+ behaviour on any version: only one profiler may be active per process.
+    import cProfile
+
+    class ProcessWideProfile(cProfile.Profile):
+        active = False
+
+        def enable(self, *args, **kwargs):
+            if ProcessWideProfile.active:
+                raise ValueError("Another profiling tool is already active")
+            ProcessWideProfile.active = True
+            super().enable(*args, **kwargs)
+
+        def disable(self):
+            super().disable()
+            ProcessWideProfile.active = False
+
+    monkeypatch.setattr(cProfile, "Profile", ProcessWideProfile)
+    clear_route_cache()
+    resp = client.get(
+        "/route",
+        params={"from_station": "ADI", "to_station": "HWH"},
+        headers={"X-Profile": "1", **TOKEN},
+    )
+    assert resp.status_code == 200
+    assert "X-Profile-Id" in resp.headers
+
+
+def test_sampling_profiler_returns_folded_stacks(client):
+    resp = client.post(
+        "/admin/profile/sample", params={"seconds": 0.2, "interval_ms": 5}, headers=TOKEN
+    )
+    assert resp.status_code == 200
+    lines = resp.text.splitlines()
+    assert lines
+    stack, count = lines[0].rsplit(" ", 1)
+    assert int(count) >= 1 and ";" in stack
+
+
+def test_admin_is_hidden_when_profiling_is_off(monkeypatch):
+    monkeypatch.setattr(
+        admin, "settings", dataclasses.replace(admin.settings, profiling_enabled=False)
+    )
+    app = FastAPI()
+    app.include_router(admin.router, prefix="/admin")
+    assert TestClient(app).get("/admin/profiles").status_code == 404
+
+
+def test_profiling_without_admin_token_fails_closed(monkeypatch):
+    monkeypatch.setattr(
+        admin,
+        "settings",
+        dataclasses.replace(admin.settings, profiling_enabled=True, admin_token=""),
+    )
+    app = FastAPI()
+    app.add_middleware(ProfilingMiddleware, admin_token="")
+    app.include_router(routing_router, prefix="/route")
+    app.include_router(admin.router, prefix="/admin")
+    client = TestClient(app)
+
+    assert client.get("/admin/profiles").status_code == 404
+    assert client.post("/admin/network/reload").status_code == 404
+    resp = client.get(
+        "/route", params={"from_station": "ADI", "to_station": "HWH"}, headers={"X-Profile": "1"}
+    )
+    assert resp.status_code == 200 and "X-Profile-Id" not in resp.headers
@@ -14,3 +14,278 @@ def test_invalid_station():
         assert False, "Expected ValueError"
     except ValueError:
         assert True
+
+def test_route_legs_match_graph():
+    from app.data.network import GRAPH
+
+    res = find_cheapest_route("NDLS", "HWH")
+    assert res.total_km == sum(leg.km for leg in res.legs)
+    assert res.legs[0].frm == "NDLS" and res.legs[-1].to == "HWH"
+    for leg in res.legs:
+        edge = min((e for e in GRAPH[leg.frm] if e.to == leg.to), key=lambda e: e.km)
+        assert (leg.km, leg.line) == (edge.km, edge.line)
+
+def test_compiled_graph_layout():
+    from app.data.graph import get_compiled_graph
+    from app.data.network import GRAPH
+
+    g = get_compiled_graph()
+    assert g.node_count == len(GRAPH)
+    assert g.edge_count == sum(len(edges) for edges in GRAPH.values())
+    u, v = g.index["BPL"], g.index["NGP"]
+    pos = g.edge_lookup[(u, v)]
+    assert g.offsets[u] <= pos < g.offsets[u + 1]
+    assert g.km[pos] == 350 and g.lines[g.line_ids[pos]] == "Orange Line"
+
+def test_route_cache_hits_and_invalidation(monkeypatch):
+    import dataclasses
+
+    from app.services import routing_service
+
+    routing_service.clear_route_cache()
+    first = find_cheapest_route("NDLS", "NGP")
+    hits = routing_service.route_cache_stats()["hits"]
+    assert find_cheapest_route("NDLS", "NGP") is first
+    assert routing_service.route_cache_stats()["hits"] == hits + 1
+
+    # A fare change must not serve the old fares.
+    monkeypatch.setattr(
+        routing_service, "settings", dataclasses.replace(routing_service.settings, fare_per_km=3)
+    )
+    repriced = find_cheapest_route("NDLS", "NGP")
+    assert repriced is not first
+    assert repriced.total_fare == repriced.total_km * 3
+
+def test_ttl_cache_evicts_lru():
+    from app.core.cache import TTLCache
+
+    cache: TTLCache[int] = TTLCache(maxsize=2, ttl_s=60)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+
+def test_contraction_hierarchy_matches_dijkstra():
+    import random
+    from itertools import pairwise
+
+    from app.data.graph import compile_graph
+    from app.models.schemas import Edge
+    from app.services.hierarchy import build_hierarchy, hierarchy_query
+    from app.services.routing_service import _dijkstra
+
+    rng = random.Random(7)
+    codes = [f"S{i}" for i in range(120)]
+    graph = {code: [] for code in codes}
+    for i, code in enumerate(codes):
+        for j in rng.sample(range(len(codes)), 3):
+            if j != i:
+                graph[code].append(Edge(to=codes[j], km=rng.randint(1, 50), line=f"L{j % 4}"))
+
+    g = compile_graph(graph)
+    ch = build_hierarchy(g)
+    for _ in range(200):
+        s, t = rng.randrange(g.node_count), rng.randrange(g.node_count)
+        try:
+            expected, _ = _dijkstra(g, s, t)
+        except ValueError:
+            continue
+        km, nodes = hierarchy_query(ch, s, t)
+        assert km == expected
+        assert nodes[0] == s and nodes[-1] == t
+        assert km == sum(g.km[g.edge_lookup[(u, v)]] for u, v in pairwise(nodes))
+
+def test_route_with_hierarchy(monkeypatch):
+    import dataclasses
+
+    from app.services import routing_service
+
+    expected = find_cheapest_route("ADI", "HWH")
+    monkeypatch.setattr(
+        routing_service,
+        "settings",
+        dataclasses.replace(routing_service.settings, routing_algorithm="ch"),
+    )
+    routing_service.clear_route_cache()
+    res = routing_service.find_cheapest_route("ADI", "HWH")
+    assert res.total_km == expected.total_km
+    assert [(leg.frm, leg.to) for leg in res.legs] == [(leg.frm, leg.to) for leg in expected.legs]
+
+def test_alternatives_match_brute_force():
+    import random
+
+    from app.data.graph import compile_graph
+    from app.models.schemas import Edge
+    from app.services.alternatives import k_shortest_paths
+
+    rng = random.Random(3)
+    codes = [f"S{i}" for i in range(9)]
+    graph = {code: [] for code in codes}
+    for i, code in enumerate(codes):
+        for j in rng.sample(range(len(codes)), 3):
+            if j != i:
+                graph[code].append(Edge(to=codes[j], km=rng.randint(1, 20), line=f"L{j % 2}"))
+    g = compile_graph(graph)
+
+    def simple_paths(u, goal, seen, km):
+        if u == goal:
+            yield km
+            return
+        for pos in range(g.offsets[u], g.offsets[u + 1]):
+            v = g.targets[pos]
+            if v not in seen:
+                yield from simple_paths(v, goal, seen | {v}, km + g.km[pos])
+
+    for s in range(len(codes)):
+        for t in range(len(codes)):
+            expected = sorted(simple_paths(s, t, {s}, 0))[:5]
+            if not expected:
+                continue
+            paths, truncated = k_shortest_paths(g, s, t, 4, max_settled=100_000)
+            assert not truncated
+            assert [p.km for p in paths] == expected
+            for p in paths:
+                assert len(set(p.nodes)) == len(p.nodes)  # loopless
+                assert p.km == sum(g.km[pos] for pos in p.edges)
+                assert [g.targets[pos] for pos in p.edges] == list(p.nodes[1:])
+
+    paths, truncated = k_shortest_paths(g, 0, 8, 4, max_settled=1)
+    assert truncated and len(paths) == 1
+
+def test_route_alternatives_endpoint():
+    from fastapi.testclient import TestClient
+
+    from app.main import app
+
+    client = TestClient(app)
+    plain = client.get("/route", params={"from_station": "NDLS", "to_station": "HWH"}).json()
+    assert "alternatives" not in plain
+
+    resp = client.get(
+        "/route", params={"from_station": "NDLS", "to_station": "HWH", "alternatives": 2}
+    ).json()
+    assert resp["total_km"] == plain["total_km"]
+    # the sample network has only one other loopless NDLS -> HWH route, via JP and ADI
+    (alt,) = resp["alternatives"]
+    assert alt["total_km"] > plain["total_km"]
+    assert alt["total_km"] == sum(leg["km"] for leg in alt["legs"])
+    assert [leg["to"] for leg in alt["legs"]] == ["JP", "ADI", "BPL", "NGP", "HWH"]
+
+    too_many = client.get(
+        "/route", params={"from_station": "NDLS", "to_station": "HWH", "alternatives": 99}
+    )
+    assert too_many.status_code == 400
+
+def test_bidirectional_astar_matches_dijkstra():
+    import random
+    from itertools import pairwise
+
+    import pytest
+
+    from app.core.metrics import ROUTE_SETTLED
+    from app.data.graph import compile_graph
+    from app.data.synthetic import generate_network
+    from app.models.schemas import Edge, Station
+    from app.services.astar import bidirectional_query, get_geo_index
+    from app.services.routing_service import _dijkstra
+
+    # one-way edges whose km ignore the coordinates: the bound must still hold
+    rng = random.Random(11)
+    codes = [f"S{i}" for i in range(150)]
+    graph = {code: [] for code in codes}
+    for i, code in enumerate(codes):
+        for j in rng.sample(range(len(codes)), 2):
+            if j != i:
+                graph[code].append(Edge(to=codes[j], km=rng.randint(1, 900), line="L"))
+    stations = {
+        code: Station(code=code, name=code, lat=rng.uniform(8, 35), lon=rng.uniform(68, 97))
+        for code in codes
+    }
+    for g in (compile_graph(graph, stations), compile_graph(graph)):
+        for _ in range(300):
+            s, t = rng.randrange(g.node_count), rng.randrange(g.node_count)
+            try:
+                expected, _ = _dijkstra(g, s, t)
+            except ValueError:
+                with pytest.raises(ValueError):
+                    bidirectional_query(g, s, t)
+                continue
+            km, nodes = bidirectional_query(g, s, t)
+            assert km == expected and nodes[0] == s and nodes[-1] == t
+            assert km == sum(g.km[g.edge_lookup[(u, v)]] for u, v in pairwise(nodes))
+
+    # on a map-like network the goal direction cuts the search down
+    graph, stations = generate_network(3000, seed=4)
+    g = compile_graph(graph, stations)
+    assert get_geo_index(g) is not None
+
+    def settled():
+        return ROUTE_SETTLED.values().get((), [0])[-1]
+
+    dijkstra = astar = 0
+    for _ in range(20):
+        s, t = rng.randrange(g.node_count), rng.randrange(g.node_count)
+        before = settled()
+        expected, _ = _dijkstra(g, s, t)
+        middle = settled()
+        assert bidirectional_query(g, s, t)[0] == expected
+        dijkstra, astar = dijkstra + middle - before, astar + settled() - middle
+    assert astar * 3 < dijkstra
+
+def test_route_with_astar(monkeypatch):
+    import dataclasses
+
+    from app.services import routing_service
+
+    expected = find_cheapest_route("ADI", "HWH")
+    monkeypatch.setattr(
+        routing_service,
+        "settings",
+        dataclasses.replace(routing_service.settings, routing_algorithm="astar"),
+    )
+    routing_service.clear_route_cache()
+    res = routing_service.find_cheapest_route("ADI", "HWH")
+    assert res.total_km == expected.total_km
+    assert res.legs == expected.legs
+
+def test_tiered_class_fares(monkeypatch):
+    import dataclasses
+
+    from fastapi.testclient import TestClient
+
+    from app.main import app
+    from app.services import routing_service
+
+    # 2/km up to 500 km, 1/km beyond; first class costs 5x
+    monkeypatch.setattr(
+        routing_service,
+        "settings",
+        dataclasses.replace(routing_service.settings, fare_distance_tiers=((0, 1.0), (500, 0.5))),
+    )
+    res = find_cheapest_route("NDLS", "HWH", travel_class="first")
+    assert res.travel_class == "first"
+    assert res.total_km > 500
+    assert res.total_fare == (1000 + (res.total_km - 500)) * 5
+    # legs are priced along the whole journey, so they add up to the total
+    assert sum(leg.fare for leg in res.legs) == res.total_fare
+    assert find_cheapest_route("NDLS", "HWH").total_fare == res.total_fare // 5
+
+    batch = routing_service.find_routes_batch([("NDLS", "HWH"), ("NDLS", "XX")], True, "first")
+    assert batch[0].total_fare == res.total_fare
+    assert [leg.fare for leg in batch[0].legs] == [leg.fare for leg in res.legs]
+    matrix = routing_service.route_matrix(["NDLS"], ["HWH", "NDLS"], travel_class="first")
+    assert matrix.fare == [[res.total_fare, 0]]
+
+    client = TestClient(app)
+    params = {"from_station": "NDLS", "to_station": "HWH", "travel_class": "first"}
+    assert client.get("/route", params=params).json()["total_fare"] == res.total_fare
+    bad = client.get("/route", params={**params, "travel_class": "royal"})
+    assert bad.status_code == 400
+    bad = client.post(
+        "/route/batch",
+        json={"pairs": [{"from_station": "NDLS", "to_station": "HWH"}], "travel_class": "royal"},
+    )
+    assert bad.status_code == 400
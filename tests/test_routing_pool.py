@@ -0,0 +1,42 @@
+import asyncio
+import time
+
+import pytest
+
+from app.core.metrics import ROUTE_SETTLED
+from app.services.routing_pool import RoutingOverloaded, RoutingPool, RoutingTimeout
+from app.services.routing_service import find_cheapest_route, find_routes_batch
+
+
+def test_process_pool_matches_in_process_routing():
+    pool = RoutingPool(workers=1)
+    try:
+        pool.warm()
+        searches = sum(sum(state[:-1]) for state in ROUTE_SETTLED.values().values())
+        resp = asyncio.run(pool.run(find_cheapest_route, "NDLS", "HWH"))
+        # the worker's search counters are shipped back with the result
+        assert sum(sum(state[:-1]) for state in ROUTE_SETTLED.values().values()) == searches + 1
+        assert resp == find_cheapest_route("NDLS", "HWH")
+        batch = asyncio.run(pool.run(find_routes_batch, [("NDLS", "BCT"), ("NDLS", "XXX")], False))
+        assert batch == find_routes_batch([("NDLS", "BCT"), ("NDLS", "XXX")])
+        with pytest.raises(ValueError):
+            asyncio.run(pool.run(find_cheapest_route, "NDLS", "XXX"))
+    finally:
+        pool.shutdown()
+
+
+def test_queue_limit_and_timeout():
+    pool = RoutingPool(workers=0, queue_limit=1, timeout_s=0.05)
+    try:
+        with pytest.raises(RoutingTimeout):
+            asyncio.run(pool.run(time.sleep, 0.3))
+        # the timed-out job still occupies the only slot until it finishes
+        with pytest.raises(RoutingOverloaded):
+            asyncio.run(pool.run(time.sleep, 0))
+        time.sleep(0.4)
+        assert asyncio.run(pool.run(sum, [1, 2])) == 3
+        stats = pool.stats()
+        assert stats["in_flight"] == 0
+        assert stats["timeouts"] == 1 and stats["rejected"] == 1
+    finally:
+        pool.shutdown()
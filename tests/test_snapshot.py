@@ -0,0 +1,108 @@
+import dataclasses
+import json
+import random
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.data import graph as graph_module
+from app.data import network
+from app.data.graph import compile_graph
+from app.data.snapshot import (
+    SnapshotError,
+    build_network,
+    export_source,
+    load_snapshot,
+    main,
+    write_snapshot,
+)
+from app.data.synthetic import generate_network
+from app.main import app
+from app.models.schemas import Station
+from app.services.routing_service import _dijkstra, clear_route_cache
+
+client = TestClient(app)
+ROUTE = {"from_station": "NDLS", "to_station": "HWH"}
+
+
+def test_snapshot_roundtrip_matches_compiled_graph(tmp_path):
+    graph, stations = generate_network(300, seed=5)
+    compiled = compile_graph(graph, stations)
+    path = str(tmp_path / "net.snap")
+    write_snapshot(path, compiled)
+
+    loaded = load_snapshot(path, verify=True)
+    assert loaded.version == compiled.version
+    assert loaded.codes == compiled.codes and loaded.lines == compiled.lines
+    assert dict(loaded.stations) == stations
+    for field in ("offsets", "targets", "km", "line_ids"):
+        assert list(getattr(loaded, field)) == list(getattr(compiled, field))
+    # edge_lookup scans rows instead of holding a dict, with the same answers
+    assert dict(loaded.edge_lookup) == compiled.edge_lookup
+    assert (0, 0) not in loaded.edge_lookup
+
+    rng = random.Random(1)
+    for _ in range(50):
+        s, t = rng.randrange(compiled.node_count), rng.randrange(compiled.node_count)
+        assert _dijkstra(loaded, s, t) == _dijkstra(compiled, s, t)
+
+
+def test_corrupt_snapshots_are_rejected(tmp_path):
+    path = tmp_path / "net.snap"
+    write_snapshot(str(path), compile_graph(network.GRAPH, network.STATIONS))
+    data = path.read_bytes()
+
+    path.write_bytes(data[:-3])
+    with pytest.raises(SnapshotError, match="truncated"):
+        load_snapshot(str(path))
+    path.write_bytes(b"not a snapshot" * 8)
+    with pytest.raises(SnapshotError, match="not a network snapshot"):
+        load_snapshot(str(path))
+    # flip a km value: only caught when verifying
+    tampered = bytearray(data)
+    tampered[-len(data) // 3] ^= 0xFF
+    path.write_bytes(bytes(tampered))
+    with pytest.raises(SnapshotError):
+        load_snapshot(str(path), verify=True)
+
+
+def test_build_network_validates_sources():
+    stations = [
+        {"code": "AA", "name": "Alpha", "lat": "1.5", "lon": ""},
+        {"code": "BB", "name": "Beta"},
+    ]
+    graph, by_code = build_network(
+        stations, [{"from": "AA", "to": "BB", "km": "7", "line": "L1"}], both_directions=True
+    )
+    assert by_code == {
+        "AA": Station(code="AA", name="Alpha", lat=1.5),
+        "BB": Station(code="BB", name="Beta"),
+    }
+    assert [(e.to, e.km) for e in graph["BB"]] == [("AA", 7)]
+    with pytest.raises(ValueError, match="unknown station"):
+        build_network(stations, [{"from": "AA", "to": "CC", "km": 1, "line": "L1"}])
+    with pytest.raises(ValueError, match="Duplicate"):
+        build_network(stations * 2, [])
+
+
+def test_service_starts_from_configured_snapshot(tmp_path, monkeypatch):
+    source = tmp_path / "network.json"
+    source.write_text(json.dumps(export_source(network.GRAPH, network.STATIONS)))
+    path = str(tmp_path / "network.snap")
+    main(["compile", str(source), "-o", path])
+
+    expected = client.get("/route", params=ROUTE).json()
+    monkeypatch.setattr(
+        graph_module,
+        "settings",
+        dataclasses.replace(graph_module.settings, network_snapshot_path=path),
+    )
+    monkeypatch.setattr(graph_module, "_COMPILED", None)
+    g = graph_module.get_compiled_graph()
+    assert isinstance(g.targets, memoryview)
+    assert client.get("/stations").json() == [
+        s.model_dump() for s in sorted(network.STATIONS.values(), key=lambda s: s.code)
+    ]
+    clear_route_cache()
+    resp = client.get("/route", params=ROUTE)
+    assert resp.status_code == 200 and resp.json() == expected
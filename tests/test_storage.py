@@ -0,0 +1,164 @@
+from datetime import datetime, timedelta, timezone
+
+from app.models.schemas import Booking, Trip
+from app.services import booking_service
+from app.services.booking_index import BookingIndex
+from app.services.inventory import SeatInventory
+from app.storage.sql import SqlStorage
+
+T0 = datetime(2025, 1, 1, 8, 0, tzinfo=timezone.utc)
+
+
+def _trip(trip_id="PERSIST1"):
+    return Trip(
+        trip_id=trip_id,
+        train_no="11111",
+        from_station="NDLS",
+        to_station="AGC",
+        depart_at=T0,
+        arrive_at=T0 + timedelta(hours=3),
+        base_fare=250,
+        capacity=10,
+    )
+
+
+def _booking(booking_id, trip, seats, minutes):
+    return Booking(
+        booking_id=booking_id,
+        ticket_code="RQ-0000-0000",
+        passenger_name="Asha",
+        trip=trip,
+        seats=seats,
+        total_price=trip.base_fare * seats,
+        booked_at=T0 + timedelta(minutes=minutes),
+    )
+
+
+def _storage(tmp_path):
+    return SqlStorage(f"sqlite:///{tmp_path / 'railway.db'}", create_schema=True)
+
+
+def test_sql_roundtrip_and_indexed_lookups(tmp_path):
+    storage = _storage(tmp_path)
+    trip, other = _trip(), _trip("PERSIST2")
+    storage.save_trips([trip, other])
+    storage.save_trips([trip])  # re-saving is not an error
+    bookings = [_booking(f"B{i}", trip if i % 2 else other, 1, i) for i in range(10)]
+    bookings[3].travel_class = "ac3"
+    storage.save_bookings(bookings)
+    storage.close()
+
+    reopened = _storage(tmp_path)
+    assert sorted(t.trip_id for t in reopened.load_trips()) == ["PERSIST1", "PERSIST2"]
+    assert list(reopened.load_bookings()) == bookings
+    assert reopened.get_booking("B3") == bookings[3]
+    assert reopened.get_booking("nope") is None
+    trip_bookings = reopened.bookings_for_trip("PERSIST1")
+    assert [b.booking_id for b in trip_bookings] == ["B1", "B3", "B5", "B7", "B9"]
+
+    # re-imported timetables replace trips in place
+    retimed = other.model_copy(update={"depart_at": T0 + timedelta(hours=1)})
+    reopened.save_trips([retimed])
+    assert {t.trip_id: t for t in reopened.load_trips()}["PERSIST2"] == retimed
+
+
+def test_restore_rebuilds_bookings_and_seats(tmp_path, monkeypatch):
+    storage = _storage(tmp_path)
+    trip = _trip()
+    storage.save_trips([trip])
+    stored = _booking("B1", trip, 4, 0)
+    storage.save_bookings([stored])
+
+    monkeypatch.setattr(booking_service, "get_storage", lambda: storage)
+    monkeypatch.setattr(booking_service, "_RESTORED", False)
+    monkeypatch.setattr(booking_service, "_BOOKINGS", {})
+    monkeypatch.setattr(booking_service, "_INDEX", BookingIndex())
+    monkeypatch.setattr(booking_service, "_INVENTORY", SeatInventory())
+    booking_service.restore_bookings()
+
+    restored = booking_service._BOOKINGS
+    assert restored == {"B1": stored}
+    assert booking_service.query_bookings(trip_id="PERSIST1")[0] == [stored]
+    assert booking_service._INVENTORY.reserved("PERSIST1") == 4
+
+
+def test_failed_bulk_write_rolls_back(monkeypatch):
+    import pytest
+
+    from app.data.seed import add_trips
+    from app.models.schemas import BookingCreate
+
+    class FailingStorage:
+        error: BaseException = OSError("disk full")
+
+        def save_bookings(self, bookings):
+            raise self.error
+
+    storage = FailingStorage()
+    add_trips([_trip("PERSIST3")])
+    monkeypatch.setattr(booking_service, "get_storage", lambda: storage)
+    monkeypatch.setattr(booking_service, "_RESTORED", True)
+    monkeypatch.setattr(booking_service, "_BOOKINGS", {})
+    monkeypatch.setattr(booking_service, "_INVENTORY", SeatInventory())
+    items = [(0, BookingCreate(passenger_name="Asha", trip_id="PERSIST3", seats=2))]
+
+    (result,) = booking_service.create_bookings(items)
+    assert result.error == "Booking could not be stored."
+
+    # Interruptions roll back too, but aren't turned into an item error.
+    storage.error = KeyboardInterrupt()
+    with pytest.raises(KeyboardInterrupt):
+        booking_service.create_bookings(items)
+    assert booking_service._BOOKINGS == {}
+    assert booking_service._INVENTORY.reserved("PERSIST3") == 0
+
+
+def test_sql_guards_seats_and_booking_ids_across_instances(tmp_path):
+    import pytest
+
+    from app.storage.base import DuplicateBookingId, SeatsUnavailable
+
+    first, second = _storage(tmp_path), _storage(tmp_path)  # two processes, one database
+    trip = _trip()
+    first.save_trips([trip])
+    first.save_bookings([_booking("B1", trip, 6, 0)])
+
+    with pytest.raises(SeatsUnavailable):
+        second.save_bookings([_booking("B2", trip, 5, 1)])
+    with pytest.raises(DuplicateBookingId) as taken:
+        second.save_bookings([_booking("B1", trip, 1, 1), _booking("B3", trip, 1, 1)])
+    assert taken.value.booking_ids == {"B1"}
+    # a rejected write stores nothing and claims no seats
+    second.save_bookings([_booking("B4", trip, 4, 2)])
+    assert [b.booking_id for b in second.bookings_for_trip("PERSIST1")] == ["B1", "B4"]
+
+    # re-importing the trip keeps its seat count
+    first.save_trips([trip])
+    with pytest.raises(SeatsUnavailable):
+        first.save_bookings([_booking("B5", trip, 1, 3)])
+
+
+def test_booking_moves_to_a_fresh_id_when_the_store_has_it(tmp_path, monkeypatch):
+    from app.data.seed import add_trips
+    from app.models.schemas import BookingCreate
+
+    storage = _storage(tmp_path)
+    trip = _trip("PERSIST4")
+    add_trips([trip])
+    storage.save_trips([trip])
+    storage.save_bookings([_booking("B00000001", trip, 1, 0)])  # stored by another process
+
+    ids = iter(["B00000001", "B00000002"])
+    monkeypatch.setattr(booking_service, "_new_booking_id", lambda: next(ids))
+    monkeypatch.setattr(booking_service, "get_storage", lambda: storage)
+    monkeypatch.setattr(booking_service, "_RESTORED", True)
+    monkeypatch.setattr(booking_service, "_BOOKINGS", {})
+    monkeypatch.setattr(booking_service, "_INDEX", BookingIndex())
+    monkeypatch.setattr(booking_service, "_INVENTORY", SeatInventory())
+
+    booking = booking_service.create_booking(
+        BookingCreate(passenger_name="Ravi", trip_id="PERSIST4", seats=2)
+    )
+    assert booking.booking_id == "B00000002"
+    assert list(booking_service._BOOKINGS) == ["B00000002"]
+    assert storage.get_booking("B00000002") == booking
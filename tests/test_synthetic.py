@@ -0,0 +1,25 @@
+from app.data.graph import compile_graph
+from app.data.synthetic import generate_network, generate_trips
+from app.services.routing_service import _search_tree
+
+
+def test_generate_network_is_reproducible_and_connected():
+    graph, stations = generate_network(500, degree=3.0, lines=12, seed=3)
+    again, _ = generate_network(500, degree=3.0, lines=12, seed=3)
+    assert graph == again
+    assert set(graph) == set(stations)
+
+    g = compile_graph(graph)
+    assert g.node_count == 500
+    assert 2.5 <= g.edge_count / g.node_count <= 3.5
+    dist, _ = _search_tree(g, 0)
+    assert len(dist) == g.node_count
+
+
+def test_generate_trips_follow_edges():
+    graph, _ = generate_network(50, seed=1)
+    trips = generate_trips(graph, 200, seed=1)
+    assert len({t.trip_id for t in trips}) == 200
+    for t in trips:
+        assert any(e.to == t.to_station for e in graph[t.from_station])
+        assert t.arrive_at > t.depart_at
@@ -0,0 +1,58 @@
+import random
+from datetime import datetime, timedelta, timezone
+
+from app.data.trip_index import TripIndex
+from app.models.schemas import Trip
+
+T0 = datetime(2025, 5, 1, tzinfo=timezone.utc)
+STATIONS = ["NDLS", "AGC", "BPL", "NGP"]
+
+
+def _trip(i, rng):
+    a, b = rng.sample(STATIONS, 2)
+    depart = T0 + timedelta(minutes=rng.randrange(0, 24 * 60))
+    return Trip(
+        trip_id=f"IDX{i}",
+        train_no="10000",
+        from_station=a,
+        to_station=b,
+        depart_at=depart,
+        arrive_at=depart + timedelta(hours=2),
+        base_fare=100,
+    )
+
+
+def test_queries_match_a_full_scan():
+    rng = random.Random(3)
+    trips = [_trip(i, rng) for i in range(400)]
+    index = TripIndex()
+    for i in range(0, len(trips), 37):
+        index.add(trips[i : i + 37])
+    # re-adding a trip with a new departure replaces the old entry
+    moved = trips[0].model_copy(update={"depart_at": T0 + timedelta(hours=30)})
+    index.add([moved])
+    trips[0] = moved
+    assert len(index) == len(trips)
+
+    for _ in range(200):
+        a = rng.choice(STATIONS + [None])
+        b = rng.choice(STATIONS + [None])
+        after = T0 + timedelta(minutes=rng.randrange(0, 24 * 60))
+        before = after + timedelta(hours=rng.randrange(1, 8))
+        expected = sorted(
+            (
+                t
+                for t in trips
+                if (a is None or t.from_station == a)
+                and (b is None or t.to_station == b)
+                and after <= t.depart_at < before
+            ),
+            key=lambda t: (t.depart_at, t.trip_id),
+        )
+        assert index.query(a, b, after, before) == expected
+        chunks = list(index.scan(a, b, after, before, chunk=3))
+        assert all(0 < len(c) <= 3 for c in chunks)
+        assert [t for c in chunks for t in c] == expected
+
+    assert index.query(after=T0 + timedelta(hours=29)) == [moved]
+    assert index.query("NDLS", "NDLS") == []